@@ -0,0 +1,240 @@
+"""
+Generate synthetic Illumina sample sheets for testing and benchmarking.
+
+Sheets follow the layout of a NovaSeq v1 sample sheet, with sample IDs /
+names in the format of the example test sheet and random unique dual
+indices per lane. A given proportion of rows may have errors introduced
+(invalid characters, missing values, invalid indices) or be duplicates of
+the row before.
+
+Example:
+    python benchmarks/generate_sheet.py --rows 10000 --lanes 4 \\
+        --error_rate 0.01 --duplicate_rate 0.01 --output SampleSheet.csv
+"""
+import argparse
+import random
+
+
+HEADER = [
+    '[Header]',
+    'IEMFileVersion,5',
+    'Investigator Name,synthetic',
+    'Experiment Name,synthetic',
+    'Date,28/09/2021',
+    'Workflow,GenerateFASTQ',
+    'Application,NovaSeq FASTQ Only',
+    'Instrument Type,NovaSeq',
+    'Assay,TruSeq',
+    'Index Adapters,96_UDI_PN101308',
+    '',
+    '[Reads]',
+    '151',
+    '151',
+    '',
+    '[Settings]',
+    'Adapter,AGATCGGAAGAGCACACGTCTGAACTCCAGTCA',
+    'AdapterRead2,AGATCGGAAGAGCGTCGTGTAGGGAAAGAGTGT',
+    '',
+    '[Data]'
+]
+
+# regex matching sample IDs generated, for benchmarking name pattern checks
+SAMPLE_ID_REGEX = r'[0-9]{7}-[0-9]{5}Z[0-9]{4}-(BM|PB|DNA)-MPD-MYE-[MF]-EGG2'
+
+# ways a row may be made invalid, chosen at random for each error row
+ERRORS = [
+    'id_space', 'name_tilde', 'missing_id', 'missing_name', 'index_chars',
+    'index2_chars', 'long_id'
+]
+
+
+def random_sample_id(rng) -> str:
+    """
+    Sample ID in format of example test sheet
+    """
+    return (
+        f'{rng.randrange(10 ** 6, 10 ** 7)}-'
+        f'{rng.randrange(10 ** 4, 10 ** 5)}Z{rng.randrange(10 ** 4):04d}-'
+        f'{rng.choice(["BM", "PB", "DNA"])}-MPD-MYE-{rng.choice("MF")}-EGG2'
+    )
+
+
+def unique_indices(rng, count, length) -> list:
+    """
+    Random unique index sequences of given length
+    """
+    indices = set()
+
+    while len(indices) < count:
+        indices.add(''.join(rng.choices('ACGT', k=length)))
+
+    indices = list(indices)
+    rng.shuffle(indices)
+
+    return indices
+
+
+def introduce_error(rng, row) -> None:
+    """
+    Make row invalid with a randomly chosen error, row is modified in place
+    as a dict of column values
+    """
+    error = rng.choice(ERRORS)
+
+    if error == 'id_space':
+        row['Sample_ID'] = row['Sample_ID'].replace('-', ' ', 1)
+    elif error == 'name_tilde':
+        row['Sample_Name'] = row['Sample_Name'].replace('-', '~', 1)
+    elif error == 'missing_id':
+        row['Sample_ID'] = ''
+    elif error == 'missing_name':
+        row['Sample_Name'] = ''
+    elif error == 'index_chars':
+        row['index'] = row['index'][:-2] + 'xx'
+    elif error == 'index2_chars':
+        row['index2'] = row['index2'][:-2] + 'zz'
+    elif error == 'long_id':
+        row['Sample_ID'] = row['Sample_ID'] * 3
+
+
+def generate_rows(
+        rows, lanes=1, index_length=10, error_rate=0.0, duplicate_rate=0.0,
+        seed=0):
+    """
+    Generate rows of sample sheet data body
+
+    Args:
+        - rows (int): number of rows to generate
+        - lanes (int): number of lanes to spread samples across, if 0 no
+            Lane column is included
+        - index_length (int): length of index and index2 sequences
+        - error_rate (float): proportion of rows to introduce an error to
+        - duplicate_rate (float): proportion of rows to duplicate the row
+            before
+        - seed (int): seed for random number generator
+    Yields:
+        - columns (list): column names, then each row as a list of values
+    """
+    rng = random.Random(seed)
+
+    columns = [
+        'Sample_ID', 'Sample_Name', 'Sample_Plate', 'Sample_Well',
+        'Index_Plate_Well', 'index', 'index2'
+    ]
+
+    if lanes:
+        columns.insert(0, 'Lane')
+
+    yield columns
+
+    lane_count = max(lanes, 1)
+
+    # samples split evenly across lanes, each lane with unique indices
+    per_lane = -(-rows // lane_count)
+    indices = unique_indices(rng, per_lane, index_length)
+    indices2 = unique_indices(rng, per_lane, index_length)
+
+    wells = [f'{row}{col}' for col in range(1, 13) for row in 'ABCDEFGH']
+
+    previous = None
+
+    for num in range(rows):
+        lane, position = divmod(num, per_lane)
+
+        if previous and rng.random() < duplicate_rate:
+            row = dict(previous)
+        else:
+            sample_id = random_sample_id(rng)
+            row = {
+                'Lane': str(lane + 1),
+                'Sample_ID': sample_id,
+                'Sample_Name': sample_id,
+                'Sample_Plate': str(100 + position // 96),
+                'Sample_Well': wells[position % 96],
+                'Index_Plate_Well': wells[(position + 9) % 96],
+                'index': indices[position],
+                'index2': indices2[position]
+            }
+
+            if rng.random() < error_rate:
+                introduce_error(rng, row)
+
+        previous = row
+
+        yield [row[x] for x in columns]
+
+
+def generate_sheet(file, rows, **kwargs) -> None:
+    """
+    Write synthetic sample sheet to file
+
+    Args:
+        - file (str): path to write sample sheet to
+        - rows (int): number of rows in sample sheet
+        - kwargs: passed to generate_rows()
+    """
+    lines = generate_rows(rows, **kwargs)
+    columns = next(lines)
+    padding = ',' * (len(columns) - 1)
+
+    with open(file, 'w') as f:
+        for line in HEADER:
+            # header lines padded to number of columns as exported by excel
+            f.write(f'{line}{padding[line.count(","):]}\n')
+
+        f.write(f'{",".join(columns)}\n')
+
+        for row in lines:
+            f.write(f'{",".join(row)}\n')
+
+
+def parse_args():
+    """
+    Parse cmd line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic Illumina sample sheet'
+    )
+
+    parser.add_argument(
+        '--output', required=True, help='file to write sample sheet to'
+    )
+    parser.add_argument(
+        '--rows', type=int, default=96, help='number of samples (default: 96)'
+    )
+    parser.add_argument(
+        '--lanes', type=int, default=1,
+        help='number of lanes, 0 for no Lane column (default: 1)'
+    )
+    parser.add_argument(
+        '--index_length', type=int, default=10,
+        help='length of indices (default: 10)'
+    )
+    parser.add_argument(
+        '--error_rate', type=float, default=0.0,
+        help='proportion of rows with an error introduced (default: 0)'
+    )
+    parser.add_argument(
+        '--duplicate_rate', type=float, default=0.0,
+        help='proportion of rows duplicating the row before (default: 0)'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='seed for random number generator (default: 0)'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    generate_sheet(
+        args.output, args.rows, lanes=args.lanes,
+        index_length=args.index_length, error_rate=args.error_rate,
+        duplicate_rate=args.duplicate_rate, seed=args.seed
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Benchmark reading and validating synthetic sample sheets of increasing size.
+
+For each sheet size a sheet is generated with generate_sheet.py, then each
+step is timed (best of --repeat runs) and run again under tracemalloc to
+record peak memory allocated:
+- reading the sheet with read_sheet() (pandas) and read_sheet_records()
+- each validators check, on both the DataFrame and csv read sheet_body
+- the whole validate_sheet() call with both readers
+- matching the Sample_IDs against PATTERN_COUNT patterns with a
+  pattern_set (one search of a combined regex) and searching each pattern
+  in turn, as validate_sheet() did before pattern sets
+
+Results are written as JSON to --output, and may be compared against a
+previous results file with --compare.
+
+Example:
+    python benchmarks/run_benchmarks.py --sizes 100 10000 \\
+        --output results.json --compare previous_results.json
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_sheet import SAMPLE_ID_REGEX, generate_sheet
+from validate.validate import (
+    pattern_set, read_sheet, read_sheet_records, validate_sheet, validators
+)
+
+
+# validators methods to benchmark, each run on a new validators instance
+CHECKS = [
+    'header', 'sample_id', 'sample_name', 'indices', 'check_duplicate_ids',
+    'check_index_distance'
+]
+
+# number of Sample_ID patterns to match against, generated sheets match
+# only the last
+PATTERN_COUNT = 120
+
+PATTERNS = [
+    f'^{num:03}-[A-Z]+-PANEL-{num}$' for num in range(PATTERN_COUNT - 1)
+] + [SAMPLE_ID_REGEX]
+
+
+def run_check(sample_sheet, check) -> None:
+    """
+    Run a single validators check on a read sample sheet
+    """
+    validate = validators(sample_sheet, SAMPLE_ID_REGEX, barcode_mismatches=1)
+
+    if check == 'check_index_distance':
+        validate.check_index_distance('index', 'index2')
+    else:
+        getattr(validate, check)()
+
+
+def match_patterns(sample_ids, combined) -> None:
+    """
+    Check each Sample_ID matches any of PATTERNS, with a new pattern_set
+    (so no results are cached between runs) or each pattern in turn
+    """
+    if combined:
+        matches = pattern_set(PATTERNS).matches
+    else:
+        compiled = [re.compile(x) for x in PATTERNS]
+
+        def matches(sample):
+            return any(x.search(sample) for x in compiled)
+
+    for sample in sample_ids:
+        matches(sample)
+
+
+def measure(function, repeat) -> dict:
+    """
+    Time function as best of repeated runs, then run once more under
+    tracemalloc to find peak memory allocated
+
+    Args:
+        - function (callable): function to benchmark, takes no arguments
+        - repeat (int): number of timed runs
+    Returns:
+        - result (dict): seconds taken and peak memory in bytes
+    """
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': min(times), 'peak_memory_bytes': peak}
+
+
+def benchmark_size(rows, args) -> list:
+    """
+    Benchmark every step for a generated sheet of the given size
+
+    Args:
+        - rows (int): number of rows in generated sheet
+        - args (argparse.Namespace): parsed cmd line arguments
+    Returns:
+        - results (list): dict of result for each step
+    """
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sheet = os.path.join(tmp_dir, 'SampleSheet.csv')
+
+        generate_sheet(
+            sheet, rows, lanes=args.lanes, index_length=args.index_length,
+            error_rate=args.error_rate, duplicate_rate=args.duplicate_rate,
+            seed=args.seed
+        )
+
+        steps = {
+            'read_sheet': lambda: read_sheet(sheet),
+            'read_sheet_records': lambda: read_sheet_records(sheet)
+        }
+
+        for reader in ['read_sheet', 'read_sheet_records']:
+            sample_sheet = steps[reader]()
+
+            for check in CHECKS:
+                steps[f'{check}[{reader}]'] = (
+                    lambda check=check, sample_sheet=sample_sheet:
+                    run_check(sample_sheet, check)
+                )
+
+        sample_ids = [
+            str(x) for x in dict.fromkeys(
+                read_sheet_records(sheet)[0]['Sample_ID']
+            )
+        ]
+
+        for name, combined in (('pattern_set', True), ('in_turn', False)):
+            steps[f'match_patterns[{name}]'] = (
+                lambda combined=combined: match_patterns(sample_ids, combined)
+            )
+
+        steps['validate_sheet'] = lambda: validate_sheet(
+            sheet, SAMPLE_ID_REGEX, barcode_mismatches=1
+        )
+        steps['validate_sheet[use_pandas=False]'] = lambda: validate_sheet(
+            sheet, SAMPLE_ID_REGEX, barcode_mismatches=1, use_pandas=False
+        )
+
+        for step, function in steps.items():
+            result = {'rows': rows, 'step': step}
+            result.update(measure(function, args.repeat))
+            results.append(result)
+
+            print((
+                f'{rows:>9} rows  {step:<42} {result["seconds"]:>9.4f}s '
+                f'{result["peak_memory_bytes"] / 1024 ** 2:>9.1f}MB'
+            ))
+
+    return results
+
+
+def compare(results, previous_file) -> None:
+    """
+    Print ratio of time and memory of each step against previous results
+    """
+    with open(previous_file) as f:
+        previous = {
+            (x['rows'], x['step']): x for x in json.load(f)['results']
+        }
+
+    print(f'\nCompared to {previous_file} (current / previous):\n')
+
+    for result in results:
+        before = previous.get((result['rows'], result['step']))
+
+        if not before:
+            continue
+
+        time_ratio = result['seconds'] / max(before['seconds'], 1e-9)
+        memory_ratio = result['peak_memory_bytes'] / max(
+            before['peak_memory_bytes'], 1
+        )
+
+        print((
+            f'{result["rows"]:>9} rows  {result["step"]:<42} '
+            f'time x{time_ratio:.2f}  memory x{memory_ratio:.2f}'
+        ))
+
+
+def parse_args():
+    """
+    Parse cmd line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description='Benchmark validating synthetic sample sheets'
+    )
+
+    parser.add_argument(
+        '--sizes', type=int, nargs='+',
+        default=[100, 10000, 100000, 1000000],
+        help='number of rows of sheets to benchmark (default: 100 10k 100k 1M)'
+    )
+    parser.add_argument(
+        '--lanes', type=int, default=4, help='number of lanes (default: 4)'
+    )
+    parser.add_argument(
+        '--index_length', type=int, default=10,
+        help='length of indices (default: 10)'
+    )
+    parser.add_argument(
+        '--error_rate', type=float, default=0.01,
+        help='proportion of rows with an error (default: 0.01)'
+    )
+    parser.add_argument(
+        '--duplicate_rate', type=float, default=0.01,
+        help='proportion of duplicated rows (default: 0.01)'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='seed for generating sheets (default: 0)'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help='number of timed runs of each step, best is kept (default: 3)'
+    )
+    parser.add_argument(
+        '--output', default='benchmark_results.json',
+        help='file to write results to (default: benchmark_results.json)'
+    )
+    parser.add_argument(
+        '--compare', required=False,
+        help='previous results file to compare against'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    results = []
+
+    for rows in args.sizes:
+        results.extend(benchmark_size(rows, args))
+
+    import pandas
+
+    output = {
+        'metadata': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pandas.__version__,
+            'platform': platform.platform(),
+            'settings': {
+                key: value for key, value in vars(args).items()
+                if key not in ('output', 'compare')
+            }
+        },
+        'results': results
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+
+    print(f'\nResults written to {args.output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
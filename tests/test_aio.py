@@ -0,0 +1,144 @@
+"""
+Tests for validating sample sheets from asyncio code with aio.py.
+
+Uses the example test samplesheet, validated from asyncio.run() so no
+asyncio pytest plugin is needed. Cancellation is checked with a registry of
+a slow check followed by one recording that it ran.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+import shutil
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath('../'))
+
+from validate import aio
+from validate.aio import validate_sheet_async, validate_sheets_async
+from validate import validate as validate_module
+from validate.checks import check_registry
+from validate.run_index import run_index
+from validate.validate import validate_sheet
+
+
+test_sample_sheet = f'{Path(__file__).parent.resolve()}/testSampleSheet.csv'
+
+errors = validate_sheet(test_sample_sheet)
+
+
+def test_same_errors_as_validate_sheet(monkeypatch):
+    """
+    Check errors are those of validate_sheet(), validated on the default
+    executor and in a process, and for a sheet large enough to be memory
+    mapped
+    """
+    assert asyncio.run(validate_sheet_async(test_sample_sheet)) == errors
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        assert asyncio.run(validate_sheet_async(
+            test_sample_sheet, executor=pool, use_pandas=False
+        )) == errors
+
+    monkeypatch.setattr(validate_module, 'MMAP_MIN_SIZE', 0)
+
+    assert asyncio.run(validate_sheet_async(
+        test_sample_sheet, use_pandas=False
+    )) == errors
+
+
+def test_concurrency_bounded(monkeypatch, tmp_path):
+    """
+    Check no more sheets are validated at once than the concurrency given,
+    and errors reading a sheet are returned for that sheet
+    """
+    running = []
+    most = []
+    lock = threading.Lock()
+
+    def slow_validate(sample_sheet, **kwargs):
+        with lock:
+            running.append(sample_sheet)
+            most.append(len(running))
+
+        time.sleep(0.02)
+
+        with lock:
+            running.remove(sample_sheet)
+
+        return validate_sheet(sample_sheet, **kwargs)
+
+    monkeypatch.setattr(aio, 'validate_sheet', slow_validate)
+
+    sheets = []
+
+    for num in range(6):
+        sheets.append(tmp_path / f'sheet_{num}.csv')
+        shutil.copy(test_sample_sheet, sheets[-1])
+
+    missing = tmp_path / 'missing.csv'
+    contents = bytearray(Path(test_sample_sheet).read_bytes())
+    results = asyncio.run(validate_sheets_async(
+        sheets + [contents, missing], concurrency=2
+    ))
+
+    assert max(most) == 2
+    assert all(x == errors for x in results[:-1])
+    assert results[-1]['file'][0].startswith('Failed to read sample sheet')
+
+
+def test_validated_again(tmp_path):
+    """
+    Check a sheet file validated again after being corrected replaces its
+    entry in the run index, so is not checked against its own indices
+    """
+    index = run_index(tmp_path / 'runs.sqlite')
+    sheet = tmp_path / 'SampleSheet.csv'
+    shutil.copy(test_sample_sheet, sheet)
+
+    first = asyncio.run(validate_sheet_async(
+        sheet, run_index=index, run='run-1'
+    ))
+
+    # correct the header, validated again as an edited sheet
+    sheet.write_bytes(
+        sheet.read_bytes().replace(b'Header,', b'[Header],', 1)
+    )
+    second = asyncio.run(validate_sheet_async(
+        sheet, run_index=index, run='run-1'
+    ))
+
+    assert second['index'] == first['index']
+    assert second['Sample_ID'] == first['Sample_ID']
+    assert index.sheets('run-1') == [str(sheet)]
+
+
+def test_timeout_stops_validating():
+    """
+    Check a sheet not validated within the timeout raises TimeoutError,
+    and checks after the one running when it timed out are not run
+    """
+    ran = []
+    checks = check_registry()
+
+    @checks.register('slow')
+    def slow(validate):
+        time.sleep(0.2)
+
+    @checks.register('after')
+    def after(validate):
+        ran.append('after')
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(validate_sheet_async(
+            test_sample_sheet, timeout=0.05, checks=checks
+        ))
+
+    # slow check finishes on its thread, then validating stops
+    time.sleep(0.3)
+
+    assert ran == []
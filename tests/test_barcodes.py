@@ -0,0 +1,214 @@
+"""
+Tests for comparing index barcodes in barcodes.py.
+
+Pigeonhole index results are checked against comparing every pair of a set
+of random barcodes, and the distance check against a small sample sheet with
+known similar barcodes:
+- rows 3 and 4 differ by 1 base in index and 2 in index2
+- rows 5 and 6 differ by 2 bases in index but are in different lanes
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath('../'))
+
+from validate import barcodes as barcodes_module
+from validate.barcodes import (
+    barcode_index, encode_index, find_close_barcodes, hamming,
+    packed_hamming, reverse_complement, reverse_complements, segment_bounds
+)
+from validate.validate import validate_sheet
+
+
+close_sheet = '\n'.join([
+    '[Header],,,,',
+    '[Data],,,,',
+    'Lane,Sample_ID,Sample_Name,index,index2',
+    '1,sample-1,sample-1,AAAAAAAA,CCCCCCCC',
+    '1,sample-2,sample-2,AAAAAAAT,CCCCCCGG',
+    '1,sample-3,sample-3,GGGGGGGG,TTTTTTTT',
+    '2,sample-4,sample-4,GGGGGGCC,TTTTTTTT',
+])
+
+
+def brute_force(barcodes, max_distance):
+    """
+    Compare every pair of barcodes to check index results against
+    """
+    close = []
+
+    for i in range(len(barcodes)):
+        for j in range(i + 1, len(barcodes)):
+            if [len(x) for x in barcodes[i]] != [len(x) for x in barcodes[j]]:
+                continue
+
+            distances = tuple(
+                hamming(a, b) for a, b in zip(barcodes[i], barcodes[j])
+            )
+
+            if any(distances) and all(x <= max_distance for x in distances):
+                close.append((i, j, distances))
+
+    return close
+
+
+def test_hamming():
+    """
+    Check mismatches counted between sequences
+    """
+    assert hamming('ACGT', 'ACGT') == 0
+    assert hamming('ACGT', 'TCGA') == 2
+
+
+def test_encode_index():
+    """
+    Check indices packed 2 bits per base, with indices of different lengths
+    packed differently and invalid or empty indices flagged as None
+    """
+    assert encode_index('ACGT') == 0b01_00_01_10_11
+    assert encode_index('A') != encode_index('AA')
+    assert encode_index('ACGN') is None
+    assert encode_index('acgt') is None
+    assert encode_index(float('nan')) is None
+
+
+def test_reverse_complements():
+    """
+    Check reverse complements of a column match those of each index, with
+    empty cells left as given
+    """
+    indices = ['AACG', float('nan'), 'GGTNA', '', 'ACGTxx']
+    reverse = reverse_complements(indices)
+
+    assert reverse[0] == reverse_complement('AACG') == 'CGTT'
+    assert isinstance(reverse[1], float)
+    assert reverse[2:] == ['TNACC', '', 'xxACGT']
+
+
+def test_packed_hamming():
+    """
+    Check mismatches of packed indices match those of the sequences
+    """
+    random.seed(0)
+
+    for _ in range(100):
+        first, second = (
+            ''.join(random.choices('ACGT', k=12)) for _ in range(2)
+        )
+
+        assert packed_hamming(
+            encode_index(first), encode_index(second)
+        ) == hamming(first, second)
+
+
+def test_segment_bounds():
+    """
+    Check sequence split into near equal segments covering full length
+    """
+    assert segment_bounds(10, 3) == [(0, 4), (4, 7), (7, 10)]
+
+
+@pytest.mark.parametrize('max_distance', [0, 1, 2, 3])
+def test_single_index_matches_brute_force(max_distance):
+    """
+    Check pigeonhole index finds same pairs as comparing every pair
+    """
+    random.seed(max_distance)
+    barcodes = [
+        (''.join(random.choices('ACGT', k=6)), ) for _ in range(300)
+    ]
+
+    assert find_close_barcodes(barcodes, max_distance) == brute_force(
+        barcodes, max_distance
+    )
+
+
+@pytest.mark.parametrize('max_distance', [1, 2])
+def test_dual_index_matches_brute_force(max_distance):
+    """
+    Check pairs found for dual indices where both must be close, including
+    mixed index lengths which are not compared
+    """
+    random.seed(max_distance)
+    barcodes = [
+        (
+            ''.join(random.choices('ACGT', k=random.choice([5, 6]))),
+            ''.join(random.choices('ACGT', k=5))
+        ) for _ in range(300)
+    ]
+
+    assert find_close_barcodes(barcodes, max_distance) == brute_force(
+        barcodes, max_distance
+    )
+
+
+def test_numpy_distances_match_brute_force(monkeypatch):
+    """
+    Check distances found over NumPy arrays where there are many pairs to
+    compare give the same pairs as comparing every pair
+    """
+    monkeypatch.setattr(barcodes_module, 'NUMPY_BARCODES', 0)
+
+    random.seed(0)
+    barcodes = [
+        (
+            ''.join(random.choices('ACGT', k=6)),
+            ''.join(random.choices('ACGT', k=6))
+        ) for _ in range(300)
+    ]
+
+    assert find_close_barcodes(barcodes, 2) == brute_force(barcodes, 2)
+
+
+def test_barcode_index_matches_brute_force():
+    """
+    Check barcodes added to an index one at a time find the same pairs as
+    comparing every pair, and removed barcodes are no longer found
+    """
+    random.seed(0)
+    barcodes = [
+        (
+            ''.join(random.choices('ACGT', k=random.choice([5, 6]))),
+            ''.join(random.choices('ACGTN', k=5))
+        ) for _ in range(300)
+    ]
+
+    index = barcode_index(2)
+    close = []
+
+    for num, barcode in enumerate(barcodes):
+        close.extend(
+            (other, num, distances)
+            for other, distances in index.add(num, barcode)
+        )
+
+    assert sorted(close) == brute_force(barcodes, 2)
+
+    for num in range(0, 300, 2):
+        index.remove(num)
+
+    assert len(index) == 150
+    assert all(
+        other % 2 for other, _ in index.add(300, barcodes[1])
+    )
+
+
+def test_close_indices_in_sheet(tmp_path):
+    """
+    Check close dual indices in the same lane are reported, and not those
+    in different lanes or with no mismatches allowed
+    """
+    sheet = tmp_path / 'close.csv'
+    sheet.write_text(close_sheet)
+
+    errors = validate_sheet(sheet, barcode_mismatches=1)
+
+    assert errors['index'] == [
+        'Indices in rows 4 and 5 collide with 1 barcode mismatch(es) '
+        'allowed: AAAAAAAA+CCCCCCCC and AAAAAAAT+CCCCCCGG'
+    ]
+
+    assert validate_sheet(sheet, barcode_mismatches=0)['index'] == []
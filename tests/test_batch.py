@@ -0,0 +1,103 @@
+"""
+Tests for validating batches of sample sheets with batch.py.
+
+Uses copies of the example test samplesheet alongside a sheet with no
+column names line, which should be reported as a failed sheet instead of
+stopping the batch.
+"""
+import os
+from pathlib import Path
+import shutil
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.batch import find_sample_sheets, validate_batch
+from validate.validate import validate_sheet
+
+
+test_sample_sheet = f'{Path(__file__).parent.resolve()}/testSampleSheet.csv'
+
+regex_pattern = "[0-9]{7}-[A-Z0-9]*-[A-Za-z0-9-()]*-MYE-[MF]-EGG2"
+
+
+@pytest.fixture
+def sheet_dir(tmp_path):
+    """
+    Directory of 3 copies of the test sample sheet and one invalid sheet
+    """
+    for num in range(3):
+        shutil.copy(test_sample_sheet, tmp_path / f'sheet_{num}.csv')
+
+    (tmp_path / 'invalid.csv').write_text('[Header],,\n')
+
+    return tmp_path
+
+
+def test_find_in_directory(sheet_dir):
+    """
+    Check all csv files in a directory are found
+    """
+    assert [Path(x).name for x in find_sample_sheets(str(sheet_dir))] == [
+        'invalid.csv', 'sheet_0.csv', 'sheet_1.csv', 'sheet_2.csv'
+    ]
+
+
+def test_find_from_glob(sheet_dir):
+    """
+    Check sheets matching a glob pattern are found
+    """
+    assert len(find_sample_sheets(f'{sheet_dir}/sheet_*.csv')) == 3
+
+
+def test_find_from_manifest(sheet_dir):
+    """
+    Check sheets listed in a manifest file are found, skipping blank lines
+    """
+    manifest = sheet_dir / 'manifest.txt'
+    manifest.write_text(
+        f'{sheet_dir}/sheet_1.csv\n\n{sheet_dir}/sheet_0.csv\n'
+    )
+
+    assert find_sample_sheets(str(manifest)) == [
+        f'{sheet_dir}/sheet_0.csv', f'{sheet_dir}/sheet_1.csv'
+    ]
+
+
+def test_validate_batch(sheet_dir):
+    """
+    Check each sheet in batch gives same errors as validating it alone,
+    and an unreadable sheet is reported as failed
+    """
+    sample_sheets = find_sample_sheets(str(sheet_dir))
+
+    results = validate_batch(sample_sheets, [regex_pattern], workers=2)
+
+    assert list(results.keys()) == sample_sheets
+
+    expected = validate_sheet(test_sample_sheet, regex_pattern)
+
+    for sheet in sample_sheets[1:]:
+        assert results[sheet] == expected
+
+    assert results[sample_sheets[0]]['file'][0].startswith(
+        'Failed to read sample sheet'
+    )
+
+
+def test_duplicate_paths(sheet_dir, capsys):
+    """
+    Check a path given twice is validated once with a warning, rather than
+    one result silently replacing the other
+    """
+    sheet = str(sheet_dir / 'sheet_1.csv')
+    other = str(sheet_dir / 'sheet_2.csv')
+
+    results = validate_batch(
+        [sheet, other, f'{sheet_dir}/./sheet_1.csv'], workers=1
+    )
+
+    assert list(results) == [sheet, other]
+    assert 'given more than once' in capsys.readouterr().out
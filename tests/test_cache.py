@@ -0,0 +1,114 @@
+"""
+Tests for caching validation results with cache.py.
+
+Checks cached results are returned for unchanged sheets and settings
+without parsing the sheet again, and that the cache is kept within its
+maximum size by removing the least recently used results.
+"""
+import os
+from pathlib import Path
+import shutil
+import sys
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.cache import result_cache
+from validate import validate as validate_module
+from validate.validate import validate_sheet
+
+
+test_sample_sheet = f'{Path(__file__).parent.resolve()}/testSampleSheet.csv'
+
+regex_pattern = "[0-9]{7}-[A-Z0-9]*-[A-Za-z0-9-()]*-MYE-[MF]-EGG2"
+
+
+def test_cached_result(tmp_path, monkeypatch):
+    """
+    Check second validation of unchanged sheet returns cached errors
+    without reading the sheet
+    """
+    cache = result_cache(tmp_path / 'cache')
+    sheet = tmp_path / 'sheet.csv'
+    shutil.copy(test_sample_sheet, sheet)
+
+    errors = validate_sheet(sheet, regex_pattern, cache=cache)
+
+    def not_called(file):
+        raise AssertionError('sheet parsed for cached result')
+
+    monkeypatch.setattr(validate_module, 'read_sheet', not_called)
+
+    assert validate_sheet(sheet, regex_pattern, cache=cache) == errors
+    assert errors == validate_sheet(
+        test_sample_sheet, regex_pattern, use_pandas=False
+    )
+
+
+def test_changed_sheet_or_settings(tmp_path):
+    """
+    Check changing sheet contents or settings does not use cached result
+    """
+    cache = result_cache(tmp_path / 'cache')
+    sheet = tmp_path / 'sheet.csv'
+    shutil.copy(test_sample_sheet, sheet)
+
+    data = sheet.read_bytes()
+    key = cache.key(data, [regex_pattern])
+
+    assert cache.key(data, regex_pattern) == key
+    assert cache.key(data, [regex_pattern], 1) != key
+    assert cache.key(data) != key
+    assert cache.key(data + b'\n', [regex_pattern]) != key
+
+    errors = validate_sheet(sheet, cache=cache)
+
+    # fix header error in sheet, should be validated again
+    sheet.write_bytes(data.replace(b'Header,', b'[Header],', 1))
+
+    assert validate_sheet(sheet, cache=cache)['header'] == errors['header'][1:]
+
+
+def test_eviction(tmp_path):
+    """
+    Check least recently used results are removed when over max size
+    """
+    cache = result_cache(tmp_path, max_size=250)
+    result = {'header': ['x' * 50]}
+
+    for key in ['a', 'b', 'c']:
+        cache.put(key, result)
+        os.utime(cache.path(key), (0, {'a': 1, 'b': 2, 'c': 3}[key]))
+
+    # using a marks it as most recently used, so b is removed next
+    assert cache.get('a') == result
+
+    cache.put('d', result)
+
+    assert sorted(x.name for x in tmp_path.iterdir()) == [
+        'a.json', 'c.json', 'd.json'
+    ]
+
+
+def test_eviction_scans(tmp_path, monkeypatch):
+    """
+    Check the cache directory is only scanned for results to remove once
+    the cache may be over max size, not each time a result is stored
+    """
+    cache = result_cache(tmp_path, max_size=1000)
+    scans = []
+    scandir = os.scandir
+
+    def count_scans(path):
+        scans.append(path)
+
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', count_scans)
+
+    for key in range(20):
+        cache.put(str(key), {'header': ['x' * 50]})
+
+    # scanned on first result stored, then only once over max size as
+    # results are removed to under it, not for every result stored
+    assert 1 < len(scans) <= 3
+    assert sum(x.stat().st_size for x in tmp_path.iterdir()) <= 1000
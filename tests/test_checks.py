@@ -0,0 +1,116 @@
+"""
+Tests for the registry of checks in checks.py, running site specific checks
+alongside the built in checks and running independent checks in parallel.
+"""
+import os
+from pathlib import Path
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.checks import check_registry
+from validate.validate import CHECKS, validate_sheet
+
+
+test_sample_sheet = f'{Path(__file__).parent.resolve()}/testSampleSheet.csv'
+
+errors = validate_sheet(test_sample_sheet)
+
+
+def sample_well(validate):
+    """
+    Example site specific check of Sample_Well values
+    """
+    for row, well in enumerate(validate.values('Sample_Well')):
+        if well not in ('A1', 'B1'):
+            continue
+
+        validate.add_error('Sample_Well', 'invalid_well', (
+            f'Sample well {well} is reserved in row '
+            f'{validate.header_count + row}'
+        ), row=validate.header_count + row, column='Sample_Well', value=well)
+
+
+def test_site_check_added_section():
+    """
+    Check site specific check adds its errors in its own section, without
+    changing the errors of the built in checks
+    """
+    checks = CHECKS.copy()
+    checks.register(
+        'sample_well', sample_well, reads=['Sample_Well'],
+        sections=['Sample_Well']
+    )
+
+    site_errors = validate_sheet(test_sample_sheet, checks=checks)
+
+    assert site_errors.pop('Sample_Well') == [
+        'Sample well A1 is reserved in row 22',
+        'Sample well B1 is reserved in row 23'
+    ]
+    assert site_errors == errors
+    assert 'sample_well' not in CHECKS
+
+
+def test_parallel_checks_same_errors():
+    """
+    Check running checks on a thread pool gives the same errors in the same
+    order as running them in turn
+    """
+    for use_pandas in (True, False):
+        assert validate_sheet(
+            test_sample_sheet, use_pandas=use_pandas, workers=4
+        ) == errors
+
+
+def test_independent_checks_run_at_same_time():
+    """
+    Check checks with no dependencies between them run at the same time,
+    each waits for the other to start so would time out if run in turn
+    """
+    started = threading.Barrier(2, timeout=5)
+    checks = check_registry()
+
+    for name in ('first', 'second'):
+        checks.register(name, lambda validate: started.wait())
+
+    validate_sheet(test_sample_sheet, checks=checks, workers=2)
+
+
+def test_dependency_order():
+    """
+    Check checks run after those named in after and those adding to the
+    same section registered before them, otherwise in order registered
+    """
+    checks = check_registry()
+    checks.register('a', print, sections=['one'], after=['c'])
+    checks.register('b', print, sections=['two'])
+    checks.register('c', print, sections=['three'])
+    checks.register('d', print, sections=['two'])
+
+    assert checks.dependencies() == {
+        'a': {'c'}, 'b': set(), 'c': set(), 'd': {'b'}
+    }
+    assert [x.name for x in checks.order()] == ['b', 'c', 'a', 'd']
+
+
+def test_invalid_dependencies():
+    """
+    Check unknown checks, cycles and duplicate names are rejected
+    """
+    checks = check_registry()
+    checks.register('a', print, after=['b'])
+
+    with pytest.raises(ValueError, match='unknown check b'):
+        checks.dependencies()
+
+    checks.register('b', print, after=['a'])
+
+    with pytest.raises(ValueError, match='cycle'):
+        checks.order()
+
+    with pytest.raises(ValueError, match='already registered'):
+        checks.register('a', print)
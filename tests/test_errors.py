@@ -0,0 +1,119 @@
+"""
+Tests for the store of errors found validating sheets in errors.py, with
+messages formatted only when read.
+"""
+import json
+import os
+from pathlib import Path
+import sys
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.errors import error_store
+from validate.validate import (
+    summarise_errors, validate_sheet, validate_sheet_errors
+)
+
+
+test_sample_sheet = f'{Path(__file__).parent.resolve()}/testSampleSheet.csv'
+
+errors = validate_sheet_errors(test_sample_sheet)
+
+
+class format_counter(str):
+    """
+    Template counting the times it is formatted
+    """
+    formatted = 0
+
+    def format(self, *args, **kwargs):
+        format_counter.formatted += 1
+
+        return super().format(*args, **kwargs)
+
+
+def test_messages_formatted_when_read():
+    """
+    Check templates are only formatted when messages are read, and not to
+    count errors
+    """
+    store = error_store(['index'])
+    template = format_counter('Invalid index {value} at row {row}')
+
+    for row in range(100):
+        store.add(
+            'invalid_index_characters', 'index', template, row=row,
+            column='index', value='ACGX', template=True
+        )
+
+    assert len(store['index']) == 100
+    assert store.counts() == {('index', 'invalid_index_characters'): 100}
+    assert format_counter.formatted == 0
+
+    assert store['index'][5] == 'Invalid index ACGX at row 5'
+    assert format_counter.formatted == 1
+
+
+def test_identical_errors_removed():
+    """
+    Check identical errors are removed, and errors differing in row or
+    detail are kept
+    """
+    store = error_store()
+    template = 'Duplicate {value}{lane} at rows {row}'
+
+    for row, lane in ((1, ''), (1, ''), (2, ''), (1, ' in lane 2')):
+        store.add(
+            'duplicate_index', 'index', template, row=[row, 3],
+            value='AAAA', template=True, detail={'lane': lane}
+        )
+
+    assert store.deduplicate() == 1
+    assert store == {'index': [
+        'Duplicate AAAA at rows 1, 3', 'Duplicate AAAA at rows 2, 3',
+        'Duplicate AAAA in lane 2 at rows 1, 3'
+    ]}
+
+
+def test_store_read_as_dict():
+    """
+    Check errors compare equal to a dict of lists of messages, and are the
+    same after a round trip through JSON
+    """
+    as_dict = errors.to_dict()
+
+    assert isinstance(as_dict['index'], list)
+    assert errors == as_dict
+    assert dict(errors) == as_dict
+
+    from_json = error_store.from_json(
+        json.loads(json.dumps(errors.to_json()))
+    )
+
+    assert from_json == errors
+    assert from_json.counts() == errors.counts()
+
+
+def test_validate_sheet_json():
+    """
+    Check validate_sheet() returns a plain dict of the same messages, which
+    may be written as JSON
+    """
+    as_dict = validate_sheet(test_sample_sheet)
+
+    assert type(as_dict) is dict
+    assert json.loads(json.dumps(as_dict)) == errors
+
+
+def test_summary():
+    """
+    Check errors counted by code in each section
+    """
+    assert summarise_errors(errors)['header'][:3] == [
+        '1 error(s): first line of header is not [Header]',
+        '1 error(s): no investigator name given',
+        '1 error(s): no experiment name given'
+    ]
+    assert sum(errors.counts().values()) == sum(
+        len(x) for x in errors.values()
+    )
@@ -0,0 +1,224 @@
+"""
+Tests for checking index2 orientation against index kits with
+index_kits.py.
+
+The index kit is written to a temporary file, with made up sequences. Its
+i5 sequences are in the forward orientation, the sheet gives the first two
+as written (forward) and the third reverse complemented.
+"""
+from http.client import HTTPConnection
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.batch import validate_batch
+from validate.index_kits import (
+    instrument_orientation, load_index_kits, read_index_kit
+)
+from validate.server import make_server
+from validate.validate import validate_sheet
+
+
+index_kit = '\n'.join([
+    '[Kit],,',
+    'Name,test_kit,',
+    '[Indices],,',
+    'Name,Sequence,IndexReadNumber',
+    'UDI1,AACCAACC,1',
+    'UDI2,GGTTGGTT,1',
+    'UDI3,ACACACAC,1',
+    'UDI1,AAAGGGTT,2',
+    'UDI2,CCCAAAGT,2',
+    'UDI3,GATTACAG,2',
+])
+
+
+def make_sheet(instrument, rows):
+    """
+    v1 sheet for instrument with given (Sample_ID, index, index2) rows
+    """
+    return '\n'.join([
+        '[Header]',
+        'Investigator Name,me',
+        'Experiment Name,run-1',
+        f'Instrument Type,{instrument}',
+        '[Reads]',
+        '151',
+        '[Data]',
+        'Sample_ID,index,index2',
+        *[','.join(x) for x in rows]
+    ]) + '\n'
+
+
+kit_rows = [
+    ('sample-1', 'AACCAACC', 'AAAGGGTT'),
+    ('sample-2', 'GGTTGGTT', 'CCCAAAGT'),
+    ('sample-3', 'ACACACAC', 'CTGTAATC')
+]
+
+
+@pytest.fixture
+def kit_path(tmp_path):
+    path = tmp_path / 'test_kit.csv'
+    path.write_text(index_kit)
+
+    return path
+
+
+def test_read_index_kit(kit_path):
+    """
+    Check indices read from kit file with the kit name, and kits loaded
+    once per process
+    """
+    indices = read_index_kit(kit_path)
+
+    assert indices[0] == ('test_kit', 'UDI1', 'AACCAACC', 1)
+    assert indices[-1] == ('test_kit', 'UDI3', 'GATTACAG', 2)
+
+    kits = load_index_kits((str(kit_path), ))
+
+    assert kits is load_index_kits((str(kit_path), ))
+    assert kits.i5_orientation('CTGTAATC') == [
+        ('reverse', 'test_kit', 'UDI3')
+    ]
+
+
+def test_instrument_orientation(kit_path):
+    """
+    Check index2 in the orientation not read by the instrument found,
+    from the instrument in the header or given
+    """
+    sheet = make_sheet('MiSeq', kit_rows)
+    expected = [
+        'Index2 CTGTAATC at row 11 matches i5 index UDI3 of test_kit in the '
+        'reverse orientation, MiSeq reads i5 in the forward orientation'
+    ]
+
+    assert instrument_orientation('MiSeq') == 'forward'
+    assert validate_sheet(sheet, index_kits=kit_path)['index2'] == expected
+
+    # NextSeq reads the reverse complement, so the first two are wrong
+    errors = validate_sheet(
+        make_sheet('NextSeq 550', kit_rows), index_kits=[kit_path],
+        i5_orientation='auto'
+    )
+
+    assert [x.split(' ')[1] for x in errors['index2']] == [
+        'AAAGGGTT', 'CCCAAAGT'
+    ]
+
+    errors = validate_sheet(
+        make_sheet('NovaSeq', kit_rows), index_kits=kit_path,
+        i5_orientation='forward'
+    )
+
+    assert errors['index2'] == [
+        expected[0].replace('MiSeq', 'NovaSeq')
+    ]
+
+
+def test_unknown_instrument(kit_path):
+    """
+    Check index2 in the opposite orientation to the rest of the sheet found
+    where the instrument is not known
+    """
+    errors = validate_sheet(
+        make_sheet('NovaSeq', kit_rows), index_kits=kit_path
+    )
+
+    assert errors['index2'] == [
+        'Index2 CTGTAATC at row 11 matches i5 index UDI3 of test_kit in the '
+        'reverse orientation, other index2 in the sheet match the forward '
+        'orientation'
+    ]
+
+
+def test_reverse_complement_duplicates():
+    """
+    Check index + index2 the reverse complement of another found, and with
+    barcode mismatches those too similar to the reverse complement
+    """
+    sheet = make_sheet('MiSeq', [
+        ('sample-1', 'AACCAACC', 'AAAGGGTT'),
+        ('sample-2', 'AACCAACC', 'AACCCTTT'),
+        ('sample-3', 'GGTTGGTT', 'CCCAAAGT'),
+        ('sample-4', 'GGTTGGTT', 'ACTTTGCG')
+    ])
+
+    errors = validate_sheet(sheet, i5_orientation='forward')
+
+    assert errors['index'] == []
+    assert errors['index2'] == [
+        'Index2 AACCCTTT at row 10 is the reverse complement of index2 '
+        'AAAGGGTT at row 9 with the same index AACCAACC'
+    ]
+
+    errors = validate_sheet(
+        sheet, barcode_mismatches=1, i5_orientation='forward'
+    )
+
+    assert errors['index2'][1:] == [
+        'Indices GGTTGGTT+CCCAAAGT at row 11 collide with GGTTGGTT+CGCAAAGT '
+        '(index2 of row 12 reverse complemented) with 1 barcode '
+        'mismatch(es) allowed'
+    ]
+
+
+def test_invalid_orientation():
+    """
+    Check unknown orientations rejected
+    """
+    with pytest.raises(ValueError, match='Invalid i5 orientation'):
+        validate_sheet(make_sheet('MiSeq', kit_rows), i5_orientation='up')
+
+
+def test_batch_and_server(kit_path, tmp_path):
+    """
+    Check index kits and i5 orientation are used validating sheets in a
+    batch and by the server, and settings that can't be are rejected
+    """
+    sheet = tmp_path / 'SampleSheet.csv'
+    sheet.write_text(make_sheet('NovaSeq', kit_rows))
+
+    expected = validate_sheet(
+        sheet, index_kits=kit_path, i5_orientation='forward'
+    )
+
+    assert expected['index2']
+    assert validate_batch(
+        [str(sheet)], workers=1, index_kits=kit_path,
+        i5_orientation='forward'
+    )[str(sheet)] == expected
+
+    server = make_server(
+        port=0, workers=1, index_kits=kit_path, i5_orientation='forward'
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        connection = HTTPConnection(*server.server_address)
+        connection.request('POST', '/validate', body=sheet.read_bytes())
+
+        assert json.loads(connection.getresponse().read()) == expected
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    validate_script = os.path.join(
+        os.path.dirname(__file__), '..', 'validate', 'validate.py'
+    )
+
+    for option in (['--run_index', 'runs.sqlite'], ['--timings']):
+        result = subprocess.run(
+            [sys.executable, validate_script, '--batch', str(tmp_path)] +
+            option, capture_output=True, text=True
+        )
+
+        assert result.returncode == 2
+        assert f'{option[0]} requires --samplesheet' in result.stderr
@@ -0,0 +1,138 @@
+"""
+Tests for checking sheets against other sheets registered for the same run
+with run_index.py.
+
+Sheets are v2 sheets for run-1 (from RunName) with two lanes, sheets given
+as files are registered by path and sheets given in memory by their rows.
+"""
+import os
+import sys
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.run_index import run_index
+from validate.validate import validate_sheet
+
+
+def make_sheet(rows, run='run-1', columns='Lane,Sample_ID,Index,Index2'):
+    """
+    v2 sheet for run with given rows, (Lane, Sample_ID, Index, Index2) by
+    default
+    """
+    return '\n'.join([
+        '[Header]',
+        'FileFormatVersion,2',
+        f'RunName,{run}',
+        '[Reads]',
+        'Read1Cycles,151',
+        '[BCLConvert_Data]',
+        columns,
+        *[','.join(x) for x in rows]
+    ]) + '\n'
+
+
+first_sheet = make_sheet([
+    ('1', 'sample-1', 'AAAAAAAA', 'CCCCCCCC'),
+    ('2', 'sample-2', 'GGGGGGGG', 'TTTTTTTT')
+])
+
+
+def test_sheet_registered_again(tmp_path):
+    """
+    Check a sheet registered again replaces itself, so is not checked
+    against its own indices and Sample_IDs
+    """
+    index = run_index(tmp_path / 'runs.sqlite')
+    sheet = tmp_path / 'SampleSheet.csv'
+    sheet.write_text(first_sheet)
+
+    for _ in range(2):
+        assert not any(validate_sheet(sheet, run_index=index).values())
+
+    assert index.sheets('run-1') == [str(sheet)]
+
+
+def test_named_sheet_registered_again(tmp_path):
+    """
+    Check a sheet given in memory with a sheet name replaces itself when
+    an edited version is validated, rather than being registered again
+    """
+    index = run_index(tmp_path / 'runs.sqlite')
+    edited = make_sheet([
+        ('1', 'sample-1', 'AAAAAAAA', 'CCCCCCCC'),
+        ('2', 'sample-2', 'GGGGGGGG', 'TTTTTTTA')
+    ])
+
+    for sheet in (first_sheet, edited.encode()):
+        assert not any(validate_sheet(
+            sheet, run_index=index, sheet_name='pool-1'
+        ).values())
+
+    assert index.sheets('run-1') == ['pool-1']
+
+
+def test_duplicates_across_sheets(tmp_path):
+    """
+    Check indices used by another sheet for the same lane of the run are
+    found, and Sample_IDs registered for another run
+    """
+    index = run_index(tmp_path / 'runs.sqlite')
+    validate_sheet(first_sheet, run_index=index)
+
+    errors = validate_sheet(make_sheet([
+        ('1', 'sample-3', 'AAAAAAAA', 'CCCCCCCC'),
+        ('1', 'sample-4', 'GGGGGGGG', 'TTTTTTTT')
+    ]), run_index=index)
+
+    assert errors['index'] == [
+        'Indices AAAAAAAA+CCCCCCCC in row 8 in lane 1 are already used by '
+        f'sample-1 in sheet {index.sheets("run-1")[0]} registered for run '
+        'run-1'
+    ]
+
+    # same sample sequenced again on another run
+    errors = validate_sheet(make_sheet([
+        ('1', 'sample-1', 'AAAAAAAA', 'CCCCCCCC')
+    ], run='run-2'), run_index=index)
+
+    assert errors['index'] == []
+    assert errors['Sample_ID'] == [
+        'Sample ID sample-1 in row 8 is already registered in sheet '
+        f'{index.sheets("run-1")[0]} for run run-1'
+    ]
+
+
+def test_collisions_across_sheets(tmp_path):
+    """
+    Check indices too similar to those of another sheet are found with
+    barcode mismatches given, and sheets with no Lane column are checked
+    against every lane
+    """
+    index = run_index(tmp_path / 'runs.sqlite')
+    validate_sheet(first_sheet, run_index=index)
+
+    sheet = make_sheet(
+        [('sample-5', 'GGGGGGGA', 'TTTTTTTT')],
+        columns='Sample_ID,Index,Index2'
+    )
+
+    assert validate_sheet(sheet, run_index=index)['index'] == []
+
+    errors = validate_sheet(sheet, barcode_mismatches=1, run_index=index)
+
+    assert errors['index'] == [
+        'Indices GGGGGGGA+TTTTTTTT in row 8 collide with GGGGGGGG+TTTTTTTT of '
+        f'sample-2 in sheet {index.sheets("run-1")[0]} registered for run '
+        'run-1 with 1 barcode mismatch(es) allowed'
+    ]
+
+
+def test_no_run(tmp_path):
+    """
+    Check sheets with no run given or in their header are not registered
+    """
+    index = run_index(tmp_path / 'runs.sqlite')
+
+    validate_sheet(first_sheet.replace('RunName,run-1', ''), run_index=index)
+
+    assert index.sheets('run-1') == []
@@ -0,0 +1,125 @@
+"""
+Tests for checking sample sheet headers against header schemas with
+schema.py.
+
+Uses the example test samplesheet (a NovaSeq v1 sheet) with a schema for
+NovaSeq sheets only, requiring a Date and Assay from a set of allowed
+assays (the test sheet gives TruSeq), and checking the Date format.
+"""
+import json
+import os
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.schema import header_schema, load_schemas
+from validate.validate import validate_sheet
+
+
+test_sample_sheet = f'{Path(__file__).parent.resolve()}/testSampleSheet.csv'
+
+novaseq_schema = {
+    'name': 'novaseq',
+    'version': 1,
+    'match': {'Header': {'Instrument Type': 'NovaSeq'}},
+    'sections': {
+        'Header': {
+            'keys': {
+                'Assay': {'allowed': ['Nextera XT', 'Illumina DNA Prep']},
+                'Date': {
+                    'required': True, 'pattern': r'[0-9]{2}/[0-9]{2}/[0-9]{4}'
+                },
+                'Chemistry': {'required': True}
+            }
+        }
+    }
+}
+
+errors = validate_sheet(test_sample_sheet)
+
+
+def write_schema(path, schema):
+    path.write_text(json.dumps(schema))
+
+    return path
+
+
+def test_instrument_schema(tmp_path):
+    """
+    Check schema matching instrument of sheet used in place of the default,
+    giving errors for values not allowed and missing required keys
+    """
+    schema = write_schema(tmp_path / 'novaseq.json', novaseq_schema)
+
+    schema_errors = validate_sheet(test_sample_sheet, header_schema=schema)
+
+    assert schema_errors['header'] == [
+        'Error in line 1 of header: value should be [Header]',
+        'Error in value of Assay for [Header] given on line 9: TruSeq',
+        'Error in [Header]: required key Chemistry not given',
+        'Error in line 20: the first cell should contain [Data]'
+    ]
+
+    # only header errors change
+    schema_errors.pop('header')
+    assert schema_errors == {
+        key: value for key, value in errors.items() if key != 'header'
+    }
+
+
+def test_schema_not_matching(tmp_path):
+    """
+    Check default schema used where given schemas do not match the sheet
+    """
+    schema = dict(novaseq_schema)
+    schema['match'] = {'Header': {'Instrument Type': 'MiSeq'}}
+
+    schema_dir = tmp_path / 'schemas'
+    schema_dir.mkdir()
+    write_schema(schema_dir / 'miseq.json', schema)
+
+    assert validate_sheet(
+        test_sample_sheet, header_schema=schema_dir
+    ) == errors
+
+
+def test_yaml_schema(tmp_path):
+    """
+    Check schema read from YAML gives the same errors as from JSON
+    """
+    yaml = pytest.importorskip('yaml')
+
+    json_schema = write_schema(tmp_path / 'novaseq.json', novaseq_schema)
+    yaml_schema = tmp_path / 'novaseq.yaml'
+    yaml_schema.write_text(yaml.safe_dump(novaseq_schema))
+
+    assert validate_sheet(
+        test_sample_sheet, header_schema=yaml_schema
+    ) == validate_sheet(test_sample_sheet, header_schema=json_schema)
+
+
+def test_schema_compiled_once(tmp_path):
+    """
+    Check loading the same schema file again reuses the compiled schema
+    """
+    schema = write_schema(tmp_path / 'novaseq.json', novaseq_schema)
+
+    assert load_schemas(schema)[0] is load_schemas([str(schema)])[0]
+
+
+def test_invalid_schema():
+    """
+    Check unknown rules and types are rejected when compiling schema
+    """
+    with pytest.raises(ValueError, match='Unknown schema rule'):
+        header_schema({'sections': {'Header': {'keys': {'Date': {
+            'format': 'date'
+        }}}}})
+
+    with pytest.raises(ValueError, match='Invalid type'):
+        header_schema({'sections': {'Header': {'keys': {'Date': {
+            'type': 'date'
+        }}}}})
@@ -0,0 +1,133 @@
+"""
+Tests for indexing sections of sample sheets with sections.py, and for
+validating v2 (BCL Convert) sample sheets.
+
+The v2 sheet has a [Cloud_Data] section after [BCLConvert_Data] which
+should not be read as samples, and errors introduced:
+- Index1Cycles is not an integer (line 8)
+- AdapterRead2 has invalid characters (line 12)
+- index + index2 of samples 2 and 3 in lane 1 are duplicated (rows 17, 18)
+"""
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.sections import sheet_sections
+from validate.validate import read_sheet, read_sheet_records, validate_sheet
+
+
+v2_sheet = '\n'.join([
+    '[Header],,,',
+    'FileFormatVersion,2,,',
+    'RunName,run-1,,',
+    'InstrumentPlatform,NovaSeqXSeries,,',
+    ',,,',
+    '[Reads],,,',
+    'Read1Cycles,151,,',
+    'Index1Cycles,ten,,',
+    'Read2Cycles,151,,',
+    '[BCLConvert_Settings],,,',
+    'AdapterRead1,CTGTCTCTTATACACATCT+AGATGTGTATAAGAGACAG,,',
+    'AdapterRead2,CTGTCTCTTATACACATCTxx,,',
+    '[BCLConvert_Data],,,',
+    'Lane,Sample_ID,Index,Index2',
+    '1,sample-1,AAAAAAAA,CCCCCCCC',
+    '2,sample-1,AAAAAAAA,CCCCCCCC',
+    '1,sample-2,GGGGGGGG,TTTTTTTT',
+    '1,sample-3,GGGGGGGG,TTTTTTTT',
+    ',,,',
+    '[Cloud_Data],,,',
+    'Sample_ID,ProjectName,LibraryName,',
+    'sample-1,project,library-1,',
+])
+
+
+@pytest.fixture
+def v2_path(tmp_path):
+    path = tmp_path / 'SampleSheet.csv'
+    path.write_text(v2_sheet)
+
+    return path
+
+
+def test_sections_indexed():
+    """
+    Check sections found by name with line numbers, and keys looked up
+    """
+    sections = sheet_sections(v2_sheet.splitlines()[:14])
+
+    assert sections.names() == [
+        'Header', 'Reads', 'BCLConvert_Settings', 'BCLConvert_Data'
+    ]
+    assert sections.version == 2
+    assert sections.data_section == 'BCLConvert_Data'
+    assert sections['Reads'].first_line == 7
+    assert sections['Reads'].get('Read2Cycles') == '151'
+    assert sections['Reads'].line('Read2Cycles') == 9
+    assert sections.get('Settings').get('Adapter') is None
+
+
+def test_lines_before_first_section():
+    """
+    Check lines before any [Section] line are indexed as Header
+    """
+    sections = sheet_sections([
+        'Header,,', 'Investigator Name,,', '[Data],,', 'Sample_ID,index,'
+    ])
+
+    assert sections.names() == ['Header', 'Data']
+    assert sections['Header'].line('Investigator Name') == 2
+    assert sections.version == 1
+
+
+@pytest.mark.parametrize('reader', [read_sheet, read_sheet_records])
+def test_v2_data_section_read(v2_path, reader):
+    """
+    Check only rows of [BCLConvert_Data] are read as samples, and sections
+    after it are indexed with their line numbers
+    """
+    body, header, header_count, sections = reader(v2_path)
+
+    assert header_count == 14
+    assert len(body) == 4
+    assert sections['Cloud_Data'].first_line == 21
+    assert sections['Cloud_Data'].get('sample-1') == 'project'
+
+
+def test_v2_read_once(v2_path):
+    """
+    Check the data section of a v2 sheet is parsed from the lines already
+    read, without seeking back to read them from the file again
+    """
+    class unseekable(io.StringIO):
+        def seek(self, *args):
+            raise AssertionError('sheet read twice')
+
+    body = read_sheet(unseekable(v2_sheet))[0]
+
+    assert body.equals(read_sheet(v2_path)[0])
+    assert body['Sample_ID'].tolist() == [
+        'sample-1', 'sample-1', 'sample-2', 'sample-3'
+    ]
+
+
+def test_v2_sheet_errors(v2_path):
+    """
+    Check v2 sheet validated against its own sections, with the same
+    errors from either reader
+    """
+    errors = validate_sheet(v2_path)
+
+    assert errors['header'] == [
+        'Error in value of Index1Cycles for [Reads] given on line 8: ten',
+        'Error in line 12: invalid adapter sequence CTGTCTCTTATACACATCTxx'
+    ]
+    assert errors['index'] == [
+        'Duplicate indices found in lane 1: GGGGGGGG+TTTTTTTT at rows 17, 18'
+    ]
+    assert not errors['Sample_ID']
+    assert errors == validate_sheet(v2_path, use_pandas=False)
@@ -0,0 +1,128 @@
+"""
+Tests for the validation server in server.py.
+
+Servers are started on a free port and on a Unix socket in a background
+thread, and results compared to calling validate_sheet() directly.
+"""
+from http.client import HTTPConnection
+import json
+import os
+from pathlib import Path
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.server import make_server
+from validate.validate import validate_sheet
+
+
+test_sample_sheet = f'{Path(__file__).parent.resolve()}/testSampleSheet.csv'
+
+regex_pattern = "[0-9]{7}-[A-Z0-9]*-[A-Za-z0-9-()]*-MYE-[MF]-EGG2"
+
+
+class unix_connection(HTTPConnection):
+    """
+    HTTP connection over a Unix socket
+    """
+    def __init__(self, socket_path):
+        super().__init__('localhost')
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def request(connection, method, path, body=None):
+    """
+    Send request to server, returning response status and decoded JSON
+    """
+    connection.request(method, path, body=json.dumps(body) if body else None)
+    response = connection.getresponse()
+
+    return response.status, json.loads(response.read())
+
+
+@pytest.fixture
+def server():
+    """
+    Server on a free local port, run in a background thread
+    """
+    server = make_server(port=0, regex_patterns=[regex_pattern], workers=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_validate_request(server):
+    """
+    Check errors returned by server match validating sheet directly
+    """
+    connection = HTTPConnection(*server.server_address)
+    status, errors = request(
+        connection, 'POST', '/validate', {'samplesheet': test_sample_sheet}
+    )
+
+    assert status == 200
+    assert errors == validate_sheet(test_sample_sheet, regex_pattern)
+
+
+def test_bad_requests(server):
+    """
+    Check missing sheet path, unreadable sheet and unknown paths give errors
+    """
+    connection = HTTPConnection(*server.server_address)
+
+    assert request(connection, 'POST', '/validate', {'sheet': 'x'})[0] == 400
+    assert request(
+        connection, 'POST', '/validate', {'samplesheet': '/no/such/sheet'}
+    )[0] == 400
+    assert request(connection, 'GET', '/unknown')[0] == 404
+    assert request(connection, 'GET', '/health') == (200, {'status': 'ok'})
+
+
+def test_upload_request(server):
+    """
+    Check sheet sent as the request body, with settings in the query
+    string, gives the same errors as validating the file
+    """
+    connection = HTTPConnection(*server.server_address)
+    connection.request(
+        'POST', '/validate?barcode_mismatches=1',
+        body=Path(test_sample_sheet).read_bytes()
+    )
+    response = connection.getresponse()
+
+    assert response.status == 200
+    assert json.loads(response.read()) == validate_sheet(
+        test_sample_sheet, regex_pattern, barcode_mismatches=1
+    )
+
+
+def test_unix_socket(tmp_path):
+    """
+    Check server can listen on a Unix socket, which is removed on close
+    """
+    socket_path = str(tmp_path / 'validate.sock')
+    server = make_server(socket_path=socket_path, workers=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    status, errors = request(
+        unix_connection(socket_path), 'POST', '/validate',
+        {'samplesheet': test_sample_sheet, 'barcode_mismatches': 1}
+    )
+
+    server.shutdown()
+    server.server_close()
+
+    assert status == 200
+    assert errors == validate_sheet(test_sample_sheet, barcode_mismatches=1)
+    assert not os.path.exists(socket_path)
@@ -0,0 +1,69 @@
+"""
+Tests for recording timings of validation steps with timings.py.
+"""
+import os
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.cache import result_cache
+from validate.timings import validation_timings
+from validate.validate import validate_sheet
+
+
+test_sample_sheet = f'{Path(__file__).parent.resolve()}/testSampleSheet.csv'
+
+
+def test_steps_recorded():
+    """
+    Check each step recorded with rows processed and errors added, and
+    timings do not change errors returned
+    """
+    timings = validation_timings()
+    errors = validate_sheet(test_sample_sheet, timings=timings)
+
+    assert errors == validate_sheet(test_sample_sheet)
+
+    assert [x['step'] for x in timings.steps] == [
+        'read', 'header', 'sample_id', 'sample_name', 'indices'
+    ]
+    assert [x['rows'] for x in timings.steps] == [53, 21, 32, 32, 32]
+    assert sum(x['errors'] for x in timings.steps) == sum(
+        len(x) for x in errors.values()
+    )
+    assert timings.total() == sum(x['seconds'] for x in timings.steps)
+
+
+def test_cached_steps(tmp_path):
+    """
+    Check only cache lookup step recorded for a cached result
+    """
+    cache = result_cache(tmp_path)
+    validate_sheet(test_sample_sheet, cache=cache)
+
+    timings = validation_timings()
+    validate_sheet(test_sample_sheet, cache=cache, timings=timings)
+
+    assert [x['step'] for x in timings.steps] == ['cache']
+
+
+def test_profilers():
+    """
+    Check peak memory recorded with tracemalloc, and functions called are
+    included in report with cProfile
+    """
+    timings = validation_timings('tracemalloc')
+    validate_sheet(test_sample_sheet, use_pandas=False, timings=timings)
+
+    assert all(x['peak_memory_bytes'] > 0 for x in timings.steps)
+
+    timings = validation_timings('cprofile')
+    validate_sheet(test_sample_sheet, use_pandas=False, timings=timings)
+
+    assert 'check_duplicate_ids' in timings.report(top=None)
+
+    with pytest.raises(ValueError):
+        validation_timings('perf')
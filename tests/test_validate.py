@@ -21,16 +21,31 @@ Errors introduced and covered by tests:
 - Check for duplicate sample ID and sample name (duplicated last 2 of both)
 
 """
+import bz2
+import gzip
+import io
+import json
+import lzma
+import mmap
 import os
 from pathlib import Path
+import subprocess
 import sys
+import time
 
 import pandas as pd
 import pytest
 
 sys.path.append(os.path.abspath('../'))
 
-from validate.validate import validate_sheet, validators, read_sheet
+from benchmarks.generate_sheet import SAMPLE_ID_REGEX, generate_sheet
+from validate import validate as validate_module
+from validate.cache import result_cache
+from validate.timings import validation_timings
+from validate.validate import (
+    ERROR_CODES, find_duplicates, pattern_set, validate_sheet, validators,
+    read_sheet
+)
 
 
 # test sample sheet with known errors
@@ -43,6 +58,9 @@ regex_pattern = "[0-9]{7}-[A-Z0-9]*-[A-Za-z0-9-()]*-MYE-[MF]-EGG2"
 sample_sheet = read_sheet(test_sample_sheet)
 validate = validators(sample_sheet, regex_pattern)
 errors = validate_sheet(test_sample_sheet, regex_pattern)
+errors_with_mismatches = validate_sheet(
+    test_sample_sheet, regex_pattern, barcode_mismatches=1
+)
 
 for key, error in errors.items():
     # if running directly, show error messages for testing
@@ -129,16 +147,49 @@ def test_index2():
 
 def test_duplicate_index():
     """
-    Check for duplciates in index column
+    Check for duplicate index + index2 combinations, reported once for the
+    combination instead of for each index column
     """
-    assert "Duplicate indices found in index: CACGAGTATG" in errors["index"]
+    assert (
+        "Duplicate indices found: CACGAGTATG+CGCTAAGGCT at rows 52, 53"
+    ) in errors["index"]
+    assert not any('Duplicate' in x for x in errors["index2"])
 
 
-def test_duplicate_index2():
+def test_duplicate_index_lanes(tmp_path):
     """
-    Check for duplciates in index2 column
+    Check indices reused in different lanes are allowed, and combinations
+    of indices are only duplicates where both indices match in a lane
     """
-    assert "Duplicate indices found in index2: CGCTAAGGCT" in errors["index2"]
+    sheet = tmp_path / 'lanes.csv'
+    sheet.write_text('\n'.join([
+        '[Header],,,,',
+        '[Data],,,,',
+        'Lane,Sample_ID,Sample_Name,index,index2',
+        '1,sample-1,sample-1,AAAAAAAA,CCCCCCCC',
+        '2,sample-2,sample-2,AAAAAAAA,CCCCCCCC',
+        '1,sample-3,sample-3,AAAAAAAA,GGGGGGGG',
+        '2,sample-4,sample-4,AAAAAAAA,CCCCCCCC',
+    ]))
+
+    assert validate_sheet(sheet)['index'] == [
+        'Duplicate indices found in lane 2: AAAAAAAA+CCCCCCCC at rows 5, 7'
+    ]
+
+    # single indexed sheet with no Lane column
+    sheet.write_text('\n'.join([
+        '[Header],,',
+        '[Data],,',
+        'Sample_ID,Sample_Name,index',
+        'sample-1,sample-1,AAAAAAAA',
+        'sample-2,sample-2,CCCCCCCC',
+        'sample-3,sample-3,AAAAAAAA',
+    ]))
+
+    for use_pandas in (True, False):
+        assert validate_sheet(sheet, use_pandas=use_pandas)['index'] == [
+            'Duplicate indices found: AAAAAAAA at rows 4, 6'
+        ]
 
 
 def test_id_invalid_characters():
@@ -195,5 +246,522 @@ def test_duplicate_id():
     """
     assert ((
         "Duplicate sample ID found in same lane and / or with same indices: "
-        "2107383-21236Z0079-BM-MPD-MYE-F-EGG2"
+        "2107383-21236Z0079-BM-MPD-MYE-F-EGG2 in rows 52, 53"
     )) in errors["Sample_ID"]
+
+
+def test_column_names_read():
+    """
+    Check column names are read from the header in the same pass, without
+    trailing newline on the last column
+    """
+    assert sample_sheet[0].columns.tolist() == [
+        'Sample_ID', 'Sample_Name', 'Sample_Plate', 'Sample_Well',
+        'Index_Plate_Well', 'index', 'index2'
+    ]
+    assert len(sample_sheet[0].index) == 32
+
+
+def test_no_column_names(tmp_path):
+    """
+    Check a sheet without a Sample_ID column names line raises an error
+    """
+    no_data = tmp_path / 'no_data.csv'
+    no_data.write_text('[Header],,\nIEMFileVersion,5,\n')
+
+    with pytest.raises(ValueError):
+        read_sheet(no_data)
+
+
+def test_find_duplicates():
+    """
+    Check rows are grouped on all given columns, only returning groups
+    found on more than one row
+    """
+    sample_ids = ['a', 'a', 'a', 'b', 'b']
+    lanes = [1, 1, 2, 1, 1]
+    indices = ['AAA', 'AAA', 'AAA', 'CCC', 'GGG']
+
+    assert find_duplicates(sample_ids, lanes, indices) == {
+        ('a', 1, 'AAA'): [0, 1]
+    }
+    assert find_duplicates(sample_ids) == {('a', ): [0, 1, 2], ('b', ): [3, 4]}
+
+
+def test_only_column_names_line():
+    """
+    Check a parsed sheet with only the column names line in its header is
+    not reported as missing [Data] on the line before (line 0)
+    """
+    body = pd.DataFrame({
+        'Sample_ID': ['sample-1'], 'Sample_Name': ['sample-1'],
+        'index': ['AAAAAAAA']
+    })
+
+    assert validate_sheet(
+        (body, ['Sample_ID,Sample_Name,index'], 1)
+    )['header'] == ['Error in line 1 of header: value should be [Header]']
+
+
+def test_long_and_numeric_names(tmp_path):
+    """
+    Check names over 100 characters are caught, and numeric only sample
+    IDs are checked as strings
+    """
+    long_name = 'A' * 101
+    sheet = tmp_path / 'names.csv'
+    sheet.write_text(
+        '[Header],,\n[Data],,\nSample_ID,Sample_Name,index\n'
+        f'2107995,{long_name},ACGT\n2107996,name~2,TGCA\n'
+    )
+
+    errors = validate_sheet(sheet)
+
+    assert errors['Sample_ID'] == []
+    assert errors['Sample_Name'] == [
+        f'Sample_Name invalid (> 100 characters) in row 4: {long_name} ',
+        'Invalid characters in sample: name~2 in row 5'
+    ]
+
+
+def test_pattern_set_match():
+    """
+    Check pattern set returns the pattern matching a sample ID, caching
+    repeated IDs
+    """
+    patterns = pattern_set(['^[0-9]{7}-MYE', '^Oncospan', 'EGG[0-9]$'])
+
+    assert patterns.regex is not None
+    assert patterns.match('Oncospan-8284') == '^Oncospan'
+    assert patterns.match('X-EGG2') == 'EGG[0-9]$'
+    assert patterns.match('2107909_21251Z0094') is None
+
+    patterns.match('Oncospan-8284')
+
+    assert patterns.match.cache_info().hits == 1
+
+
+def test_pattern_set_uncombinable():
+    """
+    Check patterns which can't be combined into one regex (inline flags,
+    backreferences) are searched in turn
+    """
+    patterns = pattern_set(['^(a)\\1', '(?i)^sample'])
+
+    assert patterns.regex is None
+    assert patterns.match('aab') == '^(a)\\1'
+    assert patterns.match('SAMPLE-1') == '(?i)^sample'
+    assert patterns.match('ab') is None
+
+
+def test_pattern_set_overlapping():
+    """
+    Check the first pattern in the order given matching a sample ID is
+    returned, not the pattern matching leftmost in it, whether or not the
+    patterns are combined
+    """
+    for patterns in (['EGG[0-9]$', '^[A-Z]'], ['EGG[0-9]$', '(?i)^[a-z]']):
+        patterns = pattern_set(patterns)
+
+        assert patterns.match('X-EGG2') == 'EGG[0-9]$'
+        assert patterns.match('X-EGG') == patterns.patterns[1]
+        assert patterns.matches('X-EGG') and not patterns.matches('1-EGG')
+
+
+def test_pattern_set_shared():
+    """
+    Check same pattern list gives same compiled pattern set across
+    validators instances
+    """
+    assert validators(sample_sheet, [regex_pattern]).regex_patterns is (
+        validators(sample_sheet, regex_pattern).regex_patterns
+    )
+
+
+def test_records_same_as_pandas():
+    """
+    Check reading sheet with csv module gives the same errors as reading
+    into a DataFrame
+    """
+    assert validate_sheet(
+        test_sample_sheet, regex_pattern, barcode_mismatches=1,
+        use_pandas=False
+    ) == errors_with_mismatches
+
+
+def test_blank_cells_same_as_pandas(tmp_path):
+    """
+    Check rows with empty lanes or indices are grouped as duplicates the
+    same with either reader
+    """
+    sheet = tmp_path / 'blank.csv'
+    sheets = [
+        # repeated rows with an empty lane, duplicate Sample_ID and index
+        (['Lane,Sample_ID,index', ',s1,AAAA', ',s1,AAAA', '1,s2,CCCC'], 1),
+        # repeated Sample_ID with empty indices, only duplicate Sample_ID
+        (['Sample_ID,index', 'S1,', 'S1,', 'S2,GGGG'], 0)
+    ]
+
+    for rows, duplicate_indices in sheets:
+        sheet.write_text('\n'.join(['[Header],,', '[Data],,'] + rows))
+
+        errors = validate_sheet(sheet, barcode_mismatches=1)
+
+        assert len(errors['Sample_ID']) == 1
+        assert len([
+            x for x in errors['index'] if x.startswith('Duplicate')
+        ]) == duplicate_indices
+        assert errors == validate_sheet(
+            sheet, barcode_mismatches=1, use_pandas=False
+        )
+
+
+def test_extra_fields(tmp_path):
+    """
+    Check rows with more values than columns are reported when read with
+    the csv module, instead of the extra values being dropped
+    """
+    sheet = tmp_path / 'extra.csv'
+    sheet.write_text('\n'.join([
+        '[Header],,', '[Data],,', 'Sample_ID,Sample_Name,index',
+        'sample-1,sample-1,AAAAAAAA', 'sample-2,sample,2,CCCCCCCC'
+    ]))
+
+    assert validate_sheet(sheet, use_pandas=False)['header'][-1] == (
+        'Error in line 5: 4 values given for 3 columns, values after the '
+        'last column are ignored'
+    )
+
+
+def test_cache_per_reader(tmp_path):
+    """
+    Check the errors of each reader are cached separately, as only the csv
+    reader reports rows with more values than columns
+    """
+    sheet = tmp_path / 'extra.csv'
+    sheet.write_text('\n'.join([
+        '[Header],,', '[Data],,', 'Sample_ID,Sample_Name,index',
+        'sample-1,sample,1,AAAAAAAA', 'sample-2,sample-2,CCCCCCCC'
+    ]))
+
+    expected = {
+        use_pandas: validate_sheet(sheet, use_pandas=use_pandas)
+        for use_pandas in (True, False)
+    }
+
+    assert expected[True] != expected[False]
+
+    cache = result_cache(tmp_path / 'cache')
+
+    for _ in range(2):
+        for use_pandas in (True, False):
+            assert validate_sheet(
+                sheet, use_pandas=use_pandas, cache=cache
+            ) == expected[use_pandas]
+
+
+@pytest.mark.parametrize('module, extension', [
+    (gzip, '.gz'), (bz2, '.bz2'), (lzma, '.xz')
+])
+def test_compressed_sheets(tmp_path, module, extension):
+    """
+    Check compressed sheets give the same errors as uncompressed, with
+    either reader and when read from the cache
+    """
+    sheet = tmp_path / f'SampleSheet.csv{extension}'
+    sheet.write_bytes(module.compress(Path(test_sample_sheet).read_bytes()))
+
+    assert validate_sheet(sheet, regex_pattern) == errors
+    assert validate_sheet(sheet, regex_pattern, use_pandas=False) == errors
+
+    cache = result_cache(tmp_path / 'cache')
+
+    for _ in range(2):
+        assert validate_sheet(sheet, regex_pattern, cache=cache) == errors
+
+
+def test_memory_mapped_sheet(monkeypatch):
+    """
+    Check a sheet read through a memory map gives the same header, body and
+    errors as reading it as a stream
+    """
+    monkeypatch.setattr(validate_module, 'MMAP_MIN_SIZE', 0)
+
+    mapped = read_sheet(test_sample_sheet)
+
+    assert mapped[0].equals(sample_sheet[0])
+    assert mapped[1:3] == sample_sheet[1:3]
+    assert validate_sheet(test_sample_sheet, regex_pattern) == errors
+
+
+def test_memory_mapped_cli(monkeypatch, tmp_path, capsys):
+    """
+    Check the CLI memory maps a large sheet to hash it for the cache and to
+    read it, printing the same errors as reading it as a stream
+    """
+    def run_cli(*args):
+        monkeypatch.setattr(sys, 'argv', [
+            'validate.py', '--samplesheet', test_sample_sheet, *args
+        ])
+        validate_module.main()
+
+        return capsys.readouterr().out
+
+    expected = run_cli('--no-cache')
+
+    monkeypatch.setattr(validate_module, 'MMAP_MIN_SIZE', 0)
+
+    mapped = []
+
+    class record_map(mmap.mmap):
+        def __new__(cls, *args, **kwargs):
+            mapped.append(args)
+
+            return super().__new__(cls, *args, **kwargs)
+
+    monkeypatch.setattr(mmap, 'mmap', record_map)
+
+    assert run_cli('--no-cache') == expected
+
+    # header then body mapped to read sheet
+    assert len(mapped) == 2
+
+    assert run_cli('--cache_dir', str(tmp_path)) == expected
+    assert run_cli('--cache_dir', str(tmp_path)) == expected
+
+    # mapped to hash sheet for each run, and to read it when not cached
+    assert len(mapped) == 2 + 3 + 1
+
+
+def test_in_memory_sheets(monkeypatch, tmp_path):
+    """
+    Check sheets given as str, bytes, compressed bytes, open files and
+    already parsed tuples give the same errors as the file, without
+    opening any file
+    """
+    contents = Path(test_sample_sheet).read_bytes()
+    text = contents.decode()
+
+    def no_open(*args, **kwargs):
+        raise AssertionError('file opened validating in memory sheet')
+
+    monkeypatch.setattr(validate_module, 'open', no_open, raising=False)
+
+    for sheet in (
+        text, contents, memoryview(contents), gzip.compress(contents),
+        io.StringIO(text), io.BytesIO(contents),
+        io.BytesIO(lzma.compress(contents)), sample_sheet,
+        sample_sheet[:3]
+    ):
+        assert validate_sheet(sheet, regex_pattern) == errors
+
+    for sheet in (text, contents, io.BytesIO(contents)):
+        assert validate_sheet(
+            sheet, regex_pattern, use_pandas=False
+        ) == errors
+
+    binary = io.BytesIO(contents)
+    validate_sheet(binary, regex_pattern)
+
+    # file given is left open for caller
+    assert not binary.closed
+
+    monkeypatch.undo()
+    cache = result_cache(tmp_path / 'cache')
+
+    for _ in range(2):
+        assert validate_sheet(contents, regex_pattern, cache=cache) == errors
+
+
+def test_generated_sheets(tmp_path):
+    """
+    Check a generated sheet with no errors introduced passes validation,
+    and one with errors gives the same errors with either reader
+    """
+    valid_sheet = tmp_path / 'valid.csv'
+    generate_sheet(valid_sheet, 500, lanes=4)
+
+    assert not any(validate_sheet(
+        valid_sheet, SAMPLE_ID_REGEX, use_pandas=False
+    ).values())
+
+    invalid_sheet = tmp_path / 'invalid.csv'
+    generate_sheet(
+        invalid_sheet, 500, lanes=2, error_rate=0.2, duplicate_rate=0.1
+    )
+
+    errors = validate_sheet(invalid_sheet, SAMPLE_ID_REGEX, 1)
+
+    assert errors['Sample_ID'] and errors['index'] and errors['index2']
+    assert errors == validate_sheet(
+        invalid_sheet, SAMPLE_ID_REGEX, 1, use_pandas=False
+    )
+
+
+def test_fast_start(tmp_path):
+    """
+    Check running the CLI on a single sheet does not import pandas, or
+    modules only used with other options, and starts and validates the
+    sheet within a generous bound of wall time
+    """
+    validate_script = Path(__file__).parent.parent / 'validate/validate.py'
+
+    # run script as from the command line, then report modules imported
+    start = time.perf_counter()
+    result = subprocess.run(
+        [
+            sys.executable, '-c', (
+                'import runpy, sys\n'
+                'sys.argv = sys.argv[1:]\n'
+                'try:\n'
+                '    runpy.run_path(sys.argv[0], run_name="__main__")\n'
+                'finally:\n'
+                '    print(sorted(\n'
+                '        {"pandas", "sqlite3", "cProfile", "tracemalloc"}\n'
+                '        & set(sys.modules)\n'
+                '    ), file=sys.stderr)'
+            ), validate_script, '--samplesheet', test_sample_sheet,
+            '--cache_dir', tmp_path
+        ], capture_output=True, text=True, check=True
+    )
+    seconds = time.perf_counter() - start
+
+    assert result.stderr.splitlines()[-1] == '[]'
+    assert seconds < 2, f'CLI took {seconds:.2f}s to validate one sheet'
+
+
+def test_max_errors():
+    """
+    Check validation stops once max errors found, noting that errors are
+    truncated, and is unchanged if max errors is not reached
+    """
+    truncated = validate_sheet(test_sample_sheet, regex_pattern, max_errors=8)
+
+    assert truncated.pop('truncated') == [
+        'Validation stopped after 8 error(s), remaining checks were not run'
+    ]
+    assert sum(len(x) for x in truncated.values()) == 8
+    assert truncated['header'] == errors['header']
+    assert truncated['Sample_ID'] == errors['Sample_ID'][:2]
+
+    assert validate_sheet(
+        test_sample_sheet, regex_pattern, max_errors=1000
+    ) == errors
+
+
+def test_fail_fast_skips_checks():
+    """
+    Check checks after the first error are not run
+    """
+    timings = validation_timings()
+
+    fail_fast = validate_sheet(
+        test_sample_sheet, use_pandas=False, timings=timings, max_errors=1
+    )
+
+    assert fail_fast['header'] == errors['header'][:1]
+    assert [x['step'] for x in timings.steps] == ['read', 'header']
+
+
+def test_error_records():
+    """
+    Check each error is passed as a structured record as it is found, in
+    the same order as in the errors dict
+    """
+    records = []
+
+    errors = validate_sheet(
+        test_sample_sheet, regex_pattern, on_error=records.append
+    )
+
+    for section, messages in errors.items():
+        assert [
+            x['message'] for x in records if x['section'] == section
+        ] == messages
+
+    assert all(x['code'] in ERROR_CODES for x in records)
+    assert {
+        'code': 'duplicate_index',
+        'section': 'index',
+        'row': [52, 53],
+        'column': 'index',
+        'value': 'CACGAGTATG+CGCTAAGGCT',
+        'message': (
+            'Duplicate indices found: CACGAGTATG+CGCTAAGGCT at rows 52, 53'
+        )
+    } in records
+
+
+def test_json_lines_output():
+    """
+    Check CLI writes only JSON records to stdout with --output jsonl
+    """
+    validate_script = Path(__file__).parent.parent / 'validate/validate.py'
+
+    result = subprocess.run(
+        [
+            sys.executable, validate_script, '--samplesheet',
+            test_sample_sheet, '--output', 'jsonl', '--max-errors', '3'
+        ], capture_output=True, text=True, check=True
+    )
+
+    records = [json.loads(x) for x in result.stdout.splitlines()]
+
+    assert [x['code'] for x in records] == [
+        'header_first_line', 'no_investigator', 'no_experiment', 'truncated'
+    ]
+
+
+def test_json_lines_not_watched():
+    """
+    Check --output jsonl is rejected with --watch rather than ignored
+    """
+    validate_script = Path(__file__).parent.parent / 'validate/validate.py'
+
+    result = subprocess.run(
+        [
+            sys.executable, validate_script, '--samplesheet',
+            test_sample_sheet, '--output', 'jsonl', '--watch'
+        ], capture_output=True, text=True
+    )
+
+    assert result.returncode == 2
+    assert '--watch prints errors as text' in result.stderr
+
+
+@pytest.mark.parametrize('options, message', [
+    (['--batch', 'sheets', '--output', 'jsonl'], 'requires --samplesheet'),
+    (['--serve', '--output', 'jsonl'], 'requires --samplesheet'),
+    (['--batch', 'sheets', '--summary'], 'requires --samplesheet'),
+    (['--serve', '--no-cache'], 'not supported with --serve'),
+    (['--serve', '--cache_dir', 'cache'], 'not supported with --serve')
+])
+def test_unsupported_options(monkeypatch, capsys, options, message):
+    """
+    Check options that would be ignored with --batch / --serve are
+    rejected
+    """
+    monkeypatch.setattr(sys, 'argv', ['validate.py', *options])
+
+    with pytest.raises(SystemExit) as exit:
+        validate_module.parse_args()
+
+    assert exit.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('max_errors', ['0', '-1'])
+def test_max_errors_below_one(monkeypatch, capsys, max_errors):
+    """
+    Check --max-errors below 1 is rejected rather than meaning no limit
+    """
+    monkeypatch.setattr(sys, 'argv', [
+        'validate.py', '--samplesheet', test_sample_sheet,
+        '--max-errors', max_errors
+    ])
+
+    with pytest.raises(SystemExit) as exit:
+        validate_module.parse_args()
+
+    assert exit.value.code == 2
+    assert '--max-errors must be at least 1' in capsys.readouterr().err
@@ -0,0 +1,129 @@
+"""
+Tests for validating sample sheets again as they are edited with watch.py.
+
+Each edit of the watched sheet is checked to give the same errors as
+validating the edited sheet from nothing with validate_sheet(). Sheets are
+v1 sheets with Lane, Sample_ID, index and index2 columns, starting with
+two lanes of four samples with no errors.
+"""
+import os
+import sys
+
+sys.path.append(os.path.abspath('../'))
+
+from validate.validate import validate_sheet, validators
+from validate.watch import sheet_watcher
+
+
+header = [
+    '[Header]',
+    'Investigator Name,investigator',
+    'Experiment Name,experiment',
+    '[Reads]',
+    '151',
+    '[Data]',
+    'Lane,Sample_ID,index,index2'
+]
+
+rows = [
+    '1,sample-1,AAAAAAAA,CCCCCCCC',
+    '1,sample-2,GGGGGGGG,TTTTTTTT',
+    '1,sample-3,ACACACAC,GTGTGTGT',
+    '1,sample-4,CTCTCTCT,AGAGAGAG',
+    '2,sample-5,AAAAAAAA,CCCCCCCC',
+    '2,sample-6,GGGGGGGG,TTTTTTTT',
+    '2,sample-7,ACACACAC,GTGTGTGT',
+    '2,sample-8,CTCTCTCT,AGAGAGAG'
+]
+
+
+def write_sheet(path, rows, header=header):
+    path.write_text('\n'.join(header + rows) + '\n')
+
+
+def test_same_errors_as_validating_sheet(tmp_path):
+    """
+    Check errors found after each edit are those of validating the edited
+    sheet, as rows are changed, added and removed
+    """
+    sheet = tmp_path / 'SampleSheet.csv'
+    watcher = sheet_watcher(sheet, barcode_mismatches=1)
+
+    edits = [
+        # invalid characters and a missing Sample_ID
+        lambda x: x[:1] + ['1,sample 2,GGGGGGGX,TTTTTTTT'] + x[2:],
+        lambda x: x[:3] + [',,,'] + x[3:],
+        # duplicate indices and a collision, in one lane then removed
+        lambda x: x + ['2,sample-9,AAAAAAAA,CCCCCCCC'],
+        lambda x: x[:1] + ['1,sample-10,AAAAAAAT,CCCCCCCA'] + x[1:],
+        lambda x: x[2:],
+        # duplicate Sample_ID with the same index
+        lambda x: x + [x[-1]],
+        # repeated rows with an empty lane, then one with an empty index
+        lambda x: x + [',sample-11,ACGTACGT,ACGTACGT'] * 2,
+        lambda x: x[:-1] + [',sample-11,,ACGTACGT'],
+        lambda x: [],
+        lambda x: rows
+    ]
+    current = rows
+
+    for edit in [lambda x: x] + edits:
+        current = edit(current)
+        write_sheet(sheet, current)
+
+        assert watcher.update() == validate_sheet(
+            str(sheet), barcode_mismatches=1, use_pandas=False
+        )
+
+
+def test_only_changed_rows_checked(tmp_path, monkeypatch):
+    """
+    Check only the rows changed are parsed and checked after an edit
+    """
+    sheet = tmp_path / 'SampleSheet.csv'
+    write_sheet(sheet, rows)
+
+    watcher = sheet_watcher(sheet)
+    watcher.update()
+
+    checked = []
+    name_flags = validators.name_flags
+
+    def count_names(self, column, names):
+        checked.extend(names)
+
+        return name_flags(self, column, names)
+
+    monkeypatch.setattr(validators, 'name_flags', count_names)
+
+    write_sheet(sheet, rows[:2] + ['1,sample_3,ACACACAC,GTGTGTGT'] + rows[3:])
+    errors = watcher.update()
+
+    assert checked == ['sample_3']
+    assert watcher.added == range(2, 3) and len(watcher.removed) == 1
+    assert not any(errors.values())
+
+
+def test_header_edited(tmp_path):
+    """
+    Check an edited header is checked again, and a sheet saved with no
+    changes is not validated again
+    """
+    sheet = tmp_path / 'SampleSheet.csv'
+    write_sheet(sheet, rows)
+
+    watcher = sheet_watcher(sheet)
+    watcher.update()
+
+    edited = header[:2] + ['Experiment Name,'] + header[3:]
+    write_sheet(sheet, rows, header=edited)
+
+    assert watcher.update()['header'] == [
+        'Error in line 3: no experiment name given'
+    ]
+
+    write_sheet(sheet, rows, header=edited)
+    os.utime(sheet, ns=(0, 0))
+
+    assert watcher.modified()
+    assert watcher.update() is None
@@ -0,0 +1,147 @@
+"""
+Validate sample sheets from asyncio code without blocking the event loop.
+
+validate_sheet() blocks while it reads and checks a sheet, stalling every
+other task of the event loop it is called from (i.e. a run orchestration
+service as several sequencers finish at once). Here instead:
+
+- sheets given as files are read on a thread of the event loop's default
+  executor, and validated from their contents (registered in a run index
+  under their path, as by validate_sheet())
+- sheets are parsed and checked in the executor given, or the event loop's
+  default thread pool. Checks are pure Python, so a ProcessPoolExecutor
+  keeps them from holding the GIL of the event loop's process
+- a semaphore bounds the number of sheets validated at once, and may be
+  shared between calls
+- cancelling the awaiting task (or it timing out) stops validating before
+  the next check when validating on a thread, or before it starts when in
+  a process
+
+Errors are returned as from validate_sheet():
+
+    errors = await validate_sheet_async('SampleSheet.csv', timeout=30)
+
+    with ProcessPoolExecutor() as pool:
+        errors = await validate_sheets_async(
+            sample_sheets, concurrency=4, executor=pool
+        )
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+import mmap
+import os
+import threading
+
+from validate.validate import is_sheet_contents, sheet_bytes, validate_sheet
+
+
+async def validate_sheet_async(
+        sample_sheet, executor=None, semaphore=None, timeout=None,
+        **kwargs):
+    """
+    Validate sample sheet without blocking the event loop
+
+    Args:
+        - sample_sheet (str | bytes | file | tuple): samplesheet to
+            validate, as validate_sheet()
+        - executor (concurrent.futures.Executor): (optional) executor to
+            parse and check sheet in, defaults to the event loop's default
+            executor. Settings must be picklable for a ProcessPoolExecutor
+            (so on_error and timings may not be given)
+        - semaphore (asyncio.Semaphore): (optional) held while validating,
+            to bound the number of sheets validated at once
+        - timeout (float): (optional) seconds to wait for sheet to be read
+            and validated once semaphore is held
+        - kwargs: settings to validate with, as validate_sheet()
+    Returns:
+        - errors (dict): errors found, as validate_sheet()
+    Raises:
+        - asyncio.TimeoutError: sheet not validated within timeout
+    """
+    async with semaphore or nullcontext():
+        return await asyncio.wait_for(
+            run_validation(sample_sheet, executor, kwargs), timeout
+        )
+
+
+async def run_validation(sample_sheet, executor, kwargs):
+    """
+    Read sheet on a thread and validate it in executor, stopping
+    validating if cancelled
+    """
+    loop = asyncio.get_running_loop()
+
+    if isinstance(sample_sheet, (str, os.PathLike)) and not (
+        is_sheet_contents(sample_sheet)
+    ):
+        # validated from contents read, registered in a run index by path
+        kwargs = {'sheet_name': os.path.abspath(sample_sheet), **kwargs}
+
+    if not isinstance(sample_sheet, tuple):
+        data = await loop.run_in_executor(None, sheet_bytes, sample_sheet)
+
+        if isinstance(data, mmap.mmap):
+            # large file memory mapped rather than read, mapped again to
+            # be parsed from its path
+            data.close()
+        else:
+            sample_sheet = data
+
+    if isinstance(executor, ProcessPoolExecutor):
+        # events can't be sent to other processes, validating is only
+        # cancelled if not yet started
+        cancelled = None
+    else:
+        cancelled = threading.Event()
+
+    try:
+        return await loop.run_in_executor(executor, partial(
+            validate_sheet, sample_sheet, cancelled=cancelled, **kwargs
+        ))
+    except asyncio.CancelledError:
+        if cancelled is not None:
+            # thread stops before its next check, result is discarded
+            cancelled.set()
+        raise
+
+
+async def validate_sheets_async(
+        sample_sheets, concurrency=None, executor=None, timeout=None,
+        **kwargs) -> list:
+    """
+    Validate sample sheets concurrently without blocking the event loop.
+    Any error reading or validating a sheet (including timing out) is
+    returned as an error of that sheet as validate_batch(), instead of
+    stopping the others
+
+    Args:
+        - sample_sheets (list): samplesheets to validate, as
+            validate_sheet_async()
+        - concurrency (int): (optional) number of sheets to validate at
+            once, defaults to the number of CPUs
+        - executor (concurrent.futures.Executor): (optional) as
+            validate_sheet_async()
+        - timeout (float): (optional) seconds to wait for each sheet to be
+            validated, once it has started
+        - kwargs: settings to validate with, as validate_sheet()
+    Returns:
+        - errors (list): errors of each sample sheet, in order given (as
+            sheets given may not be hashable, i.e. bytearray)
+    """
+    semaphore = asyncio.BoundedSemaphore(concurrency or os.cpu_count())
+
+    async def validate_one(sample_sheet):
+        try:
+            return await validate_sheet_async(
+                sample_sheet, executor, semaphore, timeout, **kwargs
+            )
+        except asyncio.TimeoutError:
+            return {'file': [f'Validation timed out after {timeout}s']}
+        except Exception as err:
+            return {'file': [f'Failed to read sample sheet: {err}']}
+
+    return list(await asyncio.gather(*[
+        validate_one(x) for x in sample_sheets
+    ]))
@@ -0,0 +1,501 @@
+"""
+Functions for comparing index barcodes against each other.
+
+Finding barcodes within a given hamming distance uses a pigeonhole index:
+if two barcodes differ by at most d positions, splitting them both into
+d + 1 segments guarantees at least one segment matches exactly. Barcodes are
+therefore bucketed on each of their segments and only barcodes sharing a
+bucket are compared, instead of comparing every pair in the sheet.
+
+Index sequences are packed into integers with 2 bits per base to be
+compared: the XOR of two packed indices has a non zero pair of bits at each
+mismatched base, so the hamming distance is a popcount of the XOR instead
+of comparing sequences base by base. Where there are many barcodes, the
+pigeonhole index and distances are found over NumPy arrays of the packed
+indices instead.
+
+Reverse complements of a whole column of indices are found with a single
+translate of the joined column, rather than one per index.
+"""
+from itertools import product
+
+
+# 2 bit code of each base, as base 4 digits
+BASE_CODES = str.maketrans('ACGT', '0123')
+VALID_BASES = frozenset('ACGT')
+
+# complement of each base, bases other than ACGTN are kept as is
+COMPLEMENT = str.maketrans('ACGTNacgtn', 'TGCANtgcan')
+
+# low bit of each 2 bit base of a packed index
+LOW_BITS = int('01' * 32, 2)
+
+# above this many barcodes with the same index lengths, close pairs are
+# found over NumPy arrays as it is then quicker despite the import
+NUMPY_BARCODES = 5000
+
+
+def hamming(seq1, seq2) -> int:
+    """
+    Number of mismatched positions between two equal length sequences
+    """
+    return sum(a != b for a, b in zip(seq1, seq2))
+
+
+def reverse_complement(index) -> str:
+    """
+    Reverse complement of index sequence
+    """
+    return index[::-1].translate(COMPLEMENT)
+
+
+def reverse_complements(indices) -> list:
+    """
+    Reverse complement of every index of a column in one pass, by joining
+    the column, reversing and translating it once and splitting it again.
+    Reversing the joined column reverses both each index and their order
+
+    Args:
+        - indices (list): index sequences, may include nan for empty cells
+    Returns:
+        - reversed (list): reverse complement of each index, with empty
+            cells left as given
+    """
+    sequences = [x if isinstance(x, str) else '' for x in indices]
+    joined = '\0'.join(sequences)[::-1].translate(COMPLEMENT)
+
+    return [
+        rc if isinstance(index, str) else index
+        for index, rc in zip(indices, reversed(joined.split('\0')))
+    ]
+
+
+def encode_index(index) -> int:
+    """
+    Pack index sequence into an integer with 2 bits per base, prefixed with
+    a 1 so indices of different lengths (i.e. A and AA) pack differently
+
+    Args:
+        - index (str): index sequence
+    Returns:
+        - code (int): packed index, or None if index has characters other
+            than ATCG or is empty (nan)
+    """
+    if not isinstance(index, str) or not VALID_BASES.issuperset(index):
+        return None
+
+    return int(f'1{index.translate(BASE_CODES)}', 4)
+
+
+def packed_hamming(code1, code2) -> int:
+    """
+    Number of mismatched bases between two packed indices of equal length
+    """
+    diff = code1 ^ code2
+
+    # each mismatched base has 1 or both of its 2 bits set in the XOR,
+    # folded into the low bit of each base to count once
+    return ((diff | diff >> 1) & LOW_BITS).bit_count()
+
+
+def popcount(values):
+    """
+    Number of set bits of each value of a NumPy uint64 array
+    """
+    import numpy as np
+
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+
+    # NumPy < 2.0, count bits of each byte
+    return np.unpackbits(
+        values.view(np.uint8).reshape(-1, 8), axis=1
+    ).sum(axis=1)
+
+
+def packed_candidate_pairs(codes, lengths, max_distance) -> tuple:
+    """
+    Find pairs of packed barcodes which may have every index within
+    max_distance of each other with NumPy, using the same pigeonhole index
+    as candidate_pairs().
+
+    For each combination of one segment from each index, the segments are
+    packed into a single integer key and barcodes sorted on it, barcodes
+    sharing a key are then next to each other.
+
+    Args:
+        - codes (list): NumPy uint64 array of each packed index, for
+            every barcode
+        - lengths (list): length of each index
+        - max_distance (int): maximum hamming distance of each index
+    Returns:
+        - first (array): position of first barcode of each pair
+        - second (array): position of second barcode of each pair, with
+            first < second and each pair given once
+    """
+    import numpy as np
+
+    count = len(codes[0])
+    segments = max_distance + 1
+    bounds = [segment_bounds(x, segments) for x in lengths]
+    pairs = []
+
+    for combination in product(*bounds):
+        key = np.zeros(count, dtype=np.uint64)
+
+        for packed, length, (start, end) in zip(codes, lengths, combination):
+            # bases start:end of index are bits 2 * (length - end) up to
+            # 2 * (length - start) of packed index
+            bits = 2 * (end - start)
+            segment = (packed >> np.uint64(2 * (length - end))) & np.uint64(
+                (1 << bits) - 1
+            )
+            key = (key << np.uint64(bits)) | segment
+
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+
+        # every pair in a run of equal keys is found by comparing each
+        # barcode with those 1, 2 ... places after it in sorted order
+        offset = 1
+
+        while offset < count:
+            same = key[offset:] == key[:-offset]
+
+            if not same.any():
+                break
+
+            rows = same.nonzero()[0]
+            pairs.append(np.stack([order[rows], order[rows + offset]]))
+            offset += 1
+
+    if not pairs:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    pairs = np.sort(np.concatenate(pairs, axis=1), axis=0)
+
+    # same pair found from more than one combination of segments
+    pairs = np.unique(pairs[0] * count + pairs[1])
+
+    return pairs // count, pairs % count
+
+
+def numpy_packable(lengths, max_distance) -> bool:
+    """
+    Check indices of given lengths can be compared with NumPy, each index
+    and each key of segments (one from each index) must fit in 64 bits
+    """
+    segments = max_distance + 1
+
+    if max(lengths) > 31 or min(lengths) < segments:
+        return False
+
+    return sum(-(-x // segments) for x in lengths) <= 32
+
+
+def find_close_packed(barcodes, lengths, max_distance) -> list:
+    """
+    Find close pairs of a group of barcodes with the same index lengths
+    over NumPy arrays, as find_close_barcodes()
+
+    Args:
+        - barcodes (list): tuples of index sequence(s), all valid and
+            with the same index lengths
+        - lengths (tuple): length of each index
+        - max_distance (int): maximum hamming distance of each index
+    Returns:
+        - close (list): (i, j, distances) tuples of positions in barcodes
+            and hamming distance of each index
+    """
+    import numpy as np
+
+    codes = [
+        np.array(
+            [encode_index(barcode[num]) for barcode in barcodes],
+            dtype=np.uint64
+        ) for num in range(len(lengths))
+    ]
+
+    first, second = packed_candidate_pairs(codes, lengths, max_distance)
+
+    distances = []
+
+    for packed in codes:
+        diff = packed[first] ^ packed[second]
+        diff = (diff | diff >> np.uint64(1)) & np.uint64(LOW_BITS)
+        distances.append(popcount(diff))
+
+    distances = np.stack(distances, axis=1)
+
+    # exact duplicates are reported by duplicate index checks
+    close = (distances <= max_distance).all(axis=1) & distances.any(axis=1)
+
+    return [
+        (i, j, tuple(x)) for i, j, x in zip(
+            first[close].tolist(), second[close].tolist(),
+            distances[close].tolist()
+        )
+    ]
+
+
+def segment_bounds(length, segments) -> list:
+    """
+    Split a sequence length into given number of near equal segments
+
+    Args:
+        - length (int): length of sequence to split
+        - segments (int): number of segments to split into
+    Returns:
+        - bounds (list): (start, end) tuples of each segment
+    """
+    size, remainder = divmod(length, segments)
+    bounds = []
+    start = 0
+
+    for num in range(segments):
+        end = start + size + (1 if num < remainder else 0)
+        bounds.append((start, end))
+        start = end
+
+    return bounds
+
+
+def candidate_pairs(barcodes, max_distance) -> set:
+    """
+    Find pairs of barcodes which may have every index within max_distance
+    of each other, using a pigeonhole index of index segments.
+
+    For dual indices a close pair must share a segment of index AND a
+    segment of index2, so barcodes are bucketed on every combination of
+    one segment from each index which keeps buckets small.
+
+    Args:
+        - barcodes (list): tuples of index sequence(s), all with the same
+            index lengths
+        - max_distance (int): maximum hamming distance of each index
+    Returns:
+        - pairs (set): (i, j) tuples of positions in barcodes, i < j
+    """
+    lengths = [len(x) for x in barcodes[0]]
+    segments = max_distance + 1
+
+    if min(lengths) < segments:
+        # too short to split, every pair is a candidate
+        return {
+            (i, j) for i in range(len(barcodes))
+            for j in range(i + 1, len(barcodes))
+        }
+
+    bounds = [
+        list(enumerate(segment_bounds(x, segments))) for x in lengths
+    ]
+
+    buckets = {}
+
+    for num, barcode in enumerate(barcodes):
+        for combination in product(*bounds):
+            key = tuple(
+                (segment, index[start:end]) for index, (segment, (start, end))
+                in zip(barcode, combination)
+            )
+            buckets.setdefault(key, []).append(num)
+
+    pairs = set()
+
+    for bucket in buckets.values():
+        for i, first in enumerate(bucket):
+            for second in bucket[i + 1:]:
+                pairs.add((first, second))
+
+    return pairs
+
+
+def find_close_barcodes(barcodes, max_distance) -> list:
+    """
+    Find pairs of barcodes where every index of the pair is within
+    max_distance mismatches of the other, ignoring exact duplicates.
+
+    Single indexed barcodes are passed as 1-tuples and dual indexed
+    barcodes as (index, index2). Barcodes are only compared to others with
+    the same index lengths.
+
+    Args:
+        - barcodes (list): tuples of index sequence(s)
+        - max_distance (int): maximum hamming distance of each index to
+            report as too close
+    Returns:
+        - close (list): (i, j, distances) tuples of positions in barcodes
+            and hamming distance of each index, sorted by position
+    """
+    # group on lengths of each index, only equal lengths can be compared
+    by_length = {}
+
+    for num, barcode in enumerate(barcodes):
+        lengths = tuple(len(x) for x in barcode)
+        by_length.setdefault(lengths, []).append(num)
+
+    close = []
+
+    for lengths, positions in by_length.items():
+        if len(positions) < 2:
+            continue
+
+        group = [barcodes[x] for x in positions]
+
+        # each index of the group packed once, invalid sequences are None
+        codes = [
+            [encode_index(barcode[num]) for barcode in group]
+            for num in range(len(lengths))
+        ]
+        valid = not any(None in x for x in codes)
+
+        if valid and len(group) > NUMPY_BARCODES and numpy_packable(
+            lengths, max_distance
+        ):
+            close.extend(
+                (positions[i], positions[j], distances) for i, j, distances
+                in find_close_packed(group, lengths, max_distance)
+            )
+            continue
+
+        for i, j in candidate_pairs(group, max_distance):
+            if valid:
+                distances = tuple(packed_hamming(x[i], x[j]) for x in codes)
+            else:
+                # not valid sequences to pack, compared as strings
+                distances = tuple(
+                    hamming(a, b) for a, b in zip(group[i], group[j])
+                )
+
+            if not any(distances):
+                # exact duplicate, reported by duplicate index checks
+                continue
+
+            if all(x <= max_distance for x in distances):
+                close.append((positions[i], positions[j], distances))
+
+    return sorted(close)
+
+
+class barcode_index():
+    """
+    Pigeonhole index of barcodes as candidate_pairs(), that barcodes may
+    be added to and removed from one at a time. Finds the barcodes close
+    to one barcode without comparing it to every other, i.e. for the rows
+    changed in an edited sheet (see watch.py)
+
+    Args:
+        - max_distance (int): maximum hamming distance of each index
+    """
+    def __init__(self, max_distance) -> None:
+        self.max_distance = max_distance
+        self.segments = max_distance + 1
+
+        # key -> (barcode, packed indices), and bucket -> keys of barcodes
+        # in bucket
+        self.barcodes = {}
+        self.buckets = {}
+
+        # index lengths -> segment bounds of each index
+        self.bounds = {}
+
+
+    def __len__(self) -> int:
+        return len(self.barcodes)
+
+
+    def bucket_keys(self, barcode) -> list:
+        """
+        Buckets of barcode, one for each combination of one segment of
+        each index. Only barcodes with the same index lengths share a
+        bucket, and those too short to split all share one
+        """
+        lengths = tuple(len(x) for x in barcode)
+
+        if min(lengths) < self.segments:
+            return [lengths]
+
+        if lengths not in self.bounds:
+            self.bounds[lengths] = [
+                segment_bounds(x, self.segments) for x in lengths
+            ]
+
+        segments = [
+            [
+                (segment, index[start:end])
+                for segment, (start, end) in enumerate(bounds)
+            ] for index, bounds in zip(barcode, self.bounds[lengths])
+        ]
+
+        return [(lengths, x) for x in product(*segments)]
+
+
+    def add(self, key, barcode, compare=True) -> list:
+        """
+        Add barcode to index, finding the barcodes already added that
+        every index of it is within max_distance of, ignoring exact
+        duplicates as find_close_barcodes()
+
+        Args:
+            - key: key to add barcode under, i.e. a row
+            - barcode (tuple): index sequence(s)
+            - compare (bool): compare to barcodes already added, False
+                where close pairs are already known
+        Returns:
+            - close (list): (key, distances) of each close barcode
+        """
+        # packed to compare as find_close_barcodes(), None if any index
+        # has invalid characters so compared as strings
+        codes = tuple(encode_index(x) for x in barcode)
+
+        if None in codes:
+            codes = None
+
+        compared = {}
+
+        for bucket in self.bucket_keys(barcode):
+            keys = self.buckets.setdefault(bucket, set())
+
+            if compare:
+                for other in keys:
+                    if other not in compared:
+                        compared[other] = self.distances(
+                            barcode, codes, *self.barcodes[other]
+                        )
+
+            keys.add(key)
+
+        self.barcodes[key] = (barcode, codes)
+
+        return [
+            (other, distances) for other, distances in compared.items()
+            if any(distances) and all(
+                x <= self.max_distance for x in distances
+            )
+        ]
+
+
+    def distances(self, barcode, codes, other, other_codes) -> tuple:
+        """
+        Hamming distance of each index of two barcodes, compared packed
+        where both are valid
+        """
+        if codes is None or other_codes is None:
+            return tuple(hamming(a, b) for a, b in zip(barcode, other))
+
+        return tuple(packed_hamming(a, b) for a, b in zip(codes, other_codes))
+
+
+    def remove(self, key) -> None:
+        """
+        Remove barcode added under key
+        """
+        barcode, _ = self.barcodes.pop(key)
+
+        for bucket in self.bucket_keys(barcode):
+            keys = self.buckets[bucket]
+            keys.discard(key)
+
+            if not keys:
+                del self.buckets[bucket]
@@ -0,0 +1,188 @@
+"""
+Validate a batch of sample sheets across a pool of worker processes.
+
+Sample sheets may be given as a directory, a glob pattern or a manifest file
+listing one sample sheet path per line. Regex patterns are read once by the
+caller and compiled once in each worker process, instead of once per sheet.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import os
+
+from validate.schema import load_schemas
+from validate.validate import pattern_set, sheet_checks, validate_sheet
+
+
+# settings shared by all sheets validated in a worker process, set by
+# init_worker() when the process starts
+worker_settings = {}
+
+
+def find_sample_sheets(source) -> list:
+    """
+    Find sample sheets to validate from given directory, manifest file or
+    glob pattern
+
+    Args:
+        - source (str): directory of sample sheets (all .csv files in it,
+            including compressed .csv.gz / .csv.bz2 / .csv.xz files),
+            manifest file of sample sheet paths (one per line) or glob
+            pattern matching sample sheets
+    Returns:
+        - sample_sheets (list): sorted paths of sample sheets found
+    """
+    if os.path.isdir(source):
+        sample_sheets = [
+            x for extension in ('', '.gz', '.bz2', '.xz')
+            for x in glob.glob(os.path.join(source, f'*.csv{extension}'))
+        ]
+    elif os.path.isfile(source):
+        with open(source) as f:
+            sample_sheets = [x.strip() for x in f if x.strip()]
+    else:
+        sample_sheets = glob.glob(source, recursive=True)
+
+    return sorted(sample_sheets)
+
+
+def init_worker(
+        regex_patterns, barcode_mismatches, cache, max_errors,
+        header_schema=None, i5_orientation=None, index_kits=None) -> None:
+    """
+    Compile regex patterns and header schemas, and load index kits, once
+    per worker process for validating every sheet sent to it
+    """
+    if regex_patterns:
+        regex_patterns = pattern_set(regex_patterns)
+
+    worker_settings['regex_patterns'] = regex_patterns
+    worker_settings['barcode_mismatches'] = barcode_mismatches
+    worker_settings['cache'] = cache
+    worker_settings['max_errors'] = max_errors
+    worker_settings['header_schema'] = load_schemas(header_schema)
+    worker_settings['i5_orientation'] = i5_orientation
+    worker_settings['index_kits'] = sheet_checks(
+        i5_orientation=i5_orientation, index_kits=index_kits
+    )[1]
+
+
+def validate_one(sample_sheet) -> tuple:
+    """
+    Validate a single sample sheet in a worker process, any error reading
+    the sheet is returned as an error instead of stopping the batch
+
+    Args:
+        - sample_sheet (str): path to sample sheet
+    Returns:
+        - sample_sheet (str): path to sample sheet
+        - errors (dict): errors found in sample sheet
+    """
+    try:
+        errors = validate_sheet(sample_sheet, **worker_settings)
+    except Exception as err:
+        errors = {'file': [f'Failed to read sample sheet: {err}']}
+
+    return sample_sheet, errors
+
+
+def validate_batch(
+        sample_sheets, regex_patterns=None, barcode_mismatches=None,
+        workers=None, cache=None, max_errors=None,
+        header_schema=None, i5_orientation=None, index_kits=None) -> dict:
+    """
+    Validate sample sheets in parallel across a pool of worker processes
+
+    Args:
+        - sample_sheets (list): paths of sample sheets to validate
+        - regex_patterns (list): (optional) list of regex patterns to validate
+            Sample_ID against for valid sample naming
+        - barcode_mismatches (int): (optional) number of barcode mismatches
+            allowed when demultiplexing
+        - workers (int): (optional) number of worker processes, defaults to
+            the number of CPUs
+        - cache (result_cache): (optional) cache of results, shared by all
+            workers
+        - max_errors (int): (optional) stop validating each sheet once this
+            many errors are found
+        - header_schema (str | list): (optional) header schema file(s) or
+            directories of schemas to check headers against
+        - i5_orientation (str): (optional) orientation the instrument reads
+            i5 in, as validate_sheet()
+        - index_kits (str | list): (optional) index kit file(s) of known
+            indices, as validate_sheet()
+    Returns:
+        - results (dict): sample sheet path -> errors dict, in order given.
+            Paths given more than once (i.e. listed twice in a manifest)
+            are validated once, with a warning printed
+    Raises:
+        - ValueError: invalid i5 orientation given
+    """
+    # first of each path given, compared as absolute paths
+    unique = {}
+
+    for sample_sheet in sample_sheets:
+        unique.setdefault(os.path.abspath(sample_sheet), sample_sheet)
+
+    unique = list(unique.values())
+
+    if len(unique) < len(sample_sheets):
+        print(
+            f'Warning: {len(sample_sheets) - len(unique)} sample sheet '
+            'path(s) given more than once, each is validated once'
+        )
+
+    sample_sheets = unique
+
+    # checked before starting workers, so an invalid orientation is raised
+    # here rather than breaking the pool
+    sheet_checks(i5_orientation=i5_orientation)
+
+    workers = workers or os.cpu_count()
+
+    # send sheets to workers in chunks to reduce inter-process overhead
+    # when there are many small sheets
+    chunksize = max(1, len(sample_sheets) // (workers * 4))
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker,
+        initargs=(
+            regex_patterns, barcode_mismatches, cache, max_errors,
+            header_schema, i5_orientation, index_kits
+        )
+    ) as executor:
+        results = dict(executor.map(
+            validate_one, sample_sheets, chunksize=chunksize
+        ))
+
+    return results
+
+
+def print_batch_report(results) -> None:
+    """
+    Print combined report of batch validation, with pass / fail summary of
+    every sheet followed by the errors found in each failed sheet
+    """
+    failed = {
+        sheet: errors for sheet, errors in results.items()
+        if any(errors.values())
+    }
+
+    print((
+        f'\nChecked {len(results)} sample sheets: '
+        f'{len(results) - len(failed)} passed, {len(failed)} failed\n'
+    ))
+
+    for sheet, errors in results.items():
+        if sheet in failed:
+            total = sum(len(x) for x in errors.values())
+            print(f'\tFAIL\t{sheet} ({total} errors)')
+        else:
+            print(f'\tPASS\t{sheet}')
+
+    for sheet, errors in failed.items():
+        print(f'\n\n{sheet}:')
+
+        for key, val in errors.items():
+            if val:
+                print(f'\n\tErrors found in {key}:\n')
+                [print(f'\t\t{x}') for x in val]
@@ -0,0 +1,224 @@
+"""
+On disk cache of validation results, keyed on the content of the sample
+sheet and the settings it was validated with.
+
+The same sheet is commonly validated several times unchanged (by the lab,
+LIMS, at the sequencer and before demultiplexing), a cached result is
+returned without parsing the sheet. The source of the validate package is
+part of every key so results are not reused across code changes.
+
+Each result is stored as a JSON file named by its key, the cache is kept
+under a maximum size by removing the least recently used results. The
+directory is only scanned for results to remove once the size written
+since the last scan may take it over the maximum, or every EVICT_INTERVAL
+results stored (as other processes may be storing results in it too), and
+results are removed down to EVICT_TO of the maximum so a full cache is not
+scanned again for each result stored.
+"""
+from functools import lru_cache
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+
+
+# results stored between scans of the cache directory for results to evict
+EVICT_INTERVAL = 100
+
+# fraction of max size results are removed down to when evicting
+EVICT_TO = 0.9
+
+
+@lru_cache(maxsize=1)
+def package_hash() -> str:
+    """
+    Hash of the source of the validate package and its default header
+    schemas, computed once per process
+    """
+    source_hash = hashlib.sha256()
+    package = Path(__file__).parent
+
+    for source in sorted([
+        *package.glob('*.py'), *package.glob('schemas/*.json')
+    ]):
+        source_hash.update(source.read_bytes())
+
+    return source_hash.hexdigest()
+
+
+def default_cache_dir() -> str:
+    """
+    Default cache location, under $XDG_CACHE_HOME or ~/.cache
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    )
+
+    return os.path.join(cache_home, 'validate_sample_sheet')
+
+
+class result_cache():
+    """
+    Cache of errors dicts from validating sample sheets, stored in
+    cache_dir and limited to max_size bytes
+    """
+    def __init__(self, cache_dir=None, max_size=100 * 1024 ** 2) -> None:
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size = max_size
+
+        # size of cache found by the last scan plus the size of results
+        # stored since (None until first scanned), and results stored since
+        self.size = None
+        self.stored = 0
+
+
+    def key(
+            self, data, regex_patterns=None, barcode_mismatches=None,
+            max_errors=None, checks=None, header_schemas=None,
+            options=None) -> str:
+        """
+        Key of result from sample sheet contents and validation settings
+
+        Args:
+            - data (bytes): contents of sample sheet
+            - regex_patterns (list | pattern_set): (optional) regex patterns
+                sheet is validated against
+            - barcode_mismatches (int): (optional) barcode mismatches sheet
+                is validated with
+            - max_errors (int): (optional) maximum errors sheet is validated
+                with
+            - checks (list): (optional) names of checks sheet is validated
+                with
+            - header_schemas (list): (optional) digests of header schemas
+                sheet is validated with
+            - options (dict): (optional) any other settings sheet is
+                validated with, as JSON serialisable values
+        Returns:
+            - key (str): hex digest identifying result
+        """
+        if isinstance(regex_patterns, str):
+            regex_patterns = [regex_patterns]
+
+        # pattern_set keeps its patterns, use them as given otherwise
+        regex_patterns = list(
+            getattr(regex_patterns, 'patterns', regex_patterns) or []
+        )
+
+        settings = json.dumps({
+            'package': package_hash(),
+            'regex_patterns': regex_patterns,
+            'barcode_mismatches': barcode_mismatches,
+            'max_errors': max_errors,
+            'checks': checks,
+            'header_schemas': header_schemas,
+            'options': options
+        }, sort_keys=True)
+
+        key = hashlib.sha256(data)
+        key.update(settings.encode())
+
+        return key.hexdigest()
+
+
+    def path(self, key) -> str:
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+
+    def get(self, key) -> dict:
+        """
+        Get cached errors dict for key, marking it as recently used
+
+        Args:
+            - key (str): key from result_cache.key()
+        Returns:
+            - errors (dict): cached errors dict, or None if not cached
+        """
+        try:
+            with open(self.path(key)) as f:
+                errors = json.load(f)
+        except (OSError, ValueError):
+            # not cached, or partially written / corrupt file
+            return None
+
+        try:
+            # modification time used as last used time for LRU eviction
+            os.utime(self.path(key))
+        except OSError:
+            # removed by eviction in another process since being read
+            pass
+
+        return errors
+
+
+    def put(self, key, errors) -> None:
+        """
+        Store errors dict for key, then evict old results if cache may
+        have grown over max_size
+
+        Args:
+            - key (str): key from result_cache.key()
+            - errors (dict): errors found validating sheet
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # write to temporary file and move into place, so concurrent
+        # readers never see a partially written result
+        with tempfile.NamedTemporaryFile(
+            'w', dir=self.cache_dir, suffix='.tmp', delete=False
+        ) as f:
+            json.dump(errors, f)
+
+        size = os.path.getsize(f.name)
+        os.replace(f.name, self.path(key))
+
+        self.stored += 1
+
+        if self.size is not None:
+            # replaced results are counted twice until the next scan
+            self.size += size
+
+        if self.size is None or self.size > self.max_size or (
+            self.stored >= EVICT_INTERVAL
+        ):
+            self.evict()
+
+
+    def evict(self) -> None:
+        """
+        Remove least recently used results until cache is within
+        EVICT_TO of max_size once over it, scanning the cache directory for
+        the size of each result
+        """
+        results = []
+
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json'):
+                    continue
+
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                results.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(x[1] for x in results)
+        target = self.max_size * EVICT_TO if (
+            total_size > self.max_size
+        ) else self.max_size
+
+        for _, size, path in sorted(results):
+            if total_size <= target:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+            total_size -= size
+
+        self.size = total_size
+        self.stored = 0
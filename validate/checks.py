@@ -0,0 +1,276 @@
+"""
+Registry of checks run by validate_sheet(), and running them in parallel.
+
+Each check is a function taking a validators instance, registered with the
+columns / header sections it reads and the sections of the errors dict it
+adds errors to. Site specific checks may be added to the default registry
+(CHECKS in validate.py) without changing the validators class:
+
+    from validate.validate import CHECKS
+
+    @CHECKS.register(
+        'sample_well', reads=['Sample_Well'], sections=['Sample_Well']
+    )
+    def sample_well(validate):
+        for row, well in enumerate(validate.values('Sample_Well')):
+            ...
+            validate.add_error('Sample_Well', 'invalid_well', ...)
+
+A check runs after those named in its after list (i.e. to only run if no
+index errors were found), and after any registered before it that add to
+the same section of errors, so errors are always given in the same order.
+Checks with no dependencies between them are run at the same time on a
+thread pool.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+
+class check():
+    """
+    Check registered to run on each sample sheet
+
+    Args:
+        - name (str): name of check, used to name timing steps
+        - function (callable): function run with validators instance
+        - reads (list): columns of the data body and / or header sections
+            ([Header], [Reads] etc.) read
+        - sections (list): sections of errors dict errors are added to
+        - after (list): names of checks that must run before this one
+    """
+    def __init__(
+            self, name, function, reads=(), sections=(), after=()) -> None:
+        self.name = name
+        self.function = function
+        self.reads = list(reads)
+        self.sections = list(sections)
+        self.after = list(after)
+
+
+    def reads_header_only(self) -> bool:
+        """
+        Check only reads header sections, not the data body
+        """
+        return bool(self.reads) and all(
+            x.startswith('[') for x in self.reads
+        )
+
+
+class check_registry():
+    """
+    Ordered set of checks, with dependencies between them from the checks
+    each must run after and the sections of errors each adds to
+    """
+    def __init__(self) -> None:
+        self.checks = {}
+
+
+    def __iter__(self):
+        return iter(self.checks.values())
+
+
+    def __len__(self) -> int:
+        return len(self.checks)
+
+
+    def __contains__(self, name) -> bool:
+        return name in self.checks
+
+
+    def register(
+            self, name, function=None, reads=(), sections=(), after=()):
+        """
+        Register check, may be used as a decorator if function not given
+
+        Args:
+            - name (str): name of check
+            - function (callable): (optional) function taking validators
+                instance to run
+            - reads (list): columns / header sections read
+            - sections (list): sections of errors dict added to
+            - after (list): names of checks that must run first
+        Returns:
+            - function (callable): function registered, or decorator
+                registering function if not given
+        Raises:
+            - ValueError: check with name already registered
+        """
+        if function is None:
+            return lambda function: self.register(
+                name, function, reads, sections, after
+            )
+
+        if name in self.checks:
+            raise ValueError(f'Check {name} is already registered')
+
+        self.checks[name] = check(name, function, reads, sections, after)
+
+        return function
+
+
+    def unregister(self, name) -> None:
+        """
+        Remove registered check by name
+        """
+        del self.checks[name]
+
+
+    def copy(self):
+        """
+        Copy of registry, to add or remove checks without changing this one
+        """
+        registry = check_registry()
+        registry.checks = dict(self.checks)
+
+        return registry
+
+
+    def sections(self) -> list:
+        """
+        All sections of errors added to by registered checks, in order
+        """
+        return list(dict.fromkeys(
+            section for x in self for section in x.sections
+        ))
+
+
+    def dependencies(self) -> dict:
+        """
+        Find checks each check must run after
+
+        Returns:
+            - dependencies (dict): name of check -> set of names of checks
+                it depends on
+        Raises:
+            - ValueError: check runs after an unknown check, or checks
+                depend on each other in a cycle
+        """
+        checks = list(self)
+        dependencies = {}
+
+        for num, current in enumerate(checks):
+            depends = set()
+
+            for name in current.after:
+                if name not in self.checks:
+                    raise ValueError((
+                        f'Check {current.name} runs after unknown check '
+                        f'{name}'
+                    ))
+                depends.add(name)
+
+            for other in checks[:num]:
+                if set(current.sections) & set(other.sections):
+                    # same section, keep errors in order registered
+                    depends.add(other.name)
+
+            dependencies[current.name] = depends
+
+        self.order(dependencies)
+
+        return dependencies
+
+
+    def order(self, dependencies=None) -> list:
+        """
+        Order checks so each runs after those it depends on, otherwise in
+        order registered
+
+        Args:
+            - dependencies (dict): (optional) from dependencies()
+        Returns:
+            - checks (list): checks in order to run
+        Raises:
+            - ValueError: checks depend on each other in a cycle
+        """
+        if dependencies is None:
+            dependencies = self.dependencies()
+
+        ordered = []
+        done = set()
+        remaining = list(self)
+
+        while remaining:
+            ready = [x for x in remaining if dependencies[x.name] <= done]
+
+            if not ready:
+                raise ValueError(
+                    'Checks depend on each other in a cycle: '
+                    f'{", ".join(x.name for x in remaining)}'
+                )
+
+            ordered.append(ready[0])
+            done.add(ready[0].name)
+            remaining.remove(ready[0])
+
+        return ordered
+
+
+    def run(self, validate, workers=1, step=None) -> None:
+        """
+        Run all checks on a validators instance. With more than one worker,
+        checks are run on a thread pool as soon as the checks they depend
+        on have finished
+
+        Args:
+            - validate (validators): validators instance for sample sheet
+            - workers (int): number of threads to run checks on, 1 runs each
+                in turn in order
+            - step (callable): (optional) context manager timing each check,
+                called with name, rows and errors dict as timings.step()
+        Raises:
+            - error_limit_reached: max_errors of validate reached, from the
+                check that reached it
+        """
+        dependencies = self.dependencies()
+
+        for section in self.sections():
+            # sections of site specific checks added to errors dict
+            validate.errors.setdefault(section, [])
+
+        if workers == 1 or len(self) < 2:
+            for current in self.order(dependencies):
+                self.run_check(current, validate, step)
+            return
+
+        done = set()
+        running = {}
+        remaining = list(self)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while remaining or running:
+                for current in list(remaining):
+                    if dependencies[current.name] <= done:
+                        remaining.remove(current)
+                        running[pool.submit(
+                            self.run_check, current, validate, step
+                        )] = current
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    # raises any error from the check, remaining checks
+                    # already running are waited on when leaving the pool
+                    future.result()
+                    done.add(running.pop(future).name)
+
+
+    def run_check(self, current, validate, step=None) -> None:
+        """
+        Run a single check, timed as a step if given
+        """
+        if step is None:
+            context = nullcontext({})
+        else:
+            rows = len(validate.samplesheet_header) if (
+                current.reads_header_only()
+            ) else len(validate.samplesheet_body)
+
+            # only count errors added to this check's sections, as other
+            # checks may be adding errors at the same time
+            context = step(current.name, rows, {
+                x: validate.errors[x] for x in current.sections
+            })
+
+        with context:
+            current.function(validate)
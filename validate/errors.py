@@ -0,0 +1,435 @@
+"""
+Compact store of the errors found validating a sample sheet.
+
+Each error is kept as a record of its code, row, column and value, and
+the message template it is formatted with. Messages are only
+formatted when read (i.e. printed by main() or looked up by a caller of
+validate_sheet_errors()), so a sheet with errors on every row does not
+build a message string for each:
+
+    errors = validate_sheet_errors('SampleSheet.csv')
+
+    errors.counts()    # {('index', 'invalid_index_characters'): 412, ...}
+    errors['index']    # messages of index section, formatted on access
+
+The store is a mapping of section -> messages, so compares equal to (and
+is read in the same way as) a dict of lists of messages, and to_dict()
+gives that dict (as returned by validate_sheet()). Every error found is
+kept, identical errors (same code, row, column, value and message) may be
+removed by the caller with deduplicate() rather than looked up as each is
+added.
+"""
+from array import array
+from collections.abc import MutableMapping, Sequence
+
+
+def error_record(
+        code, section, message, row=None, column=None, value=None) -> dict:
+    """
+    Structured record of an error, as passed to validators.on_error
+
+    Args:
+        - code (str): error code, one of ERROR_CODES
+        - section (str): section of errors dict error is in
+        - message (str): error message
+        - row (int | list): (optional) row number(s) of sample sheet file
+            error is on, errors spanning rows (i.e. duplicates) give a list
+        - column (str): (optional) column (or header field) of error
+        - value: (optional) offending value
+    Returns:
+        - record (dict): error record, empty cells given as None for value
+    """
+    if isinstance(value, float):
+        # float -> nan value -> empty cell
+        value = None
+
+    return {
+        'code': code,
+        'section': section,
+        'row': row,
+        'column': column,
+        'value': value,
+        'message': message
+    }
+
+
+class error():
+    """
+    Single error, with its message formatted from text when read. Kept to
+    as few attributes as possible, as there may be one for every row
+
+    Args:
+        - code (str): error code, one of ERROR_CODES
+        - text (str): error message, or template of message if detail is
+            given
+        - row (int | list): (optional) row number(s) of sample sheet file
+        - column (str): (optional) column (or header field) of error
+        - value: (optional) offending value
+        - detail (dict): (optional) if given, text is a template formatted
+            with row (row numbers joined with ', '), rows (list of row
+            numbers), column, value and the values of detail
+    """
+    __slots__ = ('code', 'text', 'row', 'column', 'value', 'detail')
+
+    def __init__(
+            self, code, text, row=None, column=None, value=None,
+            detail=None) -> None:
+        self.code = code
+        self.text = text
+        self.row = row
+        self.column = column
+        self.value = value
+        self.detail = detail
+
+
+    @property
+    def message(self) -> str:
+        """
+        Message of error, formatted from template if given as one
+        """
+        if self.detail is None:
+            return self.text
+
+        rows = self.row if isinstance(self.row, list) else [self.row]
+
+        return self.text.format(
+            row=', '.join(str(x) for x in rows), rows=rows,
+            column=self.column, value=self.value, **self.detail
+        )
+
+
+    def key(self) -> tuple:
+        """
+        Hashable identity of error, for finding identical errors
+        """
+        value = self.value
+
+        if isinstance(value, float):
+            # nan != nan, empty cells compared as None
+            value = None
+        elif isinstance(value, list):
+            value = tuple(value)
+
+        return (
+            self.code, self.text,
+            tuple(self.row) if isinstance(self.row, list) else self.row,
+            self.column, value,
+            None if self.detail is None else tuple(sorted(
+                self.detail.items()
+            ))
+        )
+
+
+    def record(self, section) -> dict:
+        """
+        Structured record of error with its message, see error_record()
+        """
+        return error_record(
+            self.code, section, self.message, self.row, self.column,
+            self.value
+        )
+
+
+    def to_json(self) -> list:
+        return [
+            self.code, self.text, self.row, self.column, self.value,
+            None if self.detail is None else dict(self.detail)
+        ]
+
+
+# detail of templates formatted only with the fields of the error, shared
+# so no dict is made for each error (never modified)
+NO_DETAIL = {}
+
+# row numbers kept in an array of ints, with errors on no row or spanning
+# rows marked by these in place of a row number
+NO_ROW = -1
+SPANNED = -2
+
+
+class error_section(Sequence):
+    """
+    Errors of one section, read as a list of their messages. Errors are
+    kept as columns of a table rather than an object each, row numbers in
+    an array and the rest as references to values shared between errors
+    (codes, templates and column names), and each message is formatted as
+    it is read
+
+    Args:
+        - errors (iterable): (optional) error objects to start with
+    """
+    __slots__ = ('codes', 'texts', 'rows', 'spans', 'columns', 'values',
+                 'details')
+
+    def __init__(self, errors=()) -> None:
+        self.codes = []
+        self.texts = []
+        self.rows = array('q')
+        # position -> row numbers of errors spanning rows
+        self.spans = {}
+        self.columns = []
+        self.values = []
+        self.details = []
+
+        for current in errors:
+            self.add(
+                current.code, current.text, current.row, current.column,
+                current.value, current.detail
+            )
+
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [
+                self.error(x).message
+                for x in range(*index.indices(len(self)))
+            ]
+
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError('error index out of range')
+
+        return self.error(index).message
+
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (error_section, list, tuple)):
+            return list(self) == list(other)
+
+        return NotImplemented
+
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+    def add(
+            self, code, text, row=None, column=None, value=None,
+            detail=None) -> None:
+        """
+        Add error to end of table, fields as error()
+        """
+        if row is None:
+            self.rows.append(NO_ROW)
+        elif isinstance(row, int) and row >= 0:
+            self.rows.append(row)
+        else:
+            if isinstance(row, list) and all(
+                    isinstance(x, int) for x in row):
+                # rows of duplicates may span most of the sheet
+                row = array('q', row)
+
+            self.spans[len(self.codes)] = row
+            self.rows.append(SPANNED)
+
+        self.codes.append(code)
+        self.texts.append(text)
+        self.columns.append(column)
+        self.values.append(value)
+        self.details.append(detail)
+
+
+    def error(self, position) -> error:
+        """
+        Error at position, made from its row of the table when read
+        """
+        row = self.rows[position]
+
+        if row == NO_ROW:
+            row = None
+        elif row == SPANNED:
+            row = self.spans[position]
+
+            if isinstance(row, array):
+                row = row.tolist()
+
+        return error(
+            self.codes[position], self.texts[position], row,
+            self.columns[position], self.values[position],
+            self.details[position]
+        )
+
+
+    def errors(self):
+        """
+        Each error of section, in order added
+        """
+        for position in range(len(self)):
+            yield self.error(position)
+
+
+    def deduplicate(self) -> int:
+        """
+        Remove errors identical to one before them
+
+        Returns:
+            - removed (int): number of errors removed
+        """
+        seen = set()
+        unique = []
+
+        for current in self.errors():
+            key = current.key()
+
+            if key not in seen:
+                seen.add(key)
+                unique.append(current)
+
+        removed = len(self) - len(unique)
+
+        if removed:
+            self.__init__(unique)
+
+        return removed
+
+
+class error_store(MutableMapping):
+    """
+    Errors found in a sample sheet by section, read as a dict of section
+    -> list of messages
+
+    Args:
+        - sections (list): sections to start with, in order
+    """
+    def __init__(self, sections=()) -> None:
+        self.sections = {x: error_section() for x in sections}
+
+
+    def __getitem__(self, section) -> error_section:
+        return self.sections[section]
+
+
+    def __setitem__(self, section, messages) -> None:
+        if not isinstance(messages, error_section):
+            messages = error_section(error(None, x) for x in messages)
+
+        self.sections[section] = messages
+
+
+    def __delitem__(self, section) -> None:
+        del self.sections[section]
+
+
+    def __iter__(self):
+        return iter(self.sections)
+
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+
+    def add(
+            self, code, section, text, row=None, column=None, value=None,
+            template=False, detail=None) -> None:
+        """
+        Add error to section
+
+        Args:
+            - code (str): error code, one of ERROR_CODES
+            - section (str): section of errors to add to
+            - text (str): error message, or template if template is True
+            - row, column, value: as error()
+            - template (bool): text is a template, formatted when read
+            - detail (dict): (optional) other values used in template
+        """
+        if template:
+            detail = detail or NO_DETAIL
+        else:
+            detail = None
+
+        if section not in self.sections:
+            self.sections[section] = error_section()
+
+        self.sections[section].add(code, text, row, column, value, detail)
+
+
+    def last(self, section) -> error:
+        """
+        Error last added to section
+        """
+        errors = self.sections[section]
+
+        return errors.error(len(errors) - 1)
+
+
+    def deduplicate(self) -> int:
+        """
+        Remove errors identical to one before them in the same section
+        (same code, row, column, value and message), i.e. the same error
+        found by more than one check
+
+        Returns:
+            - removed (int): number of errors removed
+        """
+        return sum(x.deduplicate() for x in self.sections.values())
+
+
+    def errors(self):
+        """
+        (section, error) of every error stored, in order of section then
+        order added
+        """
+        for name, section in self.sections.items():
+            for current in section.errors():
+                yield name, current
+
+
+    def counts(self) -> dict:
+        """
+        Number of errors of each code in each section, counted without
+        formatting messages
+
+        Returns:
+            - counts (dict): (section, code) -> number of errors, in order
+                first found
+        """
+        counts = {}
+
+        for name, section in self.sections.items():
+            for code in section.codes:
+                key = (name, code)
+                counts[key] = counts.get(key, 0) + 1
+
+        return counts
+
+
+    def to_dict(self) -> dict:
+        """
+        Plain dict of section -> list of messages, i.e. to send as JSON
+        """
+        return {name: list(section) for name, section in self.items()}
+
+
+    def to_json(self) -> dict:
+        """
+        Errors as JSON serialisable values, without formatting messages
+        """
+        return {
+            name: [x.to_json() for x in section.errors()]
+            for name, section in self.sections.items()
+        }
+
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        Read errors from to_json()
+        """
+        store = cls()
+
+        for name, errors in data.items():
+            store.sections[name] = error_section(
+                error(*current) for current in errors
+            )
+
+        return store
@@ -0,0 +1,202 @@
+"""
+Index kits of known i7 / i5 index sequences, and the orientation each
+instrument reads the i5 index in.
+
+The i5 index (index2) is read as given in the kit on forward strand
+instruments (i.e. MiSeq, HiSeq 2500, NovaSeq 6000 with v1.0 reagents), and
+as its reverse complement on reverse complement instruments (i.e. iSeq,
+MiniSeq, NextSeq, HiSeq 3000 / 4000 / X, NovaSeq 6000 with v1.5 reagents),
+so index2 must be written in the sheet in the orientation of the
+instrument it is run on.
+
+Index kit files are CSV or TSV files (in the same format as Illumina index
+kit definitions) of the indices of a kit, optionally under an [Indices]
+section, with the i5 sequences given in the forward strand orientation:
+
+    [Kit]
+    Name,my_udi_kit
+    [Indices]
+    Name,Sequence,IndexReadNumber
+    UDI0001,AACCGGTT,1
+    UDI0001,TTGGCCAA,2
+
+Kits are loaded once per process into a hash index of sequence -> indices
+of each orientation, so each index2 of a sheet is a single lookup.
+"""
+import csv
+from functools import lru_cache
+import hashlib
+import os
+import re
+
+from validate.barcodes import reverse_complement
+
+
+ORIENTATIONS = ['forward', 'reverse']
+
+# orientation i5 is read in by instrument, matched against the start of
+# the instrument given in the header. NovaSeq 6000 depends on the reagent
+# version so must be given
+I5_ORIENTATION = {
+    'miseq': 'forward',
+    'hiseq 2000': 'forward',
+    'hiseq 2500': 'forward',
+    'iseq': 'reverse',
+    'miniseq': 'reverse',
+    'nextseq': 'reverse',
+    'hiseq 3000': 'reverse',
+    'hiseq 4000': 'reverse',
+    'hiseq x': 'reverse'
+}
+
+# header keys giving instrument, for v1 and v2 sheets
+INSTRUMENT_KEYS = ['Instrument Type', 'InstrumentPlatform', 'InstrumentType']
+
+
+class index_kit():
+    """
+    Hash index of the sequences of one or more index kits
+
+    Args:
+        - indices (list): (kit, name, sequence, read) of each index, read 1
+            for i7 and 2 for i5, with i5 in the forward orientation
+        - digest (str): (optional) hash of kit files, to key cached
+            results on
+    """
+    def __init__(self, indices, digest=None) -> None:
+        self.digest = digest
+
+        # i7 sequence -> (kit, name) of each index
+        self.i7 = {}
+        # i5 sequence in each orientation -> (kit, name) of each index,
+        # the reverse orientation is computed once when loaded
+        self.i5 = {'forward': {}, 'reverse': {}}
+
+        for kit, name, sequence, read in indices:
+            sequence = sequence.upper()
+
+            if read == 1:
+                self.i7.setdefault(sequence, []).append((kit, name))
+            else:
+                self.i5['forward'].setdefault(sequence, []).append(
+                    (kit, name)
+                )
+                self.i5['reverse'].setdefault(
+                    reverse_complement(sequence), []
+                ).append((kit, name))
+
+
+    def __len__(self) -> int:
+        return len(self.i7) + len(self.i5['forward'])
+
+
+    def i5_orientation(self, sequence) -> list:
+        """
+        Orientations the sequence matches a known i5 index in
+
+        Args:
+            - sequence (str): index2 from sheet
+        Returns:
+            - orientations (list): (orientation, kit, name) of each match
+        """
+        return [
+            (orientation, kit, name)
+            for orientation in ORIENTATIONS
+            for kit, name in self.i5[orientation].get(sequence, [])
+        ]
+
+
+def read_index_kit(path) -> list:
+    """
+    Read indices of an index kit file
+
+    Args:
+        - path (str): CSV / TSV index kit file
+    Returns:
+        - indices (list): (kit, name, sequence, read) of each index
+    Raises:
+        - ValueError: no Name, Sequence and IndexReadNumber columns found
+    """
+    kit = os.path.splitext(os.path.basename(path))[0]
+    delimiter = '\t' if str(path).endswith('.tsv') else ','
+
+    with open(path, newline='') as f:
+        rows = [
+            [cell.strip() for cell in row]
+            for row in csv.reader(f, delimiter=delimiter)
+        ]
+
+    columns = None
+    indices = []
+
+    for row in rows:
+        while row and not row[-1]:
+            # trailing empty cells, i.e. ,,,, padding from excel
+            row.pop()
+
+        if not row:
+            continue
+
+        if re.fullmatch(r'\[.+\]', row[0]):
+            # new section, column names follow [Indices]
+            columns = None
+            continue
+
+        if columns is None and row[0] == 'Name' and len(row) == 2:
+            # name of kit from [Kit] section
+            kit = row[1]
+            continue
+
+        if columns is None:
+            if {'Name', 'Sequence', 'IndexReadNumber'}.issubset(row):
+                columns = {x: row.index(x) for x in row}
+            continue
+
+        indices.append((
+            kit, row[columns['Name']], row[columns['Sequence']],
+            int(row[columns['IndexReadNumber']])
+        ))
+
+    if not indices:
+        raise ValueError(
+            f'No indices found in index kit {path}, expected Name, Sequence '
+            'and IndexReadNumber columns'
+        )
+
+    return indices
+
+
+@lru_cache(maxsize=16)
+def load_index_kits(paths) -> index_kit:
+    """
+    Read index kit files into a single hash index, cached so each set of
+    kits is loaded once per process
+
+    Args:
+        - paths (tuple): index kit files
+    Returns:
+        - kits (index_kit): hash index of all indices of kits
+    """
+    digest = hashlib.sha256()
+    indices = []
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+
+        indices.extend(read_index_kit(path))
+
+    return index_kit(indices, digest.hexdigest())
+
+
+def instrument_orientation(instrument) -> str:
+    """
+    Orientation i5 is read in by instrument, or None if not known
+    """
+    instrument = (instrument or '').strip().lower()
+
+    for name, orientation in I5_ORIENTATION.items():
+        if instrument.startswith(name):
+            return orientation
+
+    return None
@@ -0,0 +1,207 @@
+"""
+Persistent index of the barcodes and Sample_IDs of each sample sheet
+validated for a sequencing run, stored in a local SQLite database.
+
+Sheets for the same run (i.e. sharing a flowcell) are often submitted
+separately, so indices clashing between them are not found validating
+each sheet alone. Each sheet validated with a run index has its
+(lane, index, index2, Sample_ID) rows registered against its run, and is
+checked against the rows of the other sheets registered for the run and
+the Sample_IDs registered for any run, with indexed lookups instead of
+reading the other sheets again.
+
+A sheet is identified within a run by name (its path, or a hash of its
+rows if given in memory), registering a sheet again replaces its rows so
+a corrected sheet is not checked against the sheet it replaces.
+"""
+from contextlib import closing
+import hashlib
+import os
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheets (
+    id INTEGER PRIMARY KEY,
+    run TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    registered REAL NOT NULL,
+    UNIQUE (run, sheet)
+);
+CREATE TABLE IF NOT EXISTS barcodes (
+    sheet_id INTEGER NOT NULL REFERENCES sheets (id) ON DELETE CASCADE,
+    run TEXT NOT NULL,
+    lane TEXT,
+    index1 TEXT,
+    index2 TEXT,
+    sample_id TEXT
+);
+CREATE INDEX IF NOT EXISTS barcodes_run_lane ON barcodes (run, lane);
+CREATE INDEX IF NOT EXISTS barcodes_sample_id ON barcodes (sample_id);
+CREATE INDEX IF NOT EXISTS barcodes_sheet ON barcodes (sheet_id);
+"""
+
+# values bound in a single IN (...) lookup, under SQLite's limit of 999
+MAX_VARIABLES = 500
+
+
+def sheet_digest(rows) -> str:
+    """
+    Name for a sheet given in memory, from a hash of its rows so the same
+    sheet registered again replaces itself
+    """
+    return hashlib.sha256(repr(rows).encode()).hexdigest()
+
+
+class run_index():
+    """
+    Barcodes and Sample_IDs of sheets registered for each run, in a SQLite
+    database at path. A connection is opened for each sheet registered,
+    so one run_index may be shared by threads and processes
+
+    Args:
+        - path (str): SQLite database file, created if it does not exist
+        - timeout (float): seconds to wait for other processes registering
+            sheets in the same database
+    """
+    def __init__(self, path, timeout=30) -> None:
+        self.path = str(path)
+        self.timeout = timeout
+
+
+    def connect(self) -> 'sqlite3.Connection':
+        """
+        Open connection to the database, creating tables if needed. sqlite3
+        is imported here so validate.py starts without it
+        """
+        import sqlite3
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        # transactions are started explicitly in register()
+        connection = sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None
+        )
+        connection.execute('PRAGMA foreign_keys = ON')
+        connection.executescript(SCHEMA)
+
+        return connection
+
+
+    def register(self, run, sheet, rows) -> tuple:
+        """
+        Register rows of a sheet for run, replacing any registered before
+        for the same sheet, and find rows of other sheets they may clash
+        with. Looked up and registered in one transaction, so of two sheets
+        registered at the same time the second always sees the first
+
+        Args:
+            - run (str): run (or flowcell) the sheet is for
+            - sheet (str): name of sheet within run
+            - rows (list): (lane, index, index2, Sample_ID) of each row of
+                sheet, lane is None for sheets with no Lane column (all
+                lanes) and index2 None for single indexed sheets
+        Returns:
+            - barcodes (list): (sheet, lane, index, index2, Sample_ID) rows
+                of other sheets for run in any lane of the given rows
+            - sample_ids (list): (run, sheet, Sample_ID) rows of other
+                sheets of any run sharing Sample_IDs with the given rows
+        """
+        lanes = {x[0] for x in rows}
+        sample_ids = list({x[3] for x in rows if x[3] is not None})
+
+        with closing(self.connect()) as connection:
+            # write lock taken up front so no sheet registers in between
+            # the lookups and this sheet being registered
+            connection.execute('BEGIN IMMEDIATE')
+
+            try:
+                connection.execute(
+                    'DELETE FROM sheets WHERE run = ? AND sheet = ?',
+                    (run, sheet)
+                )
+
+                barcodes = self.find_barcodes(connection, run, lanes)
+                found_ids = self.find_sample_ids(connection, sample_ids)
+
+                sheet_id = connection.execute(
+                    'INSERT INTO sheets (run, sheet, registered) '
+                    'VALUES (?, ?, ?)', (run, sheet, time.time())
+                ).lastrowid
+                connection.executemany(
+                    'INSERT INTO barcodes (sheet_id, run, lane, index1, '
+                    'index2, sample_id) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(sheet_id, run, *x) for x in rows]
+                )
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+
+        return barcodes, found_ids
+
+
+    def find_barcodes(self, connection, run, lanes) -> list:
+        """
+        Rows registered for run in any of lanes, or in all lanes (None).
+        Rows registered for all lanes share every lane, as do all rows
+        where None is one of the given lanes
+        """
+        query = (
+            'SELECT sheets.sheet, lane, index1, index2, sample_id '
+            'FROM barcodes JOIN sheets ON sheets.id = barcodes.sheet_id '
+            'WHERE barcodes.run = ?'
+        )
+
+        if None in lanes:
+            return connection.execute(query, (run, )).fetchall()
+
+        lanes = list(lanes)
+        placeholders = ', '.join('?' * len(lanes))
+
+        return connection.execute(
+            f'{query} AND (lane IN ({placeholders}) OR lane IS NULL)',
+            (run, *lanes)
+        ).fetchall()
+
+
+    def find_sample_ids(self, connection, sample_ids) -> list:
+        """
+        Rows registered for any run with one of the given Sample_IDs
+        """
+        found = []
+
+        for start in range(0, len(sample_ids), MAX_VARIABLES):
+            chunk = sample_ids[start:start + MAX_VARIABLES]
+            placeholders = ', '.join('?' * len(chunk))
+
+            found.extend(connection.execute(
+                'SELECT sheets.run, sheets.sheet, sample_id FROM barcodes '
+                'JOIN sheets ON sheets.id = barcodes.sheet_id '
+                f'WHERE sample_id IN ({placeholders})', chunk
+            ).fetchall())
+
+        return found
+
+
+    def sheets(self, run) -> list:
+        """
+        Names of sheets registered for run, in order registered
+        """
+        with closing(self.connect()) as connection:
+            return [x[0] for x in connection.execute(
+                'SELECT sheet FROM sheets WHERE run = ? ORDER BY registered',
+                (run, )
+            )]
+
+
+    def remove(self, run, sheet) -> None:
+        """
+        Remove sheet registered for run, i.e. where it will not be
+        sequenced
+        """
+        with closing(self.connect()) as connection:
+            connection.execute(
+                'DELETE FROM sheets WHERE run = ? AND sheet = ?', (run, sheet)
+            )
@@ -0,0 +1,344 @@
+"""
+Schemas of the keys expected in each section of a sample sheet header
+([Header], [Reads], [Settings] etc.), used by validators.header().
+
+Schemas are JSON (or YAML, if PyYAML is installed) files in the format:
+
+    {
+        "name": "novaseq_x",
+        "version": 2,
+        "match": {"Header": {"InstrumentPlatform": "NovaSeqXSeries"}},
+        "sections": {
+            "Reads": {
+                "keys": {
+                    "Read1Cycles": {"type": "integer", "required": true}
+                }
+            },
+            "BCLConvert_Settings": {
+                "keys": {
+                    "AdapterBehavior": {"allowed": ["trim", "mask"]},
+                    "OverrideCycles": {"pattern": "[YNIU0-9;]+"}
+                }
+            }
+        }
+    }
+
+Each key may give:
+- type: string (default), integer or sequence (only ATCG or -, with an
+    optional separator between sequences, i.e. +)
+- required: key must be present in section
+- allow_empty: if false, key must have a value when present
+- allowed: list of allowed values
+- pattern: regex values must fully match
+- code / label: error code and description of value used in errors
+
+A section may also give "lines", a rule applied to the first cell of every
+line with a value (i.e. the read lengths in [Reads] of v1 sheets).
+
+Schemas are compiled once into a dict of section -> (lower case key ->
+rule), so checking each line of the header is a single dict lookup. Any
+number of schemas may be given, i.e. one per instrument or assay. The first
+schema with a matching version and match values is used for a sheet,
+otherwise the default schema for its version in schemas/.
+"""
+from functools import lru_cache
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+
+
+# default schemas for each version of sample sheet
+SCHEMA_DIR = Path(__file__).parent / 'schemas'
+DEFAULT_SCHEMAS = {1: SCHEMA_DIR / 'v1.json', 2: SCHEMA_DIR / 'v2.json'}
+
+TYPES = ['string', 'integer', 'sequence']
+
+
+class key_rule():
+    """
+    Compiled rule for the value of a key in a schema
+
+    Args:
+        - key (str): key as given in schema
+        - rule (dict): rule for key from schema
+    Raises:
+        - ValueError: invalid rule
+    """
+    def __init__(self, key, rule) -> None:
+        unknown = set(rule) - {
+            'type', 'required', 'allow_empty', 'allowed', 'pattern', 'code',
+            'label', 'separator'
+        }
+
+        if unknown:
+            raise ValueError(
+                f'Unknown schema rule(s) for {key}: {", ".join(unknown)}'
+            )
+
+        self.key = key
+        self.type = rule.get('type', 'string')
+        self.required = rule.get('required', False)
+        self.allow_empty = rule.get('allow_empty', True)
+        self.allowed = (
+            frozenset(rule['allowed']) if 'allowed' in rule else None
+        )
+        self.pattern = (
+            re.compile(rule['pattern']) if 'pattern' in rule else None
+        )
+        self.code = rule.get('code', 'invalid_value')
+        self.label = rule.get('label')
+        self.separator = rule.get('separator')
+
+        if self.type not in TYPES:
+            raise ValueError(
+                f'Invalid type {self.type} for {key}, must be one of {TYPES}'
+            )
+
+
+    def valid(self, value) -> bool:
+        """
+        Check non empty value is valid for rule
+        """
+        if self.type == 'integer' and not value.isnumeric():
+            return False
+
+        if self.type == 'sequence':
+            sequences = (
+                value.split(self.separator) if self.separator else [value]
+            )
+
+            if not all(x.strip('ATCGatcg-') == '' for x in sequences):
+                return False
+
+        if self.allowed is not None and value not in self.allowed:
+            return False
+
+        if self.pattern and not self.pattern.fullmatch(value):
+            return False
+
+        return True
+
+
+class header_schema():
+    """
+    Schema compiled into a lookup of rules for each key of each section
+
+    Args:
+        - schema (dict): schema as read from file
+        - source (str): (optional) file schema was read from, for errors
+    Raises:
+        - ValueError: invalid schema
+    """
+    def __init__(self, schema, source=None) -> None:
+        self.name = schema.get('name') or source
+        self.version = schema.get('version')
+        self.match = schema.get('match', {})
+
+        # hash of schema contents, to key cached results on
+        self.digest = hashlib.sha256(
+            json.dumps(schema, sort_keys=True).encode()
+        ).hexdigest()
+
+        # section -> lower case key -> rule
+        self.keys = {}
+        # section -> rule for first cell of every line
+        self.lines = {}
+        # (section, rule) of every required key
+        self.required = []
+
+        for section, rules in schema.get('sections', {}).items():
+            self.keys[section] = {}
+
+            for key, rule in rules.get('keys', {}).items():
+                compiled = key_rule(key, rule)
+                self.keys[section][key.lower()] = compiled
+
+                if compiled.required:
+                    self.required.append((section, compiled))
+
+            if 'lines' in rules:
+                self.lines[section] = key_rule(section, rules['lines'])
+
+
+    def matches(self, sections) -> bool:
+        """
+        Check schema applies to sheet, from its version and match values
+        """
+        if self.version and self.version != sections.version:
+            return False
+
+        return all(
+            sections.get(section).get(key) == value
+            for section, values in self.match.items()
+            for key, value in values.items()
+        )
+
+
+    def check(self, sections) -> list:
+        """
+        Check sections of sheet against schema
+
+        Args:
+            - sections (sheet_sections): sections of sample sheet
+        Returns:
+            - errors (list): (code, message, line, key, value) of each error,
+                in order of line
+        """
+        errors = []
+
+        for name, keys in self.keys.items():
+            if name not in sections:
+                continue
+
+            section = sections[name]
+
+            for key, (line, value) in section.fields.items():
+                # single lookup of each key of section
+                rule = keys.get(key.lower())
+
+                if rule:
+                    errors.extend(check_value(rule, name, key, line, value))
+
+        for name, rule in self.lines.items():
+            section = sections.get(name)
+
+            for num, row in enumerate(section.rows):
+                if row:
+                    errors.extend(check_value(
+                        rule, name, None, section.first_line + num, row[0]
+                    ))
+
+        # keys given in each section with a required key, found once
+        given = {
+            name: {x.lower() for x in sections.get(name).fields}
+            for name in {x[0] for x in self.required}
+        }
+
+        for name, rule in self.required:
+            if rule.key.lower() not in given[name]:
+                errors.append((
+                    'missing_key',
+                    f'Error in [{name}]: required key {rule.key} not given',
+                    None, rule.key, None
+                ))
+
+        return sorted(errors, key=lambda x: (x[2] is None, x[2] or 0))
+
+
+def check_value(rule, section, key, line, value) -> list:
+    """
+    Check value of a key (or line) against its rule
+
+    Returns:
+        - errors (list): (code, message, line, key, value) of error if
+            invalid, empty list if valid
+    """
+    value = value.strip()
+    label = rule.label or key
+
+    if not value:
+        if rule.allow_empty:
+            return []
+
+        return [(
+            rule.code, f'Error in line {line}: no {label} given', line, key,
+            value
+        )]
+
+    if rule.valid(value):
+        return []
+
+    if key is None:
+        # rule of every line of section
+        message = (
+            f'Error in value for [{section}] given on line {line}: {value}'
+        )
+    elif rule.label:
+        message = f'Error in line {line}: invalid {rule.label} {value}'
+    else:
+        message = (
+            f'Error in value of {key} for [{section}] given on line {line}: '
+            f'{value}'
+        )
+
+    return [(rule.code, message, line, key or f'[{section}]', value)]
+
+
+def read_schema_file(path) -> dict:
+    """
+    Read schema from JSON, or YAML file if PyYAML is installed
+    """
+    with open(path) as f:
+        if str(path).endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError(
+                    f'PyYAML is required to read YAML schema {path}, '
+                    'install it or give the schema as JSON'
+                )
+
+            return yaml.safe_load(f)
+
+        return json.load(f)
+
+
+@lru_cache(maxsize=64)
+def load_schema(path) -> header_schema:
+    """
+    Read and compile schema from file, cached so each schema is compiled
+    once per process
+    """
+    return header_schema(read_schema_file(path), source=str(path))
+
+
+def load_schemas(schemas) -> list:
+    """
+    Load schemas from any of files, directories of .json / .yaml files or
+    already compiled schemas
+
+    Args:
+        - schemas (str | list | header_schema): schema(s) to load
+    Returns:
+        - schemas (list): compiled header_schema objects
+    """
+    if schemas is None:
+        return []
+
+    if isinstance(schemas, (str, Path, header_schema)):
+        schemas = [schemas]
+
+    loaded = []
+
+    for schema in schemas:
+        if isinstance(schema, header_schema):
+            loaded.append(schema)
+        elif os.path.isdir(schema):
+            loaded.extend(
+                load_schema(str(x)) for x in sorted(Path(schema).iterdir())
+                if x.suffix in ('.json', '.yaml', '.yml')
+            )
+        else:
+            loaded.append(load_schema(str(schema)))
+
+    return loaded
+
+
+def select_schema(schemas, sections) -> header_schema:
+    """
+    First of given schemas applying to sheet, or the default schema for
+    its version
+
+    Args:
+        - schemas (list): compiled header_schema objects
+        - sections (sheet_sections): sections of sample sheet
+    Returns:
+        - schema (header_schema): schema to check sheet against
+    """
+    for schema in schemas:
+        if schema.matches(sections):
+            return schema
+
+    return load_schema(str(DEFAULT_SCHEMAS[sections.version]))
@@ -0,0 +1,225 @@
+"""
+Index of the sections of a sample sheet ([Header], [Reads], [Settings],
+[Data] etc.) by name, with the line number each starts on.
+
+Both v1 sample sheets and v2 (BCL Convert, i.e. NovaSeq X) sample sheets
+are supported. In v2 sheets settings for demultiplexing are given in
+[BCLConvert_Settings] and samples in [BCLConvert_Data], which may be
+followed by other sections (i.e. [Cloud_Settings], [Cloud_Data]).
+
+Sections are found in a single pass over the lines of the sheet, the lines
+of each section are only split into keys and values when first looked up.
+"""
+from functools import cached_property
+import re
+
+
+# [Section] in first cell of line, giving section name
+SECTION_REGEX = re.compile(r'\[([^\]]+)\]')
+
+# section holding samples for each version of sample sheet
+DATA_SECTIONS = {1: 'Data', 2: 'BCLConvert_Data'}
+
+# section holding demultiplexing settings for each version
+SETTINGS_SECTIONS = {1: 'Settings', 2: 'BCLConvert_Settings'}
+
+
+def section_name(line) -> str:
+    """
+    Name of section started by line, or None if line does not start one
+    """
+    if not line.startswith('['):
+        return None
+
+    match = SECTION_REGEX.match(line)
+
+    return match.group(1) if match else None
+
+
+class section():
+    """
+    Lines of one section of a sample sheet, split into keys and values on
+    first lookup
+
+    Args:
+        - name (str): name of section, without brackets
+        - first_line (int): line number in file of first line after the
+            [Section] line
+        - lines (list): lines of section, excluding the [Section] line
+    """
+    def __init__(self, name, first_line, lines) -> None:
+        self.name = name
+        self.first_line = first_line
+        self.lines = lines
+
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+
+    @cached_property
+    def rows(self) -> list:
+        """
+        Cells of each line with trailing empty cells removed, blank lines
+        (i.e. ,,,, padding from excel) are kept as empty lists
+        """
+        rows = []
+
+        for line in self.lines:
+            cells = line.split(',')
+
+            while cells and not cells[-1].strip():
+                cells.pop()
+
+            rows.append(cells)
+
+        return rows
+
+
+    @cached_property
+    def fields(self) -> dict:
+        """
+        Key (first cell) -> (line number, value of second cell) of each
+        line, the first line is kept where a key is repeated
+        """
+        fields = {}
+
+        for num, line in enumerate(self.lines):
+            key, _, rest = line.partition(',')
+
+            if key and key not in fields:
+                fields[key] = (self.first_line + num, rest.split(',')[0])
+
+        return fields
+
+
+    def get(self, key, default=None) -> str:
+        """
+        Value of key, or default if key not in section
+        """
+        if key not in self.fields:
+            return default
+
+        return self.fields[key][1]
+
+
+    def line(self, key) -> int:
+        """
+        Line number in file of key, or None if key not in section
+        """
+        if key not in self.fields:
+            return None
+
+        return self.fields[key][0]
+
+
+class sheet_sections():
+    """
+    Sections of a sample sheet indexed by name
+
+    Lines before the first [Section] line are indexed as the Header
+    section, as the first line of a sheet should always be [Header].
+
+    Args:
+        - lines (list): lines of sheet before the data body, including the
+            column names line
+        - trailing_lines (list): (optional) lines after the data body,
+            starting with a [Section] line
+        - trailing_start (int): (optional) line number of first of
+            trailing_lines
+    """
+    def __init__(self, lines, trailing_lines=(), trailing_start=None) -> None:
+        self.sections = {}
+        self.index(lines, 1)
+
+        if trailing_lines:
+            self.index(trailing_lines, trailing_start)
+
+
+    def index(self, lines, first_line) -> None:
+        """
+        Add sections found in lines, numbered from first_line
+        """
+        # None until the first [Section] line, lines before it are Header
+        name = None
+        start = 0
+
+        for num, line in enumerate(lines):
+            current = section_name(line)
+
+            if current is None:
+                continue
+
+            if name is not None or num:
+                # end of previous section
+                self.add(name, first_line + start, lines[start:num])
+
+            name = current
+            start = num + 1
+
+        if name is not None or lines:
+            self.add(name, first_line + start, lines[start:])
+
+
+    def add(self, name, first_line, lines) -> None:
+        """
+        Add section, lines with no [Section] line before them are Header
+        """
+        name = name or 'Header'
+
+        if name in self.sections:
+            # repeated section, keep first as used by bcl-convert
+            return
+
+        self.sections[name] = section(name, first_line, lines)
+
+
+    def __contains__(self, name) -> bool:
+        return name in self.sections
+
+
+    def __getitem__(self, name) -> section:
+        return self.sections[name]
+
+
+    def get(self, name) -> section:
+        """
+        Section by name, or an empty section if not in sheet
+        """
+        return self.sections.get(name) or section(name, None, [])
+
+
+    def names(self) -> list:
+        """
+        Names of sections in order found
+        """
+        return list(self.sections)
+
+
+    @cached_property
+    def version(self) -> int:
+        """
+        Version of sample sheet format, 2 for BCL Convert sheets
+        """
+        if 'BCLConvert_Data' in self.sections or (
+            self.get('Header').get('FileFormatVersion', '').strip() == '2'
+        ):
+            return 2
+
+        return 1
+
+
+    @property
+    def data_section(self) -> str:
+        """
+        Name of section holding samples for this version of sheet
+        """
+        return DATA_SECTIONS[self.version]
+
+
+    @property
+    def settings_section(self) -> str:
+        """
+        Name of section holding demultiplexing settings for this version
+        """
+        return SETTINGS_SECTIONS[self.version]
@@ -0,0 +1,232 @@
+"""
+Long running validation server, keeping regex patterns compiled and pandas
+imported between requests instead of paying for them on every sheet.
+
+Listens on a local TCP port or a Unix socket for HTTP requests:
+- POST /validate with a JSON body of {"samplesheet": "/path/to/sheet.csv"},
+    optionally with "barcode_mismatches" and "max_errors", responds with the
+    errors dict as JSON
+- POST /validate with the sample sheet itself as the body (plain or
+    compressed with gzip, bzip2 or xz), optionally with barcode_mismatches
+    and max_errors in the query string, validated in memory without
+    writing the upload to disk
+- GET /health responds with {"status": "ok"}
+
+Requests are handled concurrently on a fixed size pool of worker threads.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import os
+import socketserver
+from urllib.parse import parse_qs, urlsplit
+
+from validate.schema import load_schemas
+from validate.validate import pattern_set, sheet_checks, validate_sheet
+
+
+class pooled_server_mixin():
+    """
+    Handle each request on a thread from a fixed size pool, rather than
+    serially or with a new thread per request
+    """
+    def start_pool(self, workers) -> None:
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+
+    def process_request(self, request, client_address) -> None:
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+
+    def process_request_thread(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown()
+
+
+class pooled_http_server(pooled_server_mixin, HTTPServer):
+    """
+    HTTP server on a TCP port handling requests on a worker pool
+    """
+    pass
+
+
+class pooled_unix_http_server(
+        pooled_server_mixin, socketserver.UnixStreamServer):
+    """
+    HTTP server on a Unix socket handling requests on a worker pool
+    """
+    def server_close(self) -> None:
+        super().server_close()
+
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+class validation_handler(BaseHTTPRequestHandler):
+    """
+    Handle validation requests, settings are set on the class by
+    make_server() and shared by all requests
+    """
+    regex_patterns = None
+    barcode_mismatches = None
+    max_errors = None
+    header_schema = None
+    i5_orientation = None
+    index_kits = None
+
+
+    def address_string(self) -> str:
+        # client address is empty for Unix sockets
+        return self.client_address[0] if self.client_address else 'local'
+
+
+    def send_json(self, status, body) -> None:
+        """
+        Send response with JSON body
+        """
+        response = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+
+    def do_GET(self) -> None:
+        if self.path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        else:
+            self.send_json(404, {'error': f'Unknown path: {self.path}'})
+
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+
+        if url.path != '/validate':
+            self.send_json(404, {'error': f'Unknown path: {self.path}'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length)
+
+            if body.lstrip()[:1] == b'{':
+                # JSON request giving path of sheet
+                request = json.loads(body)
+                sample_sheet = request['samplesheet']
+            else:
+                # sheet uploaded as the body, settings from query string
+                request = {
+                    key: int(values[-1])
+                    for key, values in parse_qs(url.query).items()
+                    if key in ('barcode_mismatches', 'max_errors')
+                }
+                sample_sheet = body
+        except (ValueError, TypeError, KeyError):
+            self.send_json(400, {
+                'error': (
+                    'Request body must be JSON with a samplesheet path, '
+                    'or the samplesheet'
+                )
+            })
+            return
+
+        try:
+            errors = validate_sheet(
+                sample_sheet, self.regex_patterns,
+                request.get('barcode_mismatches', self.barcode_mismatches),
+                max_errors=request.get('max_errors', self.max_errors),
+                header_schema=self.header_schema,
+                i5_orientation=self.i5_orientation,
+                index_kits=self.index_kits
+            )
+        except Exception as err:
+            self.send_json(400, {
+                'error': f'Failed to read sample sheet: {err}'
+            })
+            return
+
+        self.send_json(200, errors)
+
+
+def make_server(
+        host='127.0.0.1', port=8000, socket_path=None, regex_patterns=None,
+        barcode_mismatches=None, workers=None, max_errors=None,
+        header_schema=None, i5_orientation=None, index_kits=None):
+    """
+    Set up validation server, compiling regex patterns and header schemas,
+    loading index kits and importing pandas up front so every request is
+    handled warm
+
+    Args:
+        - host (str): address to listen on, defaults to localhost only
+        - port (int): port to listen on, 0 picks a free port
+        - socket_path (str): (optional) listen on Unix socket at this path
+            instead of a TCP port
+        - regex_patterns (list): (optional) list of regex patterns to validate
+            Sample_ID against for valid sample naming
+        - barcode_mismatches (int): (optional) default number of barcode
+            mismatches allowed when demultiplexing
+        - workers (int): (optional) number of worker threads, defaults to
+            the number of CPUs
+        - max_errors (int): (optional) default maximum errors to find in
+            each sheet before stopping
+        - header_schema (str | list): (optional) header schema file(s) or
+            directories of schemas to check headers against
+        - i5_orientation (str): (optional) orientation the instrument reads
+            i5 in, as validate_sheet()
+        - index_kits (str | list): (optional) index kit file(s) of known
+            indices, as validate_sheet()
+    Returns:
+        - server (pooled_http_server | pooled_unix_http_server): server
+            ready to call serve_forever() on
+    """
+    # imported now so the first request does not pay for it
+    import pandas
+
+    handler = type('handler', (validation_handler, ), {
+        'regex_patterns': pattern_set(regex_patterns) if regex_patterns
+        else None,
+        'barcode_mismatches': barcode_mismatches,
+        'max_errors': max_errors,
+        'header_schema': load_schemas(header_schema),
+        'i5_orientation': i5_orientation,
+        'index_kits': sheet_checks(
+            i5_orientation=i5_orientation, index_kits=index_kits
+        )[1]
+    })
+
+    if socket_path:
+        server = pooled_unix_http_server(socket_path, handler)
+    else:
+        server = pooled_http_server((host, port), handler)
+
+    server.start_pool(workers or os.cpu_count())
+
+    return server
+
+
+def serve(**kwargs) -> None:
+    """
+    Run validation server until interrupted, arguments as make_server()
+    """
+    server = make_server(**kwargs)
+
+    print(f'Serving sample sheet validation on {server.server_address}')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
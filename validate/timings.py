@@ -0,0 +1,149 @@
+"""
+Timing of each step of validating a sample sheet.
+
+A validation_timings object passed to validate_sheet() records the time
+taken to read the sheet and run each check, along with the rows processed
+and errors added by each. Optionally each step may also be profiled with
+cProfile, or have its peak memory allocated recorded with tracemalloc.
+
+cProfile, pstats and tracemalloc are imported only when profiling, as
+this module is imported on every start of validate.py.
+"""
+from contextlib import contextmanager
+import io
+import time
+
+
+PROFILERS = ['cprofile', 'tracemalloc']
+
+
+class validation_timings():
+    """
+    Records time taken for each step of validating a sheet.
+
+    self.steps is a list of dicts for each step with keys:
+        - step (str): name of step
+        - seconds (float): time taken
+        - rows (int): number of rows processed
+        - errors (int): number of errors added
+        - peak_memory_bytes (int): (tracemalloc only) peak memory allocated
+    """
+    def __init__(self, profile=None) -> None:
+        if profile not in (None, *PROFILERS):
+            raise ValueError(
+                f'Invalid profiler {profile}, must be one of {PROFILERS}'
+            )
+
+        self.profile = profile
+        self.steps = []
+        self.profiler = None
+
+        if profile == 'cprofile':
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+
+
+    @contextmanager
+    def step(self, name, rows=0, errors=None):
+        """
+        Time the block of code run in the context as a named step
+
+        Args:
+            - name (str): name of step
+            - rows (int): number of rows processed in step
+            - errors (dict): (optional) errors dict added to in step, used
+                to count the errors added
+        Yields:
+            - result (dict): result of step, rows may be updated in the
+                block where not known before it is run
+        """
+        result = {'step': name, 'seconds': 0, 'rows': rows, 'errors': 0}
+        errors_before = count_errors(errors)
+
+        if self.profile == 'tracemalloc':
+            # started per step so tracing overhead is not added to time
+            # outside of steps
+            import tracemalloc
+
+            tracemalloc.start()
+
+        if self.profiler:
+            self.profiler.enable()
+
+        start = time.perf_counter()
+
+        try:
+            yield result
+        finally:
+            result['seconds'] = time.perf_counter() - start
+
+            if self.profiler:
+                self.profiler.disable()
+
+            result['errors'] = count_errors(errors) - errors_before
+
+            if self.profile == 'tracemalloc':
+                _, result['peak_memory_bytes'] = (
+                    tracemalloc.get_traced_memory()
+                )
+                tracemalloc.stop()
+
+            self.steps.append(result)
+
+
+    def total(self) -> float:
+        """
+        Total time taken across all steps
+        """
+        return sum(x['seconds'] for x in self.steps)
+
+
+    def report(self, top=15) -> str:
+        """
+        Format table of steps, and if profiled with cProfile the functions
+        taking the most cumulative time
+
+        Args:
+            - top (int): number of functions from cProfile to include
+        Returns:
+            - report (str): formatted report
+        """
+        lines = [f'{"step":<16}{"seconds":>10}{"rows":>10}{"errors":>8}']
+
+        if self.profile == 'tracemalloc':
+            lines[0] += f'{"peak memory":>12}'
+
+        for step in self.steps:
+            line = (
+                f'{step["step"]:<16}{step["seconds"]:>10.4f}'
+                f'{step["rows"]:>10}{step["errors"]:>8}'
+            )
+
+            if 'peak_memory_bytes' in step:
+                line += f'{step["peak_memory_bytes"] / 1024 ** 2:>10.2f}MB'
+
+            lines.append(line)
+
+        lines.append(f'{"total":<16}{self.total():>10.4f}')
+
+        if self.profiler:
+            import pstats
+
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats(
+                'cumulative'
+            ).print_stats(top)
+            lines.extend(['', stream.getvalue()])
+
+        return '\n'.join(lines)
+
+
+def count_errors(errors) -> int:
+    """
+    Total number of errors in errors dict
+    """
+    if not errors:
+        return 0
+
+    return sum(len(x) for x in errors.values())
@@ -9,11 +9,294 @@ See readme for full details on what is checked.
 Jethro Rainford 211007
 """
 import argparse
+from contextlib import contextmanager, nullcontext, redirect_stdout
+import csv
+from functools import lru_cache
+import importlib
+import io
+import json
+import mmap
+import os
 import re
-import string
 import sys
+import threading
+
+if not __package__:
+    # running as script (python validate/validate.py), replace the script
+    # directory on the path with the repository root so the validate
+    # package is importable rather than this module shadowing it
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from validate.barcodes import (
+    encode_index, find_close_barcodes, reverse_complements
+)
+from validate.cache import result_cache
+from validate.checks import check_registry
+from validate.errors import error_store
+from validate.index_kits import (
+    INSTRUMENT_KEYS, ORIENTATIONS, instrument_orientation, load_index_kits
+)
+from validate.run_index import run_index, sheet_digest
+from validate.schema import load_schemas, select_schema
+from validate.sections import sheet_sections
+from validate.timings import PROFILERS, validation_timings
+
+
+# Sample_ID and Sample_Name may only contain alphanumeric, - and _
+VALID_NAME_REGEX = r'[A-Za-z0-9_-]*'
+VALID_NAME = re.compile(VALID_NAME_REGEX)
+
+# cell values read as empty (nan), pandas default NA values so pandas and
+# csv readers give the same values
+NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null'
+}
+
+# value of empty cells, one nan shared by every cell as pandas shares
+# np.nan, so rows with empty cells group together (nan != nan, but keys
+# holding the same object are equal)
+NA = float('nan')
+
+# codes of each type of error, included in structured error records
+ERROR_CODES = {
+    'header_first_line': 'first line of header is not [Header]',
+    'no_investigator': 'no investigator name given',
+    'no_experiment': 'no experiment name given',
+    'invalid_reads': 'value given for [Reads] is not an integer',
+    'invalid_adapter': 'adapter sequence contains characters other than ATCG',
+    'no_data_section': 'line before column names is not [Data]',
+    'extra_fields': 'data row has more values than there are columns',
+    'invalid_value': 'header value not allowed by header schema',
+    'missing_key': 'header key required by header schema not given',
+    'missing_value': 'Sample_ID / Sample_Name is empty',
+    'invalid_characters': 'Sample_ID / Sample_Name has invalid characters',
+    'too_long': 'Sample_ID / Sample_Name is over 100 characters',
+    'duplicate_sample_id': 'Sample_ID duplicated in same lane with same index',
+    'pattern_mismatch': 'Sample_ID matches none of the given name patterns',
+    'no_index_column': 'no index column in sample sheet',
+    'invalid_index_characters': 'index contains characters other than ATCG',
+    'duplicate_index': 'index (or index + index2) duplicated in a lane',
+    'index_collision': 'indices too similar for allowed barcode mismatches',
+    'index2_orientation': (
+        'index2 matches a known i5 index in the orientation not read by '
+        'the instrument'
+    ),
+    'index2_reverse_duplicate': (
+        'index + index2 is the reverse complement of another in the lane'
+    ),
+    'index2_reverse_collision': (
+        'indices too similar to the reverse complement of another in the lane'
+    ),
+    'run_duplicate_index': (
+        'indices already used by another sheet registered for the run'
+    ),
+    'run_index_collision': (
+        'indices too similar to those of another sheet registered for the '
+        'run'
+    ),
+    'run_duplicate_sample_id': (
+        'Sample_ID already used by another sheet registered for a run'
+    ),
+    'truncated': 'validation stopped early, remaining checks not run'
+}
+
+# modules to decompress sample sheets with as they are read, by extension
+COMPRESSION = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'lzma'}
+
+# modules to decompress sample sheets given in memory with, by magic bytes
+COMPRESSION_MAGIC = {
+    b'\x1f\x8b': 'gzip', b'BZh': 'bz2', b'\xfd7zXZ\x00': 'lzma'
+}
+
+# plain sample sheets of at least this size are memory mapped to be read
+MMAP_MIN_SIZE = 64 * 1024 ** 2
+
+# numbered backreferences (i.e. \1) in a regex pattern
+BACKREFERENCE_REGEX = re.compile(r'\\[1-9]')
+
+
+class sheet_body():
+    """
+    Pandas free data body of a sample sheet, used in place of a DataFrame
+    by validators. Columns are held as lists of strings, with nan for
+    empty cells as read by pandas.
+    """
+    def __init__(self, columns, rows) -> None:
+        self.columns = columns
+        self.row_count = len(rows)
+        width = len(columns)
+
+        # (0-based row, number of values) of rows with more values than
+        # columns, reported by validators.row_fields()
+        self.extra_fields = [
+            (row, len(values)) for row, values in enumerate(rows)
+            if len(values) > width
+        ]
+
+        # rows padded / cut to number of columns
+        rows = [
+            (row + [''] * (width - len(row)))[:width] for row in rows
+        ]
+
+        self.data = {
+            column: [
+                NA if x in NA_VALUES else x for x in values
+            ] for column, values in zip(columns, zip(*rows))
+        } if rows else {column: [] for column in columns}
+
+
+    def __getitem__(self, column) -> list:
+        return self.data[column]
+
+
+    def __len__(self) -> int:
+        return self.row_count
+
+
+    def splice(self, start, end, body) -> None:
+        """
+        Replace rows start:end with the rows of another body with the same
+        columns, i.e. rows changed in an edited sheet (see watch.py)
+
+        Args:
+            - start (int): first row to replace
+            - end (int): row after last row to replace
+            - body (sheet_body): rows to put in their place
+        """
+        for column, values in self.data.items():
+            values[start:end] = body.data[column]
+
+        shift = len(body) - (end - start)
+
+        self.extra_fields = [x for x in self.extra_fields if x[0] < start] + [
+            (start + row, count) for row, count in body.extra_fields
+        ] + [(row + shift, count) for row, count in self.extra_fields if (
+            row >= end
+        )]
+        self.row_count += shift
+
+
+class pattern_set():
+    """
+    Set of regex patterns to validate sample IDs against, compiled once
+    into a single regex of alternating named groups so each sample ID is
+    searched once instead of once per pattern.
+
+    Results are kept in an LRU cache as the same sample IDs are commonly
+    checked again (i.e. across lanes and when re-validating sheets), a
+    pattern_set may be shared between validators instances and sheets.
+    """
+    def __init__(self, patterns, cache_size=65536) -> None:
+        if isinstance(patterns, str):
+            # pattern is string and not list, probably passed just one
+            patterns = [patterns]
+
+        self.patterns = list(patterns)
+
+        # compile each individually first so an invalid pattern gives an
+        # error for just that pattern
+        compiled = [re.compile(x) for x in self.patterns]
+
+        try:
+            if any(x.groupindex or BACKREFERENCE_REGEX.search(x.pattern)
+                   for x in compiled):
+                # named groups may clash and numbered backreferences would
+                # point at the wrong group once patterns are combined
+                raise re.error('patterns cannot be combined')
+
+            self.regex = re.compile('|'.join(
+                f'(?P<pattern_{num}>{x})'
+                for num, x in enumerate(self.patterns)
+            ))
+        except re.error:
+            # i.e. inline global flags not at the start of the combined
+            # regex, fall back to searching each pattern in turn
+            self.regex = None
+
+        self.compiled = compiled
+
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+        self.matches = lru_cache(maxsize=cache_size)(self._matches)
+
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
 
-import pandas as pd
+    def _matches(self, sample) -> bool:
+        """
+        Check if given sample ID matches any of the patterns, with a single
+        search of the combined regex
+
+        Args:
+            - sample (str): sample ID to search patterns for
+        Returns:
+            - matched (bool): True if any pattern matches sample ID
+        """
+        if self.regex:
+            return self.regex.search(sample) is not None
+
+        return any(x.search(sample) for x in self.compiled)
+
+
+    def _match(self, sample) -> str:
+        """
+        Find pattern matching given sample ID
+
+        The combined regex finds the pattern matching leftmost in the
+        sample ID, patterns given before it may still match further along
+        so only those are then searched in turn. Where only whether any
+        pattern matches is needed, matches() searches once
+
+        Args:
+            - sample (str): sample ID to search patterns for
+        Returns:
+            - pattern (str): first pattern in the order given matching
+                sample ID, or None if it matches none of the patterns
+        """
+        first = len(self.patterns)
+
+        if self.regex:
+            match = self.regex.search(sample)
+
+            if not match:
+                return None
+
+            # lastgroup is the outer named group wrapping the pattern
+            first = int(match.lastgroup.split('_')[1])
+
+        for pattern in self.compiled[:first]:
+            if pattern.search(sample):
+                return pattern.pattern
+
+        return self.patterns[first] if first < len(self.patterns) else None
+
+
+@lru_cache(maxsize=32)
+def load_pattern_set(patterns) -> pattern_set:
+    """
+    Get compiled pattern_set for tuple of regex patterns, cached to reuse
+    across validators instances for the same patterns
+    """
+    return pattern_set(patterns)
+
+
+class error_limit_reached(Exception):
+    """
+    Raised by validators.add_error() when the maximum number of errors has
+    been found, stopping any further checks
+    """
+    pass
+
+
+class validation_cancelled(Exception):
+    """
+    Raised by validate_sheet() when the cancelled event given is set,
+    stopping before the next step (reading the sheet or a check)
+    """
+    pass
 
 
 class validators():
@@ -21,104 +304,180 @@ class validators():
     Functions to validate each part of sample sheet.
     self.errors is dict used to store any errors found to return / print
     """
-    def __init__(self, samplesheet, regex_patterns=None) -> None:
-        # self.errors is dict to add errors from each section to
-        self.errors = {
-            'header': [],
-            'Sample_ID': [],
-            'Sample_Name': [],
-            'index': [],
-            'index2': []
-        }
+    def __init__(
+            self, samplesheet, regex_patterns=None,
+            barcode_mismatches=None, max_errors=None, on_error=None,
+            header_schemas=None, run_index=None, run=None,
+            sheet_name=None, i5_orientation=None,
+            index_kits=None) -> None:
+        # self.errors is store of errors of each section, read as a dict
+        # of lists of messages (see errors.py)
+        self.errors = error_store([
+            'header', 'Sample_ID', 'Sample_Name', 'index', 'index2'
+        ])
         self.samplesheet_body = samplesheet[0]
         self.samplesheet_header = samplesheet[1]
         self.header_count = samplesheet[2] + 1
+
+        if len(samplesheet) > 3:
+            self.sections = samplesheet[3]
+        else:
+            # sections not given with sheet, i.e. read by caller
+            self.sections = sheet_sections(self.samplesheet_header)
         self.regex_patterns = regex_patterns
+        self.barcode_mismatches = barcode_mismatches
+        self.max_errors = max_errors
+        self.error_count = 0
+
+        # checks may add errors from several threads at once
+        self.lock = threading.Lock()
+
+        # called with record of each error as it is found
+        self.on_error = on_error
+
+        # header schemas to check sheet against, before the defaults
+        self.header_schemas = load_schemas(header_schemas)
+
+        # index of sheets registered for each run, to check against and
+        # register this sheet in (see run_index.py)
+        self.run_index = run_index
+        self.run = run
+        self.sheet_name = sheet_name
+
+        # orientation of i5 for the instrument ('forward', 'reverse' or
+        # 'auto' from the header) and known i5 indices (see index_kits.py)
+        self.i5_orientation = i5_orientation
+        self.index_kits = index_kits
 
         if isinstance(self.regex_patterns, str):
             # pattern is string and not list, probably passed just one
             self.regex_patterns = [self.regex_patterns]
 
+        if self.regex_patterns and not isinstance(
+            self.regex_patterns, pattern_set
+        ):
+            # compiled pattern sets are cached, so validating more sheets
+            # with the same patterns reuses the compiled regex and matches
+            self.regex_patterns = load_pattern_set(tuple(self.regex_patterns))
+
+
+    def add_error(
+            self, key, code, message, row=None, column=None, value=None,
+            template=False, **detail) -> None:
+        """
+        Add error to section of self.errors, and pass it as a structured
+        record to self.on_error if set
+
+        Args:
+            - key (str): section of self.errors to add to
+            - code (str): error code, one of ERROR_CODES
+            - message (str): error message, or template of message if
+                template is True
+            - row (int | list): (optional) row number(s) of sample sheet
+                file error is on
+            - column (str): (optional) column (or header field) of error
+            - value: (optional) offending value
+            - template (bool): message is a template only formatted when
+                read, with {row}, {rows}, {column}, {value} and the names
+                of detail (see errors.error)
+            - detail: other values used in template
+        Raises:
+            - error_limit_reached: max_errors set and reached
+        """
+        with self.lock:
+            self.errors.add(
+                code, key, message, row, column, value, template,
+                detail or None
+            )
+            self.error_count += 1
+
+            if self.on_error:
+                self.on_error(self.errors.last(key).record(key))
+
+            if self.max_errors and self.error_count >= self.max_errors:
+                raise error_limit_reached()
+
 
     def header(self) -> None:
         """
         Validate header against:
         - first line being [Header]
-        - having Investigator and Experiment names set
-        - Valid value for reads
-        - Last line of header is [Data]
-        - Column names begin with Sample_ID Sample_Name, all others are
-            variable
-        """
-        header_errors = []
-
-        # regex to match adapter lines as they can be Adapter, Adapter1,
-        # AdapterRead1 etc.
-        adapter_regex = re.compile("^adapter(read)?[1,2]?", re.IGNORECASE)
-
-        for num, line in enumerate(self.samplesheet_header):
-            # check each line of header for specific matches
-            if num == 0:
-                if not line.startswith('[Header]'):
-                    # first line should always be [Header]
-                    header_errors.append(
-                        f'Error in line {num + 1} of header: value should be [Header]'
-                    )
-
-            if line.startswith('Investigator'):
-                # check invesitgator name set
-                if not line.split(',')[1]:
-                    header_errors.append(
-                        f'Error in line {num + 1}: no investigator name given'
-                    )
-
-            if line.startswith('Experiment'):
-                # check experiment name set
-                if not line.split(',')[1]:
-                    header_errors.append(
-                        f'Error in line {num + 1}: no experiment name given'
-                    )
-
-            if line.startswith('[Reads]'):
-                # check the next line is a valid integer
-                if not self.samplesheet_header[num + 1].strip(',').isnumeric():
-                    header_errors.append((
-                        f'Error in value for [Reads] given on line {num + 1}: '
-                        f'{self.samplesheet_header[num + 1].strip(",")}'
-                    ))
-
-            if re.search(adapter_regex, line):
-                # check given adaptor sequence(s) are valid
-                if not all(c in 'ATCGatcg-' for c in line.split(',')[1]):
-                    header_errors.append((
-                        f'Error in line {num + 1}: invalid adapter sequence '
-                        f'{line.split(",")[1]}'
-                    ))
-
-            if num == len(self.samplesheet_header) - 2:
-                # line before column names should always be [Data]
-                if not line.startswith('[Data]'):
-                    header_errors.append(
-                        f'Error in line {num + 1}: the first cell should contain [Data]'
-                    )
-
-        if header_errors:
-            self.errors['header'].extend(header_errors)
+        - keys of each section against the header schema for the sheet
+            (see schema.py), by default:
+            - having Investigator and Experiment names set
+            - Valid value for reads
+            - Valid adapter sequences in settings
+        - Last line of header is [Data] ([BCLConvert_Data] for v2 sheets)
+        - No data rows having more values than there are column names (see
+            row_fields())
+        """
+        if not self.samplesheet_header[0].startswith('[Header]'):
+            # first line should always be [Header]
+            self.add_error('header', 'header_first_line', (
+                'Error in line 1 of header: value should be [Header]'
+            ), row=1, value=self.samplesheet_header[0].split(',')[0])
+
+        # keys of each section checked against schema for sheet
+        schema = select_schema(self.header_schemas, self.sections)
+
+        for code, message, line, key, value in schema.check(self.sections):
+            self.add_error(
+                'header', code, message, row=line, column=key, value=value
+            )
 
+        data_section = self.sections.data_section
+        column_line = len(self.samplesheet_header)
 
-    def check_name_or_id(self, column) -> None:
+        if (
+                column_line > 1
+                and self.sections.get(data_section).first_line != column_line):
+            # line before column names should always be the data section,
+            # where there is a line before them
+            self.add_error('header', 'no_data_section', (
+                f'Error in line {column_line - 1}: the first cell should '
+                f'contain [{data_section}]'
+            ), row=column_line - 1,
+                value=self.samplesheet_header[-2].split(',')[0])
+
+        self.row_fields()
+
+
+    def row_fields(self) -> None:
+        """
+        Check for rows with more values than there are columns, i.e. from a
+        comma typed into a value shifting the values after it into the
+        wrong columns. Values after the last column are dropped from a
+        sheet_body so would otherwise pass unnoticed, pandas instead reads
+        them into the index of the DataFrame or fails to read the sheet
         """
-        Checks both Sample_Name and Sample_ID columns for valid names
+        if not isinstance(self.samplesheet_body, sheet_body):
+            return
+
+        width = len(self.samplesheet_body.columns)
+
+        for row, count in self.samplesheet_body.extra_fields:
+            self.add_error('header', 'extra_fields', (
+                'Error in line {row}: {value} values given for {width} '
+                'columns, values after the last column are ignored'
+            ), row=self.header_count + row, value=count, template=True,
+                width=width)
+
+
+    def check_name_or_id(self, column) -> None:
         """
-        valid_chars = string.ascii_letters + string.digits + '_' + '-'
+        Checks both Sample_Name and Sample_ID columns for valid names.
 
+        Each check is run over the whole column at once with pandas string
+        methods (or a precompiled regex for a sheet_body) to give a mask of
+        failing rows, messages are then only built for rows that fail
+        """
         if column == 'Sample_Name':
             if column not in self.samplesheet_body.columns:
                 # Sample_Name not required => may not be present
                 print(f'{column} not in columns, skipping check')
                 return
 
-            if all(self.samplesheet_body[column].isnull()):
+            if all(isinstance(x, float) for x in self.values(column)):
                 # column name specified but no values entered, not required
                 # so print message and continue witout validation errors
                 print((
@@ -127,75 +486,186 @@ class validators():
                 ))
                 return
 
-        column_vals = self.samplesheet_body[column].tolist()
+        column_vals = self.samplesheet_body[column]
 
-        for row, name in enumerate(column_vals):
-            if isinstance(name, float):
-                # float -> nan value -> empty cell
-                self.errors[column].append((
-                    f'{column} in row {self.header_count + row} is missing / '
-                    f'invalid: ({name})'
-                ))
+        if isinstance(column_vals, list):
+            # pandas free sheet_body, check with precompiled regex
+            missing, invalid, too_long, failed = self.name_flags(
+                column, column_vals
+            )
+        else:
+            # nan value -> empty cell, filled with empty string to allow
+            # using string methods over whole column
+            missing = column_vals.isna()
+            names = column_vals.where(~missing, '').astype(str)
+
+            # check for any none alphanumeric or -/_ characters, and
+            # check name/id is not too long
+            invalid = ~missing & ~names.str.fullmatch(VALID_NAME_REGEX)
+            too_long = names.str.len() > 100
+
+            failed = (missing | invalid | too_long).to_numpy().nonzero()[0]
+
+            column_vals, missing, invalid, too_long = (
+                x.tolist() for x in (column_vals, missing, invalid, too_long)
+            )
+            failed = failed.tolist()
+
+        for row in failed:
+            name = column_vals[row]
+
+            if missing[row]:
+                self.add_error(column, 'missing_value', (
+                    '{column} in row {row} is missing / invalid: ({value})'
+                ), row=self.header_count + row, column=column, value=name,
+                    template=True)
                 continue
 
-            if not all(c in valid_chars for c in name):
-                # check for any none alphanumeric or -/_ characters
-                self.errors[column].append((
-                    f'Invalid characters in sample: {name} in row '
-                    f'{self.header_count + row}'
-                ))
+            if invalid[row]:
+                self.add_error(column, 'invalid_characters', (
+                    'Invalid characters in sample: {value} in row {row}'
+                ), row=self.header_count + row, column=column, value=name,
+                    template=True)
 
-            # check name/id is not too long
-            if len(name) > 100:
-                self.errors[column].append((
-                    f'{column} invalid (> 100 characters) in row '
-                    f'{self.header_count + row}: {name} '
-                ))
+            if too_long[row]:
+                self.add_error(column, 'too_long', (
+                    '{column} invalid (> 100 characters) in row {row}: '
+                    '{value} '
+                ), row=self.header_count + row, column=column, value=name,
+                    template=True)
+
+
+    def name_flags(self, column, names) -> tuple:
+        """
+        Flag names of a pandas free column that are missing, have invalid
+        characters or are too long
+
+        Args:
+            - column (str): name of column, so flags may be kept as a sheet
+                is edited (see watch.py)
+            - names (list): values of Sample_ID / Sample_Name column
+        Returns:
+            - missing (list): True for each empty cell
+            - invalid (list): True for each name with invalid characters
+            - too_long (list): True for each name over 100 characters
+            - failed (list): positions of names with any flag set
+        """
+        missing = [isinstance(x, float) for x in names]
+        invalid = [
+            not (is_missing or VALID_NAME.fullmatch(x))
+            for x, is_missing in zip(names, missing)
+        ]
+        too_long = [
+            not is_missing and len(x) > 100
+            for x, is_missing in zip(names, missing)
+        ]
+        failed = [
+            row for row, flags in enumerate(zip(missing, invalid, too_long))
+            if any(flags)
+        ]
+
+        return missing, invalid, too_long, failed
 
 
     def check_duplicate_ids(self):
         """
         Check for duplicate sample_ids, they are allowed if either they are on
-        different lanes OR the same lane with different indices
+        different lanes OR the same lane with different indices.
+
+        Rows are grouped on (Sample_ID, lane, index) in a single pass, any
+        group with more than one row is a collision
         """
-        sample_ids = self.samplesheet_body['Sample_ID'].tolist()
+        sample_ids = self.values('Sample_ID')
 
-        # check for duplicate samples
-        duplicates = list(set(
-            [x for x in sample_ids if sample_ids.count(x) > 1]
-        ))
+        # lane and index are optional for grouping, use None for every row
+        # if the column is not present
+        lanes = self.column_values(['lane', 'Lane'])
+        indices = self.column_values(['index', 'Index'])
+
+        duplicates = self.find_duplicates(
+            'sample_id', sample_ids, lanes, indices
+        )
+
+        for (dup, _, _), rows in duplicates.items():
+            if isinstance(dup, float):
+                # float -> nan value -> empty cell, caught in check_name_or_id
+                continue
+
+            # more than one sample id with the same lane and / or index
+            # which is probably wrong
+            self.add_error('Sample_ID', 'duplicate_sample_id', (
+                'Duplicate sample ID found in same lane and / or with same '
+                'indices: {value} in rows {row}'
+            ), row=self.file_rows(rows), column='Sample_ID', value=dup,
+                template=True)
+
+
+    def find_duplicates(self, name, *columns) -> dict:
+        """
+        Group rows on the combined values of the given columns, see
+        find_duplicates()
+
+        Args:
+            - name (str): name of grouping, so groups may be kept and
+                updated as a sheet is edited (see watch.py)
+            - columns (list): one or more equal length lists of column
+                values
+        Returns:
+            - duplicates (dict): tuple of column values -> list of 0-based
+                row positions sharing those values, in order first seen
+        """
+        return find_duplicates(*columns)
+
+
+    def values(self, column) -> list:
+        """
+        Get values of column as list, from either a DataFrame or
+        sheet_body data body
+
+        Args:
+            - column (str): name of column
+        Returns:
+            - values (list): values of column, with nan for empty cells
+        """
+        values = self.samplesheet_body[column]
+
+        if isinstance(values, list):
+            return values
 
-        if duplicates:
-            # found duplicates, check if in different lanes and/or have
-            # different indices
-            for dup in duplicates:
-                # get rows containing duplicate sample IDs
-                dup_rows = self.samplesheet_body[
-                    self.samplesheet_body['Sample_ID'] == dup
-                ]
+        return values.tolist()
 
-                # dropping everything except for lane (if present) and index
-                # then checking if rows are unique
-                check_columns = ['Sample_ID', 'lane', 'Lane', 'index', 'Index']
 
-                for df_col in dup_rows.columns:
-                    if df_col not in check_columns:
-                        # remove all unneeded columns
-                        dup_rows = dup_rows.drop(columns=[df_col])
+    def column_values(self, names) -> list:
+        """
+        Get values of first column found from given possible names, or a
+        list of None if no column present
+
+        Args:
+            - names (list): possible names of column (i.e. lane / Lane)
+        Returns:
+            - values (list): values of column
+        """
+        for name in names:
+            if name in self.samplesheet_body.columns:
+                return self.values(name)
+
+        return [None] * len(self.samplesheet_body)
 
-                total_rows = len(dup_rows.index)
 
-                dup_rows = dup_rows.drop_duplicates(ignore_index=True)
+    def file_rows(self, rows) -> list:
+        """
+        Convert list of 0-based row positions in the body to row numbers of
+        the sample sheet file
+        """
+        return [self.header_count + row for row in rows]
 
-                unique_rows = len(dup_rows.index)
 
-                if total_rows > unique_rows:
-                    # if we're here that means we have more than one sample id
-                    # with the same lane and / or index which is probably wrong
-                    self.errors['Sample_ID'].append(
-                        f'Duplicate sample ID found in same lane and / or with '
-                        f'same indices: {dup}'
-                    )
+    def format_rows(self, rows) -> str:
+        """
+        Format list of 0-based row positions in the body as comma separated
+        row numbers of the sample sheet file
+        """
+        return ', '.join(str(x) for x in self.file_rows(rows))
 
 
     def sample_id(self) -> None:
@@ -211,30 +681,22 @@ class validators():
 
         # if given, use regex patterns to validate sample ids against
         if self.regex_patterns:
-            sample_ids = self.samplesheet_body['Sample_ID'].tolist()
+            sample_ids = self.values('Sample_ID')
 
-            # compile all regex upfront to make searching faster
-            regex_patterns = [re.compile(x) for x in self.regex_patterns]
-
-            for idx, sample in enumerate(sample_ids):
-                # for each sample, try each regex to find a match
+            for row, sample in enumerate(sample_ids):
                 if isinstance(sample, float):
                     # float value => empty,
                     # already caught in check_name_or_id() so continue here
                     continue
 
-                for pattern in regex_patterns:
-                    match = re.search(pattern, sample)
-                    if match:
-                        # found match => stop checking current sample
-                        break
-                if not match:
+                if not self.regex_patterns.matches(str(sample)):
                     # no matches found in given patterns
-                    self.errors['Sample_ID'].append((
-                        f'Sample ID {sample} is invalid, please ensure it '
+                    self.add_error('Sample_ID', 'pattern_mismatch', (
+                        'Sample ID {value} is invalid, please ensure it '
                         'conforms to the expected format for the given sample '
                         'assay'
-                    ))
+                    ), row=self.header_count + row, column='Sample_ID',
+                        value=sample, template=True)
 
 
     def sample_name(self) -> None:
@@ -245,13 +707,16 @@ class validators():
         self.check_name_or_id('Sample_Name')
 
 
-    def indices(self) -> None:
+    def index_columns(self) -> tuple:
         """
-        Validate index and index2 columns
+        Find index and index2 columns of sheet
+
+        Returns:
+            - index1 (list): name of index column, empty if not present
+            - index2 (list): name of index2 column, empty if not present
         """
-        columns = self.samplesheet_body.columns.tolist()
+        columns = list(self.samplesheet_body.columns)
 
-        # find index columns
         index1 = [
             x for x in columns if x.strip('\n') == 'index' or
             x.strip('\n') == 'Index'
@@ -261,25 +726,53 @@ class validators():
             x.strip('\n') == 'Index2'
         ]
 
+        return index1, index2
+
+
+    def indices(self) -> None:
+        """
+        Validate index and index2 columns
+        """
+        index1, index2 = self.index_columns()
+
         if index1:
-            self.check_index(index1[0])
+            keys = self.check_index(index1[0])
         else:
             # should always have at least one set of indices
-            self.errors['index'].append(
+            self.add_error('index', 'no_index_column', (
                 'Sample sheet appears to have no index column (index / Index)'
-            )
+            ), column='index')
 
         if index2:
             # not always used, therefore check first
-            self.check_index(index2[0])
+            keys2 = self.check_index(index2[0])
 
+        if index1:
+            # indices must be unique as a combination within each lane
+            self.check_index_combinations(
+                index1[0], index2[0] if index2 else None, keys,
+                keys2 if index2 else None
+            )
+
+        if index1 and self.barcode_mismatches is not None:
+            # check for barcodes too similar to demultiplex, only if the
+            # number of allowed mismatches is given
+            self.check_index_distance(
+                index1[0], index2[0] if index2 else None
+            )
 
-    def check_index(self, index_column) -> None:
+
+    def check_index(self, index_column) -> list:
         """
-        Validate sample index against for having non ATCG characters and
-        duplicates being present in index column
+        Validate sample index against for having non ATCG characters
+
+        Args:
+            - index_column (str): name of index column
+        Returns:
+            - keys (list): packed index of each row (or the index where
+                invalid) to group rows on
         """
-        indices = self.samplesheet_body[index_column].tolist()
+        indices = self.values(index_column)
 
         if '2' not in index_column:
             # set key for adding messages to errors dict
@@ -287,157 +780,1603 @@ class validators():
         else:
             index_key = 'index2'
 
-        for row, index in enumerate(indices):
-            if not all(c in 'ATCG' for c in index):
+        # indices packed 2 bits per base, invalid characters flagged with
+        # None while packing
+        codes = self.encode_indices(index_column, indices)
+
+        for row, code in enumerate(codes):
+            if code is None:
                 # check for invalid characters
-                self.errors[index_key].append((
-                    f'Invalid characters found in index: {index} at row '
-                    f'{self.header_count + row}'
-                ))
+                index = indices[row]
+                self.add_error(index_key, 'invalid_index_characters', (
+                    'Invalid characters found in index: {value} at row {row}'
+                ), row=self.header_count + row, column=index_column,
+                    value=index, template=True)
+
+        # packed indices returned to group rows on, or the index itself
+        # where invalid
+        return [
+            index if code is None else code
+            for index, code in zip(indices, codes)
+        ]
 
-        duplicates = duplicates = set([
-            x for x in indices if indices.count(x) > 1
-        ])
 
-        if duplicates:
-            for i in duplicates:
-                self.errors[index_key].append(
-                    f'Duplicate indices found in {index_key}: {i}'
-                )
+    def encode_indices(self, column, indices) -> list:
+        """
+        Pack each index of a column, see encode_index(). The name of the
+        column is given so packed indices may be kept as a sheet is
+        edited (see watch.py)
+        """
+        return [encode_index(x) for x in indices]
 
 
-def validate_sheet(sample_sheet, regex_patterns=None) -> dict:
-    """
-    Call all functions to validate sample sheet, validate.errors dict will
-    be populated with errors if found
-    Args:
-        - sample_sheet (tuple): contains df of samplesheet data (df), sample
-            sheet header (list) and header_count (int)
-        - regex_patterns (list): (optional) list of regex patterns to validate
-            Sample_ID against for valid sample naming
-    Returns:
-        - errors (dict): dictionary of errors found in samplesheet, if none
-            found will be a dict of keys with empty values
-    """
-    sample_sheet = read_sheet(sample_sheet)
-    validate = validators(sample_sheet, regex_patterns)
+    def check_index_combinations(
+            self, index_column, index2_column=None, keys=None,
+            keys2=None) -> None:
+        """
+        Check each index (or index + index2 combination for dual indexed
+        sheets) is used once per lane, so the same indices may be reused in
+        other lanes. Rows are grouped on (lane, index, index2) in a single
+        pass, for sheets with no Lane column all rows are one lane
+
+        Args:
+            - index_column (str): name of index column
+            - index2_column (str): (optional) name of index2 column
+            - keys (list): (optional) values to group index on, as
+                returned by check_index(), defaults to the indices
+            - keys2 (list): (optional) values to group index2 on
+        """
+        indices = self.values(index_column)
 
-    validate.header()
-    validate.sample_id()
-    validate.sample_name()
-    validate.indices()
+        if index2_column:
+            indices2 = self.values(index2_column)
+        else:
+            indices2 = [None] * len(indices)
 
-    return validate.errors
+        lanes = self.column_values(['lane', 'Lane'])
 
+        duplicates = self.find_duplicates(
+            'indices', lanes, keys or indices, keys2 or indices2
+        )
 
-def read_sheet(file) -> tuple:
-    """
-    Read header and body of samplesheet into df, returned in a tuple
+        for (lane, _, _), rows in duplicates.items():
+            barcode = [
+                x for x in (indices[rows[0]], indices2[rows[0]])
+                if x is not None
+            ]
 
-    Args:
-        - file (str): name of samplesheet file to validate
-    Returns:
-        - sample_sheet (tuple): contains df of samplesheet data (df), sample
-            sheet header (list) and header_count (int)
-    """
-    with open(file) as f:
-        # read in header of file, column names should always start with Sample_
-        samplesheet_header = []
-        for count, line in enumerate(f.readlines()):
-            if 'Sample_ID' not in line:
-                samplesheet_header.append(line.rstrip())
-            else:
-                # Sample_ID present => line is column names
-                samplesheet_header.append(line.rstrip())
-                column_names = line.split(',')
-                break
+            if any(isinstance(x, float) for x in barcode):
+                # float -> nan value -> empty cell, caught as invalid
+                continue
 
-        # used to return what row issues are on when looping over data body
-        header_count = count + 1
+            barcode = '+'.join(barcode)
+            in_lane = '' if lane is None else f' in lane {lane}'
 
-    samplesheet_df = pd.read_csv(
-        file, skiprows=header_count, names=column_names
-    )
+            self.add_error('index', 'duplicate_index', (
+                'Duplicate indices found{in_lane}: {value} at rows {row}'
+            ), row=self.file_rows(rows), column=index_column, value=barcode,
+                template=True, in_lane=in_lane)
 
-    return (samplesheet_df, samplesheet_header, header_count)
 
+    def check_index_distance(self, index_column, index2_column=None) -> None:
+        """
+        Check for barcodes within the same lane that are too similar to be
+        demultiplexed with the allowed number of barcode mismatches.
 
-def read_name_patterns(config_file):
-    """
-    Read regex patterns used for validating sample IDs from file
+        Two barcodes collide when a read could be within the allowed
+        mismatches of both, i.e. the hamming distance between them is
+        no more than twice the allowed mismatches. Where index2 is given,
+        both indices of the pair must be within this distance.
+        """
+        indices = self.values(index_column)
+        lanes = self.column_values(['lane', 'Lane'])
+
+        # barcode of each row, float -> nan value -> empty cell, not compared
+        if index2_column:
+            barcodes = [
+                None if isinstance(index, float) or isinstance(index2, float)
+                else (index, index2) for index, index2 in zip(
+                    indices, self.values(index2_column)
+                )
+            ]
+        else:
+            barcodes = [
+                None if isinstance(index, float) else (index, )
+                for index in indices
+            ]
+
+        for first, second in self.close_pairs(lanes, barcodes):
+            self.add_error('index', 'index_collision', (
+                'Indices in rows {rows[0]} and {rows[1]} collide with '
+                '{mismatches} barcode mismatch(es) allowed: {value[0]} '
+                'and {value[1]}'
+            ), row=self.file_rows([first, second]), column=index_column,
+                value=['+'.join(barcodes[first]), '+'.join(barcodes[second])],
+                template=True, mismatches=self.barcode_mismatches)
+
+
+    def close_pairs(self, lanes, barcodes) -> list:
+        """
+        Find pairs of rows in the same lane with barcodes too similar to
+        demultiplex with the allowed barcode mismatches
+
+        Args:
+            - lanes (list): lane of each row
+            - barcodes (list): (index, index2) tuple of each row, or None
+                for rows with an empty index not to compare
+        Returns:
+            - pairs (list): (row, row) tuples of 0-based row positions, by
+                lane in order first seen then by row
+        """
+        # group barcodes by lane, only compared against others in same lane
+        by_lane = {}
 
-    Args:
-        - config_file (str): filename of config file containing regex patterns
-    Returns:
-        regex_patterns (list): list of patterns read from file
-    """
-    with open(config_file) as f:
-        regex_patterns = [x.rstrip() for x in f.readlines()]
+        for row, (lane, barcode) in enumerate(zip(lanes, barcodes)):
+            if barcode is None:
+                continue
 
-    return regex_patterns
+            by_lane.setdefault(lane, ([], []))
+            by_lane[lane][0].append(row)
+            by_lane[lane][1].append(barcode)
 
+        max_distance = 2 * self.barcode_mismatches
 
-def parse_args():
-    """
-    Parse cmd line arguments
-    """
-    parser = argparse.ArgumentParser(
-        description=(
-            "Validate Illumina sample sheet against defined requirements. "
-            "Requires passing a samplesheet, and optionally a list or file of "
-            "regex patterns to validate sample IDs against. "
-            "See readme for details."
-        )
-    )
+        return [
+            (rows[i], rows[j])
+            for rows, lane_barcodes in by_lane.values()
+            for i, j, _ in find_close_barcodes(lane_barcodes, max_distance)
+        ]
 
-    parser.add_argument(
-        '--samplesheet', required=True,
-        help="sample sheet to validate"
-    )
-    parser.add_argument(
-        '--name_patterns', nargs='*', action="store", required=False,
-        help='regex pattern(s) against which to validate sample names'
-    )
-    parser.add_argument(
-        '--name_patterns_file', required=False,
-        help='file of regex pattern(s) against which to validate sameple names'
-    )
 
-    args = parser.parse_args()
+    def instrument(self) -> str:
+        """
+        Instrument given in header, or None if not given
+        """
+        header = self.sections.get('Header')
 
-    return args
+        for key in INSTRUMENT_KEYS:
+            if header.get(key, '').strip():
+                return header.get(key).strip()
 
+        return None
 
-def main():
-    # turns off chained assignment warning - not req. as
-    # intentionally writing back to df
-    # pd.options.mode.chained_assignment = None
 
-    args = parse_args()
+    def index2_orientation(self) -> None:
+        """
+        Check index2 for indices written in the wrong orientation for the
+        instrument. Where self.index_kits is given, each index2 is looked up
+        in both orientations against the known i5 indices, to find those in
+        the orientation not read by the instrument (or, where the
+        instrument is not known, in the opposite orientation to the rest of
+        the sheet). Every sheet is checked for an index + index2 being the
+        reverse complement of another in the same lane, which would be read
+        as the same barcode if either was written in the wrong orientation
+        """
+        index1, index2 = self.index_columns()
 
-    regex_patterns = None
+        if not index2:
+            return
 
-    if args.name_patterns_file:
-        # regex patterns given in file, read to list
-        regex_patterns = read_name_patterns(args.name_patterns_file)
+        indices2 = self.values(index2[0])
 
-    if args.name_patterns:
-        # regex patterns passed in cmd line arg
-        regex_patterns = args.name_patterns
+        # reverse complement of whole column, in one translate
+        reverse = reverse_complements(indices2)
 
-    print(f'\nChecking samplesheet for issues\n')
+        self.check_reverse_duplicates(
+            index1[0] if index1 else None, index2[0], reverse
+        )
 
-    # run validation
-    errors = validate_sheet(args.samplesheet, regex_patterns)
+        if self.index_kits is None:
+            return
 
-    if not all(x == [] for x in errors.values()):
-        # found some errors => print
-        for key, val in errors.items():
-            if val:
-                print(f'\n\nErrors found in {key}:\n')
-                [print(f'\t{x}') for x in val]
-    else:
-        print(f'\nSUCCESS: Samplesheet has passed validation.\n')
+        expected = self.i5_orientation
+        instrument = self.instrument()
+
+        if expected in (None, 'auto'):
+            expected = instrument_orientation(instrument)
+
+        # (orientation, kit, name) of known i5 indices each index2 matches
+        matches = [
+            self.index_kits.i5_orientation(x) if isinstance(x, str) else []
+            for x in indices2
+        ]
+        orientations = [{x[0] for x in match} for match in matches]
+
+        if expected is None:
+            # instrument not known, expect orientation most of sheet is in
+            counts = {
+                x: sum(found == {x} for found in orientations)
+                for x in ORIENTATIONS
+            }
+            expected = max(ORIENTATIONS, key=lambda x: counts[x])
+            reason = (
+                f'other index2 in the sheet match the {expected} orientation'
+            )
+
+            if not counts[expected]:
+                return
+        else:
+            reason = (
+                f'{instrument or "the instrument"} reads i5 in the '
+                f'{expected} orientation'
+            )
+
+        for row, (index, match, found) in enumerate(
+            zip(indices2, matches, orientations)
+        ):
+            if not found or expected in found:
+                continue
+
+            orientation, kit, name = match[0]
+
+            self.add_error('index2', 'index2_orientation', (
+                'Index2 {value} at row {row} matches i5 index {name} of '
+                '{kit} in the {orientation} orientation, {reason}'
+            ), row=self.header_count + row, column=index2[0], value=index,
+                template=True, name=name, kit=kit, orientation=orientation,
+                reason=reason)
+
+
+    def check_reverse_duplicates(
+            self, index_column, index2_column, reverse) -> None:
+        """
+        Check for index + index2 of a row being the reverse complement of
+        index2 of another row with the same index in the same lane, and
+        where barcode mismatches are given, for those too similar to the
+        reverse complement of another
+
+        Args:
+            - index_column (str): name of index column, or None if no index
+            - index2_column (str): name of index2 column
+            - reverse (list): reverse complement of each index2
+        """
+        indices2 = self.values(index2_column)
+        indices = self.values(index_column) if index_column else (
+            [''] * len(indices2)
+        )
+        lanes = self.column_values(['lane', 'Lane'])
+
+        by_lane = {}
+
+        for row, (lane, index, index2, rc) in enumerate(
+            zip(lanes, indices, indices2, reverse)
+        ):
+            if isinstance(index, str) and isinstance(index2, str):
+                by_lane.setdefault(lane, []).append((row, index, index2, rc))
+
+        for lane, rows in by_lane.items():
+            in_lane = '' if lane is None else f' in lane {lane}'
+
+            # first row of each index + index2 as written
+            written = {}
+
+            for row, index, index2, _ in rows:
+                written.setdefault((index, index2), row)
+
+            for row, index, index2, rc in rows:
+                other = written.get((index, rc))
+
+                if other is None or other >= row or rc == index2:
+                    # pairs reported once, palindromes are duplicates of
+                    # themselves and reported as duplicate indices
+                    continue
+
+                self.add_error('index2', 'index2_reverse_duplicate', (
+                    'Index2 {value} at row {rows[1]}{in_lane} is the reverse '
+                    'complement of index2 {reverse} at row {rows[0]} with '
+                    'the same index {index}'
+                ), row=self.file_rows([other, row]), column=index2_column,
+                    value=index2, template=True, in_lane=in_lane,
+                    reverse=rc, index=index)
+
+            if self.barcode_mismatches is None:
+                continue
+
+            # barcodes as written then reversed, only reporting pairs of one
+            # barcode as written and one reversed from different rows
+            barcodes = [(x[1], x[2]) for x in rows] + [
+                (x[1], x[3]) for x in rows
+            ]
+
+            for i, j, _ in find_close_barcodes(
+                barcodes, 2 * self.barcode_mismatches
+            ):
+                j -= len(rows)
+
+                if j < 0 or j <= i:
+                    continue
+
+                row, other = rows[i][0], rows[j][0]
+
+                self.add_error('index2', 'index2_reverse_collision', (
+                    'Indices {indices[0]}+{value} at row {rows[0]}{in_lane} '
+                    'collide with {reverse[0]}+{reverse[1]} (index2 of row '
+                    '{rows[1]} reverse complemented) with {mismatches} '
+                    'barcode mismatch(es) allowed'
+                ), row=self.file_rows([row, other]), column=index2_column,
+                    value=barcodes[i][1], template=True, in_lane=in_lane,
+                    indices=barcodes[i], reverse=barcodes[len(rows) + j],
+                    mismatches=self.barcode_mismatches)
+
+
+    def run_name(self) -> str:
+        """
+        Run the sheet is for, as given to validate_sheet() or from the
+        header (RunName of v2 sheets, Experiment Name of v1 sheets)
+        """
+        if self.run:
+            return self.run
+
+        key = 'RunName' if self.sections.version == 2 else 'Experiment Name'
+        run = self.sections.get('Header').get(key, '').strip()
+
+        return run or None
+
+
+    def run_rows(self) -> list:
+        """
+        (lane, index, index2, Sample_ID) of each row to register for run,
+        with None for empty cells and columns not in the sheet
+        """
+        index1, index2 = self.index_columns()
+        empty = [None] * len(self.samplesheet_body)
+
+        columns = [
+            self.column_values(['lane', 'Lane']),
+            self.values(index1[0]) if index1 else empty,
+            self.values(index2[0]) if index2 else empty,
+            self.column_values(['Sample_ID'])
+        ]
+
+        return [
+            tuple(
+                None if x is None or isinstance(x, float) else str(x)
+                for x in row
+            ) for row in zip(*columns)
+        ]
+
+
+    def cross_run(self) -> None:
+        """
+        Check indices against those of other sheets registered for the same
+        run in self.run_index, and Sample_IDs against those of sheets
+        registered for any run, then register this sheet for its run.
+        Sheets with no run given or in their header are not checked
+        """
+        run = self.run_name()
+
+        if self.run_index is None or run is None:
+            return
+
+        rows = self.run_rows()
+        sheet = self.sheet_name or sheet_digest(rows)
+
+        registered, sample_ids = self.run_index.register(run, sheet, rows)
+
+        self.check_run_indices(run, rows, registered)
+
+        # other sheets using each Sample_ID, in order registered
+        used = {}
+
+        for other_run, other_sheet, sample in sample_ids:
+            used.setdefault(sample, []).append(
+                f'sheet {other_sheet} for run {other_run}'
+            )
+
+        used = {sample: ', '.join(sheets) for sample, sheets in used.items()}
+
+        for row, (_, _, _, sample) in enumerate(rows):
+            if sample not in used:
+                continue
+
+            self.add_error('Sample_ID', 'run_duplicate_sample_id', (
+                'Sample ID {value} in row {row} is already registered in '
+                '{sheets}'
+            ), row=self.header_count + row, column='Sample_ID', value=sample,
+                template=True, sheets=used[sample])
+
+
+    def check_run_indices(self, run, rows, registered) -> None:
+        """
+        Check indices of sheet against those of other sheets registered for
+        run sharing a lane (sheets with no Lane column share every lane).
+        Where either sheet is single indexed only index is compared
+
+        Args:
+            - run (str): run sheet is registered for
+            - rows (list): (lane, index, index2, Sample_ID) of each row
+            - registered (list): (sheet, lane, index, index2, Sample_ID)
+                rows of other sheets registered for run
+        """
+        dual = all(x[2] is not None for x in rows) and all(
+            x[3] is not None for x in registered
+        )
+
+        def barcode(index, index2):
+            return (index, index2) if dual else (index, )
+
+        # message of collisions, formatted with the indices of the
+        # registered row when read
+        other_indices = '{other[0]}+{other[1]}' if dual else '{other[0]}'
+        collision = (
+            'Indices {value} in row {row}{in_lane} collide with '
+            + other_indices + ' of {sample} in sheet {sheet} registered '
+            'for run {run} with {mismatches} barcode mismatch(es) allowed'
+        )
+
+        by_lane = {}
+
+        for row, (lane, index, index2, _) in enumerate(rows):
+            if index is not None and (index2 is not None or not dual):
+                by_lane.setdefault(lane, []).append(
+                    (row, barcode(index, index2))
+                )
+
+        for lane, barcodes in by_lane.items():
+            others = [
+                x for x in registered if x[2] is not None and (
+                    lane is None or x[1] is None or x[1] == lane
+                )
+            ]
+            in_lane = '' if lane is None else f' in lane {lane}'
+
+            # registered rows by barcode, for exact duplicates
+            by_barcode = {}
+
+            for other in others:
+                by_barcode.setdefault(barcode(other[2], other[3]), []).append(
+                    other
+                )
+
+            for row, current in barcodes:
+                for other in by_barcode.get(current, []):
+                    self.add_error('index', 'run_duplicate_index', (
+                        'Indices {value} in row {row}{in_lane} are already '
+                        'used by {sample} in sheet {sheet} registered for '
+                        'run {run}'
+                    ), row=self.header_count + row, column='index',
+                        value='+'.join(current), template=True,
+                        in_lane=in_lane, sample=other[4], sheet=other[0],
+                        run=run)
+
+            if self.barcode_mismatches is None:
+                continue
+
+            # compare against registered barcodes together, only reporting
+            # pairs of one barcode from each sheet
+            other_barcodes = [barcode(x[2], x[3]) for x in others]
+
+            for i, j, _ in find_close_barcodes(
+                [x[1] for x in barcodes] + other_barcodes,
+                2 * self.barcode_mismatches
+            ):
+                if i >= len(barcodes) or j < len(barcodes):
+                    continue
+
+                row, current = barcodes[i]
+                other = others[j - len(barcodes)]
+
+                self.add_error(
+                    'index', 'run_index_collision', collision,
+                    row=self.header_count + row, column='index',
+                    value='+'.join(current), template=True, in_lane=in_lane,
+                    other=other_barcodes[j - len(barcodes)],
+                    sample=other[4], sheet=other[0], run=run,
+                    mismatches=self.barcode_mismatches)
+
+
+# checks run on every sheet by validate_sheet(), site specific checks may be
+# registered here (see checks.py)
+CHECKS = check_registry()
+CHECKS.register(
+    'header', validators.header,
+    reads=[
+        '[Header]', '[Reads]', '[Settings]', '[Data]',
+        '[BCLConvert_Settings]', '[BCLConvert_Data]'
+    ],
+    sections=['header']
+)
+CHECKS.register(
+    'sample_id', validators.sample_id,
+    reads=['Sample_ID', 'Lane', 'index'], sections=['Sample_ID']
+)
+CHECKS.register(
+    'sample_name', validators.sample_name,
+    reads=['Sample_Name'], sections=['Sample_Name']
+)
+CHECKS.register(
+    'indices', validators.indices,
+    reads=['index', 'index2', 'Lane'], sections=['index', 'index2']
+)
+
+
+def find_duplicates(*columns) -> dict:
+    """
+    Group rows on the combined values of the given columns in a single
+    pass, keeping only the groups that occur on more than one row
+
+    Args:
+        - columns (list): one or more equal length lists of column values
+    Returns:
+        - duplicates (dict): tuple of column values -> list of 0-based row
+            positions sharing those values, in order first seen
+    """
+    groups = {}
+
+    for row, key in enumerate(zip(*columns)):
+        groups.setdefault(key, []).append(row)
+
+    return {key: rows for key, rows in groups.items() if len(rows) > 1}
+
+
+def summarise_errors(errors) -> dict:
+    """
+    Number of errors of each type in each section, i.e. '412 error(s):
+    index contains characters other than ATCG', without formatting the
+    message of each error
+
+    Args:
+        - errors (error_store): errors from validate_sheet_errors()
+    Returns:
+        - summary (dict): section -> line for each error code in section
+    """
+    summary = {}
+
+    for (section, code), count in errors.counts().items():
+        summary.setdefault(section, []).append(
+            f'{count} error(s): {ERROR_CODES.get(code, code)}'
+        )
+
+    return summary
+
+
+def sheet_checks(
+        checks=None, i5_orientation=None, index_kits=None,
+        run_index=None) -> tuple:
+    """
+    Checks to run for the given settings of validate_sheet(), adding the
+    checks of index2 orientation and of other sheets for the same run
+    where their settings are given
+
+    Args:
+        - checks (check_registry): (optional) checks to run, defaults to
+            CHECKS
+        - i5_orientation (str): (optional) as validate_sheet()
+        - index_kits (str | list | index_kit): (optional) as
+            validate_sheet()
+        - run_index (run_index): (optional) as validate_sheet()
+    Returns:
+        - checks (check_registry): checks to run
+        - index_kits (index_kit): index kits loaded, or None if not given
+    Raises:
+        - ValueError: invalid i5 orientation given
+    """
+    if i5_orientation not in (None, 'auto', *ORIENTATIONS):
+        raise ValueError(
+            f'Invalid i5 orientation {i5_orientation}, must be one of '
+            f'{["auto", *ORIENTATIONS]}'
+        )
+
+    if isinstance(index_kits, (str, os.PathLike)):
+        index_kits = [index_kits]
+
+    if index_kits is not None and not hasattr(index_kits, 'i5'):
+        # loaded once per process, and reused for every sheet
+        index_kits = load_index_kits(tuple(str(x) for x in index_kits))
+
+    checks = checks or CHECKS
+
+    if i5_orientation or index_kits is not None:
+        checks = checks.copy()
+        checks.register(
+            'index2_orientation', validators.index2_orientation,
+            reads=['[Header]', 'Lane', 'index', 'index2'],
+            sections=['index2']
+        )
+
+    if run_index is not None:
+        checks = checks.copy()
+        checks.register(
+            'run_index', validators.cross_run,
+            reads=['[Header]', 'Lane', 'index', 'index2', 'Sample_ID'],
+            sections=['index', 'Sample_ID']
+        )
+
+    return checks, index_kits
+
+
+def validate_sheet(*args, **kwargs) -> dict:
+    """
+    Validate sample sheet, returning errors as a plain dict
+
+    Args:
+        - args, kwargs: sample sheet and settings to validate with, as
+            validate_sheet_errors()
+    Returns:
+        - errors (dict): errors found in samplesheet, section -> list of
+            messages (JSON serialisable). If none found each section is
+            empty
+    Raises:
+        - validation_cancelled: as validate_sheet_errors()
+    """
+    return validate_sheet_errors(*args, **kwargs).to_dict()
+
+
+def validate_sheet_errors(
+        sample_sheet, regex_patterns=None, barcode_mismatches=None,
+        use_pandas=True, cache=None, timings=None, max_errors=None,
+        on_error=None, checks=None, workers=1, header_schema=None,
+        run_index=None, run=None, sheet_name=None, i5_orientation=None,
+        index_kits=None, cancelled=None) -> error_store:
+    """
+    Call all functions to validate sample sheet, validate.errors will be
+    populated with errors if found. As validate_sheet(), with errors kept
+    as records and messages only formatted when read
+    Args:
+        - sample_sheet (str | bytes | file | tuple): samplesheet to
+            validate, any of:
+            - name of samplesheet file, may be compressed with gzip, bzip2
+                or xz (.gz, .bz2, .xz)
+            - contents of samplesheet as str (any str with a newline is
+                taken as contents) or bytes / bytearray / memoryview, bytes
+                may be compressed
+            - open text or binary file, binary files are left open
+            - (DataFrame | sheet_body, header, header_count) tuple as
+                returned by read_sheet(), validated without reading. The
+                cache is not used for parsed sheets
+        - regex_patterns (list | pattern_set): (optional) list of regex
+            patterns to validate Sample_ID against for valid sample naming
+        - barcode_mismatches (int): (optional) number of barcode mismatches
+            allowed when demultiplexing, checks for indices too similar to
+            each other if given
+        - use_pandas (bool): read sheet into a DataFrame with pandas, if
+            False read with csv module to avoid importing pandas
+        - cache (result_cache): (optional) cache of results, if the same
+            sheet contents have been validated with the same settings the
+            cached errors are returned without parsing the sheet
+        - timings (validation_timings): (optional) records time taken,
+            rows processed and errors added by reading and each check
+        - max_errors (int): (optional) stop validating once this many errors
+            are found, skipping remaining checks. If stopped, errors has
+            a 'truncated' key with a message noting this
+        - on_error (callable): (optional) called with a structured record
+            (see errors.error_record()) of each error as it is found. The
+            cache is not used when given, as errors must be found to be
+            passed on
+        - checks (check_registry): (optional) checks to run, defaults to
+            CHECKS
+        - workers (int): number of threads to run checks with no
+            dependencies between them at the same time on. Checks are run
+            in turn when timed or max_errors is given, so timings are of
+            each check alone and the errors found first are always the same
+        - header_schema (str | list): (optional) header schema file(s) or
+            directories of schemas to check header against (see
+            schema.py), the first applying to the sheet is used otherwise
+            the default schema for its version
+        - run_index (run_index): (optional) index of sheets registered for
+            each run (see run_index.py), indices are checked against those
+            of other sheets for the same run and Sample_IDs against those
+            of any run, then the sheet is registered for its run. The cache
+            is not used when given, as every sheet must be registered
+        - run (str): (optional) run (or flowcell) sheet is for, defaults to
+            RunName (v2) or Experiment Name (v1) from the header
+        - sheet_name (str): (optional) name to register sheet under in the
+            run index, so validating an edited version of the sheet again
+            replaces its previous entry. Defaults to the absolute path of
+            sheets given as a file name, other sheets (contents, open files
+            or parsed tuples) are registered under a hash of their rows
+        - i5_orientation (str): (optional) orientation the instrument reads
+            i5 in, 'forward', 'reverse' or 'auto' to find it from the
+            instrument in the header. If given (or index_kits is), index2
+            is also checked in the reverse orientation (see
+            validators.index2_orientation())
+        - index_kits (str | list | index_kit): (optional) index kit file(s)
+            of known indices (see index_kits.py), to find index2 written in
+            the orientation not read by the instrument
+        - cancelled (threading.Event): (optional) event set to stop
+            validating, checked before reading the sheet and before each
+            check (i.e. set by aio.py when the awaiting task is cancelled)
+    Returns:
+        - errors (error_store): errors found in samplesheet by section, read
+            as a dict of lists of messages formatted as they are read (see
+            errors.py), with counts() of each error code. If none found
+            each section is empty
+    Raises:
+        - validation_cancelled: cancelled set before validating finished
+    """
+    if timings is None:
+        # not recording timings, steps run without being timed
+        step = lambda *args, **kwargs: nullcontext({})
+    else:
+        step = timings.step
+
+    if cancelled is not None:
+        timed_step = step
+
+        def step(*args, **kwargs):
+            if cancelled.is_set():
+                raise validation_cancelled()
+
+            return timed_step(*args, **kwargs)
+
+    if on_error:
+        # errors from cache can't be given as they're found
+        cache = None
+
+    # compiled once, and reused across sheets validated with the same files
+    header_schema = load_schemas(header_schema)
+
+    checks, index_kits = sheet_checks(
+        checks, i5_orientation, index_kits, run_index
+    )
+
+    # sheet already parsed into a (body, header, header_count) tuple
+    parsed = isinstance(sample_sheet, tuple)
+
+    # registered in run index by name given or path, otherwise by rows
+    if sheet_name is None and isinstance(
+        sample_sheet, (str, os.PathLike)
+    ) and not is_sheet_contents(sample_sheet):
+        sheet_name = os.path.abspath(sample_sheet)
+
+    if run_index is not None:
+        # every sheet must be checked against and registered in the index
+        cache = None
+
+    if parsed:
+        cache = None
+
+    if cache is not None:
+        with step('cache'):
+            data = sheet_bytes(sample_sheet)
+
+            key = cache.key(
+                data, regex_patterns, barcode_mismatches, max_errors,
+                [x.name for x in checks],
+                [x.digest for x in header_schema], {
+                    'i5_orientation': i5_orientation,
+                    'index_kits': getattr(index_kits, 'digest', None),
+                    # readers differ in errors of malformed rows
+                    'use_pandas': use_pandas
+                }
+            )
+            errors = cache.get(key)
+
+        if isinstance(data, mmap.mmap):
+            # large file hashed from a memory map, mapped again to be
+            # parsed from its path
+            data.close()
+        elif errors is None:
+            # parse contents already read instead of reading file again
+            sample_sheet = data
+
+        if errors is not None:
+            return error_store.from_json(errors)
+
+    if not parsed:
+        with step('read') as result, sheet_source(sample_sheet) as source:
+            if use_pandas:
+                sample_sheet = read_sheet(source)
+            else:
+                sample_sheet = read_sheet_records(source)
+
+            result['rows'] = sample_sheet[2] + len(sample_sheet[0])
+
+    validate = validators(
+        sample_sheet, regex_patterns, barcode_mismatches, max_errors,
+        on_error, header_schema, run_index, run, sheet_name,
+        i5_orientation, index_kits
+    )
+
+    if timings is not None or max_errors:
+        workers = 1
+
+    try:
+        checks.run(validate, workers, step)
+    except error_limit_reached:
+        # remaining checks skipped, note errors are incomplete
+        validate.errors.add('truncated', 'truncated', (
+            f'Validation stopped after {validate.error_count} error(s), '
+            'remaining checks were not run'
+        ))
+
+        if on_error:
+            on_error(validate.errors.last('truncated').record('truncated'))
+
+    if cache is not None:
+        cache.put(key, validate.errors.to_json())
+
+    return validate.errors
+
+
+def open_sheet(file, **kwargs):
+    """
+    Open samplesheet file for reading, or use as is if already an open
+    text file. Files compressed with gzip, bzip2 or xz (by extension) are
+    decompressed as they are read
+
+    Args:
+        - file (str | file): name of samplesheet file or open text file
+        - kwargs: passed to open()
+    Returns:
+        - context manager giving the open file
+    """
+    if hasattr(file, 'read'):
+        # already open, leave for caller to close
+        return nullcontext(file)
+
+    module = compression(file)
+
+    if module:
+        return importlib.import_module(module).open(file, 'rt', **kwargs)
+
+    return open(file, **kwargs)
+
+
+def compression(file) -> str:
+    """
+    Name of module to decompress samplesheet file with from its extension,
+    or None if not compressed
+    """
+    return COMPRESSION.get(os.path.splitext(str(file))[1].lower())
+
+
+def compression_magic(data) -> str:
+    """
+    Name of module to decompress samplesheet contents with from the magic
+    bytes they start with, or None if not compressed
+    """
+    for magic, module in COMPRESSION_MAGIC.items():
+        if data[:len(magic)] == magic:
+            return module
+
+    return None
+
+
+def is_sheet_contents(sample_sheet) -> bool:
+    """
+    Check samplesheet is given as its contents (str or bytes) rather than
+    a file name, a str is contents if it has more than one line
+    """
+    if isinstance(sample_sheet, (bytes, bytearray, memoryview)):
+        return True
+
+    return isinstance(sample_sheet, str) and '\n' in sample_sheet
+
+
+def is_binary_file(sample_sheet) -> bool:
+    """
+    Check samplesheet is an open file returning bytes when read
+    """
+    return hasattr(sample_sheet, 'read') and isinstance(
+        sample_sheet.read(0), bytes
+    )
+
+
+def open_binary(file_handle) -> io.TextIOBase:
+    """
+    Open binary file of samplesheet contents as text, decompressing it as
+    it is read if it starts with gzip, bzip2 or xz magic bytes
+
+    Args:
+        - file_handle (file): open binary file
+    Returns:
+        - file (file): text file reading from file_handle
+    """
+    head = b''
+
+    if file_handle.seekable():
+        # check start of contents for magic bytes, then go back to it
+        position = file_handle.tell()
+        head = file_handle.read(max(len(x) for x in COMPRESSION_MAGIC))
+        file_handle.seek(position)
+
+    module = compression_magic(head)
+
+    if module:
+        return importlib.import_module(module).open(
+            file_handle, 'rt', encoding='utf-8', newline=None
+        )
+
+    return io.TextIOWrapper(file_handle, encoding='utf-8', newline=None)
+
+
+def decompress(data) -> io.TextIOBase:
+    """
+    Open samplesheet contents already in memory as text, decompressing
+    them as they are read if compressed. Contents are decoded as they are
+    read rather than copied into a str first
+
+    Args:
+        - data (bytes | bytearray | memoryview): contents of samplesheet
+    Returns:
+        - file (file): open text file of contents
+    """
+    return open_binary(io.BytesIO(data))
+
+
+def sheet_bytes(sample_sheet) -> bytes:
+    """
+    Contents of samplesheet as bytes, to key cached results on. Plain
+    files large enough to be memory mapped (see use_mmap()) are mapped
+    rather than read into memory, the map is closed by the caller
+
+    Args:
+        - sample_sheet (str | bytes | file): samplesheet file name,
+            contents or open file
+    Returns:
+        - data (bytes | bytearray | memoryview | mmap): contents of
+            samplesheet, bytes given are returned as is
+    """
+    if isinstance(sample_sheet, (bytes, bytearray, memoryview)):
+        return sample_sheet
+
+    if isinstance(sample_sheet, str) and is_sheet_contents(sample_sheet):
+        return sample_sheet.encode()
+
+    if hasattr(sample_sheet, 'read'):
+        data = sample_sheet.read()
+
+        return data.encode() if isinstance(data, str) else data
+
+    with open(sample_sheet, 'rb') as f:
+        if use_mmap(sample_sheet):
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return f.read()
+
+
+@contextmanager
+def sheet_source(sample_sheet):
+    """
+    Samplesheet as a file name or open text file for read_sheet() and
+    read_sheet_records(), from a file name, its contents as str or bytes,
+    or an open text or binary file. Nothing is written to disk
+
+    Args:
+        - sample_sheet (str | bytes | file): samplesheet to read
+    Returns:
+        - context manager giving file name or open text file, open binary
+            files given are left open on exit
+    """
+    if isinstance(sample_sheet, str) and is_sheet_contents(sample_sheet):
+        yield io.StringIO(sample_sheet, newline=None)
+    elif is_sheet_contents(sample_sheet):
+        yield decompress(sample_sheet)
+    elif is_binary_file(sample_sheet):
+        text = open_binary(sample_sheet)
+
+        try:
+            yield text
+        finally:
+            # detach so caller's file is not closed with the text wrapper
+            text.detach()
+    else:
+        yield sample_sheet
+
+
+def use_mmap(file) -> bool:
+    """
+    Check samplesheet is a plain file large enough to be memory mapped
+    """
+    if hasattr(file, 'read') or compression(file):
+        return False
+
+    return os.path.getsize(file) >= MMAP_MIN_SIZE
+
+
+def read_sheet(file) -> tuple:
+    """
+    Read header and body of samplesheet into df, returned in a tuple.
+
+    File is read in a single pass: header lines are streamed until the
+    column names line is found, then the same open file handle is passed
+    to pandas to parse the remaining data body. For v2 sheets, where the
+    data section may be followed by other sections, the lines of the data
+    section are read up to its end and pandas parses those lines.
+
+    Large plain v1 sheets are memory mapped, the column names line is
+    found in the mapped file and pandas parses the body from the map
+    without the file being copied into memory.
+
+    Args:
+        - file (str | file): name of samplesheet file to validate, or an
+            open text file
+    Returns:
+        - sample_sheet (tuple): contains df of samplesheet data (df), sample
+            sheet header (list), header_count (int) and sections of the
+            sheet (sheet_sections)
+    """
+    # imported here as importing pandas is slow, and not needed when
+    # reading with read_sheet_records()
+    import pandas as pd
+
+    if use_mmap(file):
+        samplesheet_header, column_names, _ = read_header_mapped(file)
+        sections = sheet_sections(samplesheet_header)
+
+        if sections.version == 1:
+            # data body runs to end of file, parsed by pandas from the
+            # memory mapped file after skipping the header
+            samplesheet_df = pd.read_csv(
+                file, header=None, names=column_names, dtype=str,
+                keep_default_na=False, na_values=NA_VALUES,
+                skiprows=len(samplesheet_header), memory_map=True
+            )
+
+            return (
+                samplesheet_df, samplesheet_header, len(samplesheet_header),
+                sections
+            )
+
+    with open_sheet(file) as f:
+        samplesheet_header, column_names = read_header(f)
+
+        # used to return what row issues are on when looping over data body
+        header_count = len(samplesheet_header)
+        sections = sheet_sections(samplesheet_header)
+
+        if sections.version == 2:
+            lines, trailing_lines, trailing_start = read_data_lines(
+                f, header_count
+            )
+            sections.index(trailing_lines, trailing_start)
+
+            # lines of the data section already read, parsed from memory
+            # rather than reading them from the file again
+            f = io.StringIO(''.join(lines))
+
+        # handle is now positioned at the first line of the data body,
+        # values read as strings to be validated as written in the sheet
+        samplesheet_df = pd.read_csv(
+            f, header=None, names=column_names, dtype=str,
+            keep_default_na=False, na_values=NA_VALUES
+        )
+
+    return (samplesheet_df, samplesheet_header, header_count, sections)
+
+
+def read_sheet_records(file) -> tuple:
+    """
+    Read header and body of samplesheet with the csv module into a
+    sheet_body, returned in the same tuple as read_sheet().
+
+    Avoids importing pandas, which is the majority of the run time when
+    validating a single sheet from the command line.
+
+    Large plain v1 sheets are memory mapped as in read_sheet(), rows are
+    decoded line by line from the map without the file being copied into
+    memory.
+
+    Args:
+        - file (str | file): name of samplesheet file to validate, or an
+            open text file
+    Returns:
+        - sample_sheet (tuple): contains sheet_body of samplesheet data,
+            sample sheet header (list), header_count (int) and sections of
+            the sheet (sheet_sections)
+    """
+    if use_mmap(file):
+        samplesheet_header, column_names, body_start = read_header_mapped(
+            file
+        )
+        sections = sheet_sections(samplesheet_header)
+
+        if sections.version == 1:
+            # data body runs to end of file, read after the header
+            with open(file, 'rb') as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                mapped.seek(body_start)
+                rows = [row for row in csv.reader(
+                    x.decode() for x in iter(mapped.readline, b'')
+                ) if row]
+
+            return (
+                sheet_body(column_names, rows), samplesheet_header,
+                len(samplesheet_header), sections
+            )
+
+    with open_sheet(file, newline='') as f:
+        samplesheet_header, column_names = read_header(f)
+        header_count = len(samplesheet_header)
+        sections = sheet_sections(samplesheet_header)
+        lines = f
+
+        if sections.version == 2:
+            lines, trailing_lines, trailing_start = read_data_lines(
+                f, header_count
+            )
+            sections.index(trailing_lines, trailing_start)
+
+        rows = [row for row in csv.reader(lines) if row]
+
+    return (
+        sheet_body(column_names, rows), samplesheet_header, header_count,
+        sections
+    )
+
+
+def read_data_lines(file_handle, header_count) -> tuple:
+    """
+    Read lines of the data section of a v2 samplesheet, which ends at the
+    next [Section] line or the end of the file
+
+    Args:
+        - file_handle (file): open samplesheet file, positioned at the
+            start of the data body
+        - header_count (int): number of lines before the data body
+    Returns:
+        - lines (list): lines of data body, up to the last line with any
+            values (dropping ,,,, padding before the next section)
+        - trailing_lines (list): lines from the next [Section] line to the
+            end of the file
+        - trailing_start (int): line number of first trailing line
+    """
+    lines = []
+    last_values = 0
+
+    for line in iter(file_handle.readline, ''):
+        if line.startswith('['):
+            trailing_lines = [line.rstrip()] + [
+                x.rstrip() for x in iter(file_handle.readline, '')
+            ]
+            return (
+                lines[:last_values], trailing_lines,
+                header_count + len(lines) + 1
+            )
+
+        lines.append(line)
+
+        if line.strip(', \t\r\n'):
+            last_values = len(lines)
+
+    return lines[:last_values], [], None
+
+
+def read_header(file_handle) -> tuple:
+    """
+    Read lines of samplesheet header from open file handle up to and
+    including the column names line, leaving the handle positioned at the
+    start of the data body
+
+    Args:
+        - file_handle (file): open samplesheet file
+    Returns:
+        - samplesheet_header (list): lines of header, including column names
+        - column_names (list): names of data columns
+    Raises:
+        - ValueError: no column names line (containing Sample_ID) found
+    """
+    # read in header of file, column names should always start with Sample_
+    samplesheet_header = []
+
+    # readline() used over iterating the handle so the position is left
+    # exactly after the column names line for the body parser
+    for line in iter(file_handle.readline, ''):
+        samplesheet_header.append(line.rstrip())
+
+        if 'Sample_ID' in line:
+            # Sample_ID present => line is column names
+            return samplesheet_header, line.rstrip('\r\n').split(',')
+
+    raise ValueError(
+        'No column names line containing Sample_ID found in samplesheet'
+    )
+
+
+def read_header_mapped(file) -> tuple:
+    """
+    Read samplesheet header by memory mapping the file and searching it
+    for the column names line, only the header is copied into memory
+
+    Args:
+        - file (str): name of samplesheet file
+    Returns:
+        - samplesheet_header (list): lines of header, including column names
+        - column_names (list): names of data columns
+        - body_start (int): offset of the first line of the data body
+    Raises:
+        - ValueError: no column names line (containing Sample_ID) found
+    """
+    with open(file, 'rb') as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        position = mapped.find(b'Sample_ID')
+
+        if position == -1:
+            raise ValueError(
+                'No column names line containing Sample_ID found in '
+                'samplesheet'
+            )
+
+        end = mapped.find(b'\n', position)
+        body_start = len(mapped) if end == -1 else end + 1
+        lines = mapped[:len(mapped) if end == -1 else end].decode().split(
+            '\n'
+        )
+
+    samplesheet_header = [x.rstrip() for x in lines]
+
+    return (
+        samplesheet_header, lines[-1].rstrip('\r\n').split(','), body_start
+    )
+
+
+def read_name_patterns(config_file):
+    """
+    Read regex patterns used for validating sample IDs from file
+
+    Args:
+        - config_file (str): filename of config file containing regex patterns
+    Returns:
+        regex_patterns (list): list of patterns read from file
+    """
+    with open(config_file) as f:
+        regex_patterns = [x.rstrip() for x in f.readlines()]
+
+    return regex_patterns
+
+
+def parse_args():
+    """
+    Parse cmd line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Validate Illumina sample sheet against defined requirements. "
+            "Requires passing a samplesheet, and optionally a list or file of "
+            "regex patterns to validate sample IDs against. "
+            "See readme for details."
+        )
+    )
+
+    sheets = parser.add_mutually_exclusive_group(required=True)
+    sheets.add_argument(
+        '--samplesheet',
+        help="sample sheet to validate"
+    )
+    sheets.add_argument(
+        '--batch',
+        help=(
+            'directory, glob pattern or manifest file (one path per line) '
+            'of sample sheets to validate in parallel'
+        )
+    )
+    parser.add_argument(
+        '--name_patterns', nargs='*', action="store", required=False,
+        help='regex pattern(s) against which to validate sample names'
+    )
+    parser.add_argument(
+        '--name_patterns_file', required=False,
+        help='file of regex pattern(s) against which to validate sameple names'
+    )
+    parser.add_argument(
+        '--barcode_mismatches', type=int, required=False,
+        help=(
+            'number of barcode mismatches allowed when demultiplexing, if '
+            'given checks for indices too similar to be distinguished'
+        )
+    )
+
+    parser.add_argument(
+        '--header_schema', nargs='+', required=False,
+        help=(
+            'header schema file(s) (JSON, or YAML with PyYAML installed) or '
+            'directories of schemas to check the header against, the first '
+            'applying to a sheet is used otherwise the default for its '
+            'version'
+        )
+    )
+
+    parser.add_argument(
+        '--i5_orientation', choices=['auto', *ORIENTATIONS], required=False,
+        help=(
+            'orientation the instrument reads i5 (index2) in, or auto to '
+            'find it from the instrument in the header. Also checks index2 '
+            'against the reverse complement of other index2'
+        )
+    )
+    parser.add_argument(
+        '--index_kits', nargs='+', required=False,
+        help=(
+            'index kit file(s) of known i7 / i5 indices, to find index2 '
+            'written in the orientation not read by the instrument'
+        )
+    )
+    parser.add_argument(
+        '--run_index', required=False,
+        help=(
+            'SQLite database of sheets registered for each run, checks '
+            'indices against other sheets for the same run and Sample_IDs '
+            'against sheets for any run, then registers the sheet '
+            '(--samplesheet only)'
+        )
+    )
+    parser.add_argument(
+        '--run', required=False,
+        help=(
+            'run (or flowcell) to register sheet for with --run_index '
+            '(default: RunName / Experiment Name from the header)'
+        )
+    )
+
+    sheets.add_argument(
+        '--serve', action='store_true',
+        help=(
+            'run as a server validating sample sheets sent over HTTP, on '
+            '--port or --socket'
+        )
+    )
+    parser.add_argument(
+        '--output', choices=['text', 'jsonl'], default='text',
+        help=(
+            'format to output errors in for --samplesheet, jsonl writes each '
+            'error as a JSON record on its own line as it is found '
+            '(default: text)'
+        )
+    )
+    parser.add_argument(
+        '--watch', action='store_true',
+        help=(
+            'watch --samplesheet, validating it again each time it is saved '
+            'by checking only the rows changed'
+        )
+    )
+    parser.add_argument(
+        '--summary', action='store_true',
+        help=(
+            'print the number of errors of each type in each section, '
+            'instead of every error (--samplesheet only)'
+        )
+    )
+    parser.add_argument(
+        '--max-errors', dest='max_errors', type=int, required=False,
+        help=(
+            'stop validating once this many errors are found, skipping '
+            'remaining checks'
+        )
+    )
+    parser.add_argument(
+        '--fail-fast', dest='fail_fast', action='store_true',
+        help='stop validating at the first error found (--max-errors 1)'
+    )
+    parser.add_argument(
+        '--timings', nargs='?', const='time', choices=['time', *PROFILERS],
+        help=(
+            'print time taken, rows processed and errors found by reading '
+            'and each check. Optionally profile each step with cprofile, or '
+            'record peak memory with tracemalloc (i.e. --timings cprofile). '
+            '--samplesheet only'
+        )
+    )
+    parser.add_argument(
+        '--no-cache', dest='cache', action='store_false',
+        help=(
+            'always validate sheets, instead of returning cached results '
+            'for sheets previously validated with the same settings. '
+            'Not supported with --serve, which does not cache results'
+        )
+    )
+    parser.add_argument(
+        '--cache_dir', required=False,
+        help=(
+            'directory to cache results in (default: '
+            '$XDG_CACHE_HOME/validate_sample_sheet)'
+        )
+    )
+    parser.add_argument(
+        '--workers', type=int, required=False,
+        help=(
+            'number of worker processes for --batch / threads for --serve, '
+            'defaults to CPU count. For --samplesheet, number of threads to '
+            'run independent checks on at the same time (default: 1)'
+        )
+    )
+    parser.add_argument(
+        '--host', default='127.0.0.1',
+        help='address for --serve to listen on (default: 127.0.0.1)'
+    )
+    parser.add_argument(
+        '--port', type=int, default=8000,
+        help='port for --serve to listen on (default: 8000)'
+    )
+    parser.add_argument(
+        '--socket', required=False,
+        help='Unix socket path for --serve to listen on instead of a port'
+    )
+
+    args = parser.parse_args()
+
+    if args.watch and not args.samplesheet:
+        parser.error('--watch requires --samplesheet')
+
+    if args.output == 'jsonl' and not args.samplesheet:
+        parser.error('--output jsonl requires --samplesheet')
+
+    if args.watch and args.output == 'jsonl':
+        parser.error('--watch prints errors as text, not --output jsonl')
+
+    if args.summary and not args.samplesheet:
+        parser.error('--summary requires --samplesheet')
+
+    if args.serve and (not args.cache or args.cache_dir):
+        # each request is validated afresh, results are not cached
+        parser.error('--no-cache / --cache_dir are not supported with --serve')
+
+    for option in ('run_index', 'timings'):
+        # each sheet registered / timed alone, not across several at once
+        if getattr(args, option) and not args.samplesheet:
+            parser.error(f'--{option} requires --samplesheet')
+
+        if getattr(args, option) and args.watch:
+            parser.error(f'--{option} is not supported with --watch')
+
+    if args.max_errors is not None and args.max_errors < 1:
+        parser.error('--max-errors must be at least 1')
+
+    if args.fail_fast:
+        args.max_errors = 1
+
+    return args
+
+
+def print_errors(errors, summary=False) -> None:
+    """
+    Print errors found in a sample sheet by section
+
+    Args:
+        - errors (error_store): errors from validate_sheet_errors()
+        - summary (bool): print the number of errors of each type instead
+            of every error
+    """
+    # printed after errors as a note rather than a section of errors
+    truncated = errors.pop('truncated', None)
+
+    if summary and any(errors.values()):
+        # counted without formatting any messages
+        for key, lines in summarise_errors(errors).items():
+            print(f'\n\nErrors found in {key}:\n')
+            [print(f'\t{x}') for x in lines]
+    elif any(errors.values()):
+        # found some errors => print
+        for key, val in errors.items():
+            if val:
+                print(f'\n\nErrors found in {key}:\n')
+                [print(f'\t{x}') for x in val]
+    else:
+        print(f'\nSUCCESS: Samplesheet has passed validation.\n')
+
+    if truncated:
+        print(f'\n\nNOTE: {truncated[0]}\n')
+
+
+def write_json_lines(args, regex_patterns, timings) -> None:
+    """
+    Validate sample sheet writing each error to stdout as a JSON Lines
+    record as it is found. Anything else printed while validating (and
+    timings) is written to stderr so stdout is only error records
+
+    Args:
+        - args (argparse.Namespace): parsed cmd line arguments
+        - regex_patterns (list): (optional) list of regex patterns to validate
+            Sample_ID against for valid sample naming
+        - timings (validation_timings): (optional) records timings of steps
+    """
+    output = sys.stdout
+
+    def write_record(record):
+        output.write(f'{json.dumps(record)}\n')
+        output.flush()
+
+    with redirect_stdout(sys.stderr):
+        validate_sheet_errors(
+            args.samplesheet, regex_patterns, args.barcode_mismatches,
+            use_pandas=False, timings=timings, max_errors=args.max_errors,
+            on_error=write_record, workers=args.workers or 1,
+            header_schema=args.header_schema,
+            run_index=run_index(args.run_index) if args.run_index else None,
+            run=args.run, i5_orientation=args.i5_orientation,
+            index_kits=args.index_kits
+        )
+
+        if timings:
+            print(f'\nTimings:\n\n{timings.report()}\n')
+
+
+def main():
+    # turns off chained assignment warning - not req. as
+    # intentionally writing back to df
+    # pd.options.mode.chained_assignment = None
+
+    args = parse_args()
+
+    regex_patterns = None
+
+    if args.name_patterns_file:
+        # regex patterns given in file, read to list
+        regex_patterns = read_name_patterns(args.name_patterns_file)
+
+    if args.name_patterns:
+        # regex patterns passed in cmd line arg
+        regex_patterns = args.name_patterns
+
+    cache = result_cache(args.cache_dir) if args.cache else None
+
+    if args.serve:
+        from validate.server import serve
+
+        serve(
+            host=args.host, port=args.port, socket_path=args.socket,
+            regex_patterns=regex_patterns,
+            barcode_mismatches=args.barcode_mismatches, workers=args.workers,
+            max_errors=args.max_errors, header_schema=args.header_schema,
+            i5_orientation=args.i5_orientation, index_kits=args.index_kits
+        )
+        return
+
+    if args.batch:
+        # imported here as batch imports from this module
+        from validate.batch import (
+            find_sample_sheets, print_batch_report, validate_batch
+        )
+
+        sample_sheets = find_sample_sheets(args.batch)
+
+        print(f'\nChecking {len(sample_sheets)} samplesheets for issues\n')
+
+        results = validate_batch(
+            sample_sheets, regex_patterns, args.barcode_mismatches,
+            args.workers, cache, args.max_errors, args.header_schema,
+            args.i5_orientation, args.index_kits
+        )
+        print_batch_report(results)
+        return
+
+    timings = None
+
+    if args.timings:
+        timings = validation_timings(
+            None if args.timings == 'time' else args.timings
+        )
+
+    if args.output == 'jsonl':
+        write_json_lines(args, regex_patterns, timings)
+        return
+
+    if args.watch:
+        # imported here as watch imports from this module
+        from validate.watch import watch
+
+        watch(
+            args.samplesheet, summary=args.summary,
+            regex_patterns=regex_patterns,
+            barcode_mismatches=args.barcode_mismatches,
+            header_schema=args.header_schema,
+            i5_orientation=args.i5_orientation, index_kits=args.index_kits
+        )
+        return
+
+    print(f'\nChecking samplesheet for issues\n')
+
+    # run validation
+    # pandas not needed to validate one sheet, reading it with the csv
+    # module avoids the time taken importing pandas. Kept as an
+    # error_store so --summary counts errors without formatting messages
+    errors = validate_sheet_errors(
+        args.samplesheet, regex_patterns, args.barcode_mismatches,
+        use_pandas=False, cache=cache, timings=timings,
+        max_errors=args.max_errors, workers=args.workers or 1,
+        header_schema=args.header_schema,
+        run_index=run_index(args.run_index) if args.run_index else None,
+        run=args.run, i5_orientation=args.i5_orientation,
+        index_kits=args.index_kits
+    )
+
+    print_errors(errors, args.summary)
+
+    if timings:
+        print(f'\nTimings:\n\n{timings.report()}\n')
 
 
 if __name__ == "__main__":
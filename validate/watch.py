@@ -0,0 +1,601 @@
+"""
+Watch a sample sheet, validating it again each time it is saved.
+
+Sheets are often edited and saved many times before a run, and validating
+each save from nothing parses every row and runs every check over the
+whole sheet again. A sheet_watcher instead keeps what it found between
+saves:
+
+- the parsed header and sections, parsed again only if the header changed
+- the lines of the data rows, compared with those of the last save to find
+  the block of rows changed between the rows before and after it that are
+  unchanged, only the changed rows are parsed and spliced into the kept
+  sheet_body
+- the result of checking the Sample_ID / Sample_Name and packing the
+  indices of each row, so only the rows changed are checked
+- the groups of rows sharing Sample_IDs and indices, and a pigeonhole index
+  of the barcodes of each lane, which changed rows are removed from and
+  added to instead of grouping and comparing every row again
+
+Errors are the same as validating the saved sheet with validate_sheet().
+Other checks (i.e. index2 orientation, or site specific checks) are run
+over the whole sheet on each save. Each row of the data section must be a
+single line, as rows are compared line by line.
+
+The file is polled for changes to its size and modification time, so no
+file system notification library is needed.
+"""
+import csv
+from itertools import count
+import os
+import time
+
+from validate.barcodes import barcode_index
+from validate.schema import load_schemas
+from validate.sections import sheet_sections
+from validate.validate import (
+    open_sheet, print_errors, read_data_lines, read_header,
+    sheet_body, sheet_checks, validators
+)
+
+
+class row_groups():
+    """
+    Groups of rows sharing the same key (i.e. Sample_ID, lane and index),
+    updated as rows are added and removed. Rows are kept by id, which do
+    not change as rows before them are added or removed
+    """
+    def __init__(self) -> None:
+        # row id -> key, key -> ids of rows with key, and keys of more
+        # than one row
+        self.keys = {}
+        self.groups = {}
+        self.duplicates = set()
+        self.version = None
+
+
+    def add(self, row_id, key) -> None:
+        self.keys[row_id] = key
+        rows = self.groups.setdefault(key, set())
+        rows.add(row_id)
+
+        if len(rows) > 1:
+            self.duplicates.add(key)
+
+
+    def remove(self, row_id) -> None:
+        key = self.keys.pop(row_id, None)
+
+        if key is None:
+            return
+
+        rows = self.groups[key]
+        rows.discard(row_id)
+
+        if len(rows) < 2:
+            self.duplicates.discard(key)
+
+        if not rows:
+            del self.groups[key]
+
+
+    def find_duplicates(self, positions) -> dict:
+        """
+        Groups of more than one row, as find_duplicates()
+
+        Args:
+            - positions (dict): row id -> 0-based row position
+        Returns:
+            - duplicates (dict): key -> list of row positions with key, in
+                order first seen
+        """
+        duplicates = sorted((
+            (sorted(positions[x] for x in self.groups[key]), key)
+            for key in self.duplicates
+        ), key=lambda x: x[0])
+
+        return {key: rows for rows, key in duplicates}
+
+
+class row_values():
+    """
+    Values found for each row by a check (i.e. flags of invalid names, or
+    packed indices), and the rows flagged by it. Values of rows changed in
+    each save are spliced in, and flagged rows after them moved
+    """
+    def __init__(self) -> None:
+        self.values = None
+        self.flagged = []
+        self.version = None
+
+
+    def splice(self, start, removed, values, flagged) -> None:
+        """
+        Replace values of removed rows from start with those of the rows
+        added in their place
+
+        Args:
+            - start (int): position of first row changed
+            - removed (int): number of rows removed
+            - values (list): list of values of each row added, for each
+                value kept
+            - flagged (list): positions of rows added flagged, from start
+        """
+        if self.values is None:
+            self.values = [[] for _ in values]
+
+        end = start + removed
+        shift = len(values[0]) - removed
+
+        for kept, added in zip(self.values, values):
+            kept[start:end] = added
+
+        self.flagged = [x for x in self.flagged if x < start] + [
+            start + x for x in flagged
+        ] + [x + shift for x in self.flagged if x >= end]
+
+
+class close_rows():
+    """
+    Pairs of rows in the same lane with barcodes too close to demultiplex,
+    updated as rows are added and removed. Barcodes of each lane are kept
+    in a barcode_index, so each row added is only compared to the rows it
+    shares a bucket with
+
+    Args:
+        - max_distance (int): maximum hamming distance of each index
+    """
+    def __init__(self, max_distance) -> None:
+        self.max_distance = max_distance
+
+        # lane -> barcode_index, row id -> lane, and row id -> ids of rows
+        # too close to it
+        self.indices = {}
+        self.lanes = {}
+        self.pairs = {}
+        self.version = None
+
+
+    def add(self, row_id, lane, barcode) -> None:
+        if barcode is None:
+            # empty index, not compared
+            return
+
+        if lane not in self.indices:
+            self.indices[lane] = barcode_index(self.max_distance)
+
+        for other, _ in self.indices[lane].add(row_id, barcode):
+            self.pairs.setdefault(row_id, set()).add(other)
+            self.pairs.setdefault(other, set()).add(row_id)
+
+        self.lanes[row_id] = lane
+
+
+    def build(self, row_ids, lanes, barcodes, pairs) -> None:
+        """
+        Add every row of a sheet with the pairs of close rows already found
+        in it by validators.close_pairs(), without comparing them again
+        """
+        for row_id, lane, barcode in zip(row_ids, lanes, barcodes):
+            if barcode is None:
+                continue
+
+            if lane not in self.indices:
+                self.indices[lane] = barcode_index(self.max_distance)
+
+            self.indices[lane].add(row_id, barcode, compare=False)
+            self.lanes[row_id] = lane
+
+        for first, second in pairs:
+            self.pairs.setdefault(row_ids[first], set()).add(row_ids[second])
+            self.pairs.setdefault(row_ids[second], set()).add(row_ids[first])
+
+
+    def remove(self, row_id) -> None:
+        if row_id not in self.lanes:
+            return
+
+        self.indices[self.lanes.pop(row_id)].remove(row_id)
+
+        for other in self.pairs.pop(row_id, ()):
+            self.pairs[other].discard(row_id)
+
+            if not self.pairs[other]:
+                del self.pairs[other]
+
+
+    def close_pairs(self, positions, lanes, barcodes) -> list:
+        """
+        Pairs of close rows, in the order of validators.close_pairs()
+
+        Args:
+            - positions (dict): row id -> 0-based row position
+            - lanes (list): lane of each row
+            - barcodes (list): barcode of each row, None if not compared
+        Returns:
+            - pairs (list): (row, row) tuples of 0-based row positions
+        """
+        if not self.pairs:
+            return []
+
+        # lanes ordered by their first compared row
+        first = {}
+
+        for row, (lane, barcode) in enumerate(zip(lanes, barcodes)):
+            if barcode is not None:
+                first.setdefault(lane, row)
+
+        pairs = {
+            tuple(sorted((positions[row_id], positions[other])))
+            for row_id, others in self.pairs.items() for other in others
+        }
+
+        return sorted(pairs, key=lambda x: (first[lanes[x[0]]], x))
+
+
+class watched_validators(validators):
+    """
+    Validators of a watched sheet, checking only the values and rows
+    changed since the last save and keeping what is found in the watcher
+    for the next
+
+    Args:
+        - watcher (sheet_watcher): watcher of sheet, holding what was found
+            checking previous saves
+        - samplesheet (tuple): sheet as read by the watcher
+        - kwargs: as validators
+    """
+    def __init__(self, watcher, samplesheet, **kwargs) -> None:
+        super().__init__(samplesheet, **kwargs)
+        self.watcher = watcher
+
+
+    def kept(self, name, make) -> tuple:
+        """
+        State kept in the watcher under name, with the rows changed since
+        it was last updated. State not updated for the last save is made
+        again with make(), with every row added
+
+        Returns:
+            - state (row_groups | close_rows): state kept under name
+            - removed (list): ids of rows removed
+            - added (range): positions of rows added
+        """
+        watcher = self.watcher
+        state = watcher.kept.get(name)
+
+        if state is not None and state.version == watcher.version:
+            removed, added = [], range(0)
+        elif state is not None and state.version == watcher.version - 1:
+            removed, added = watcher.removed, watcher.added
+        else:
+            state = watcher.kept[name] = make()
+            removed, added = [], range(len(watcher.row_ids))
+
+        state.version = watcher.version
+
+        return state, removed, added
+
+
+    def name_flags(self, column, names) -> tuple:
+        """
+        Flag names as validators.name_flags(), only checking the names of
+        rows changed since the last save
+        """
+        flags, removed, added = self.kept(('name_flags', column), row_values)
+        missing, invalid, too_long, failed = super().name_flags(
+            column, names[added.start:added.stop]
+        )
+        flags.splice(
+            added.start, len(removed), [missing, invalid, too_long], failed
+        )
+
+        return (*flags.values, flags.flagged)
+
+
+    def encode_indices(self, column, indices) -> list:
+        """
+        Pack indices as validators.encode_indices(), only packing the
+        indices of rows changed since the last save
+        """
+        codes, removed, added = self.kept(('codes', column), row_values)
+        packed = super().encode_indices(
+            column, indices[added.start:added.stop]
+        )
+        codes.splice(added.start, len(removed), [packed], [
+            row for row, code in enumerate(packed) if code is None
+        ])
+
+        return codes.values[0]
+
+
+    def find_duplicates(self, name, *columns) -> dict:
+        """
+        Group rows as validators.find_duplicates(), only regrouping rows
+        changed since the last save
+        """
+        groups, removed, added = self.kept(name, row_groups)
+        row_ids = self.watcher.row_ids
+
+        for row_id in removed:
+            groups.remove(row_id)
+
+        for row in added:
+            groups.add(row_ids[row], tuple(x[row] for x in columns))
+
+        if not groups.duplicates:
+            return {}
+
+        return groups.find_duplicates(self.watcher.positions())
+
+
+    def close_pairs(self, lanes, barcodes) -> list:
+        """
+        Find close rows as validators.close_pairs(), only comparing rows
+        changed since the last save
+        """
+        close, removed, added = self.kept(
+            'close_pairs', lambda: close_rows(2 * self.barcode_mismatches)
+        )
+        row_ids = self.watcher.row_ids
+
+        if not close.lanes:
+            # no rows kept yet, close pairs of the whole sheet found at
+            # once as validators.close_pairs() is quicker for many rows
+            pairs = super().close_pairs(lanes, barcodes)
+            close.build(row_ids, lanes, barcodes, pairs)
+
+            return pairs
+
+        for row_id in removed:
+            close.remove(row_id)
+
+        for row in added:
+            close.add(row_ids[row], lanes[row], barcodes[row])
+
+        return close.close_pairs(self.watcher.positions(), lanes, barcodes)
+
+
+class sheet_watcher():
+    """
+    Sample sheet validated again each time it is saved, keeping what was
+    parsed and found in each save to only check what changed in the next
+
+    Args:
+        - path (str): sample sheet file to watch
+        - regex_patterns (list): (optional) as validate_sheet()
+        - barcode_mismatches (int): (optional) as validate_sheet()
+        - header_schema (str | list): (optional) as validate_sheet()
+        - i5_orientation (str): (optional) as validate_sheet()
+        - index_kits (str | list): (optional) as validate_sheet()
+        - checks (check_registry): (optional) as validate_sheet()
+    """
+    def __init__(
+            self, path, regex_patterns=None, barcode_mismatches=None,
+            header_schema=None, i5_orientation=None, index_kits=None,
+            checks=None) -> None:
+        self.path = path
+        self.regex_patterns = regex_patterns
+        self.barcode_mismatches = barcode_mismatches
+        self.header_schema = load_schemas(header_schema)
+        self.i5_orientation = i5_orientation
+        self.checks, self.index_kits = sheet_checks(
+            checks, i5_orientation, index_kits
+        )
+
+        # size and modification time of file when last read
+        self.stat = None
+
+        # sheet as last read, with the line of each data row
+        self.header = None
+        self.sections = None
+        self.trailing = None
+        self.lines = []
+        self.body = None
+
+        # id of each row, and the rows changed by the last read (ids of
+        # rows removed, positions of rows added), each read is a version
+        self.ids = count()
+        self.row_ids = []
+        self.removed = []
+        self.added = range(0)
+        self.version = 0
+        self.row_positions = None
+
+        # state of checks kept by name (see watched_validators.kept())
+        self.kept = {}
+
+        self.errors = None
+
+
+    def modified(self) -> bool:
+        """
+        Check if file has changed size or modification time since last
+        read, missing files (i.e. part way through being saved) are not
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+
+        return (stat.st_mtime_ns, stat.st_size) != self.stat
+
+
+    def positions(self) -> dict:
+        """
+        Row id -> 0-based position of each row, found once per read
+        """
+        if self.row_positions is None:
+            self.row_positions = {
+                row_id: row for row, row_id in enumerate(self.row_ids)
+            }
+
+        return self.row_positions
+
+
+    def read(self) -> bool:
+        """
+        Read sheet again, only parsing the data rows changed since it was
+        last read. Every row is parsed again if the header has changed
+
+        Returns:
+            - changed (bool): if the sheet has changed since last read
+        Raises:
+            - ValueError: no column names line found, or a quoted cell
+                spans lines
+        """
+        stat = os.stat(self.path)
+
+        with open_sheet(self.path, newline='') as f:
+            header, column_names = read_header(f)
+            sections = self.sections
+
+            if header != self.header:
+                sections = sheet_sections(header)
+
+            # lines of any sections after the data section of v2 sheets,
+            # and the line number they start on
+            trailing = [[], None]
+
+            if sections.version == 2:
+                lines, *trailing = read_data_lines(f, len(header))
+            else:
+                lines = f.readlines()
+
+        self.stat = (stat.st_mtime_ns, stat.st_size)
+
+        # blank lines are skipped when reading rows
+        lines = [x for x in lines if x.rstrip('\r\n')]
+
+        if header != self.header:
+            # columns may have changed, every row is parsed again and
+            # checks start again
+            self.lines = []
+            self.row_ids = []
+            self.body = None
+            self.kept.clear()
+        elif lines == self.lines and trailing == self.trailing:
+            return False
+
+        if header != self.header or trailing != self.trailing:
+            self.sections = sheet_sections(header, *trailing)
+
+        self.header = header
+        self.trailing = trailing
+
+        # block of changed rows is between the rows unchanged at the start
+        # and end of the sheet
+        shortest = min(len(lines), len(self.lines))
+        start = 0
+
+        while start < shortest and lines[start] == self.lines[start]:
+            start += 1
+
+        end = 0
+
+        while end < shortest - start and lines[-1 - end] == self.lines[
+            -1 - end
+        ]:
+            end += 1
+
+        old_end = len(self.lines) - end
+        new_end = len(lines) - end
+
+        rows = list(csv.reader(lines[start:new_end]))
+
+        if len(rows) != new_end - start:
+            raise ValueError(
+                'Rows with quoted cells spanning lines are not supported '
+                'when watching sample sheets'
+            )
+
+        changed = sheet_body(column_names, rows)
+
+        if self.body is None:
+            self.body = changed
+        else:
+            self.body.splice(start, old_end, changed)
+
+        self.removed = self.row_ids[start:old_end]
+        self.row_ids[start:old_end] = [next(self.ids) for _ in rows]
+        self.added = range(start, new_end)
+        self.row_positions = None
+        self.lines = lines
+        self.version += 1
+
+        return True
+
+
+    def validate(self):
+        """
+        Validate sheet as last read, checking only what changed since the
+        sheet was last validated
+
+        Returns:
+            - errors (error_store): errors found, as validate_sheet_errors()
+        """
+        validate = watched_validators(
+            self, (self.body, self.header, len(self.header), self.sections),
+            regex_patterns=self.regex_patterns,
+            barcode_mismatches=self.barcode_mismatches,
+            header_schemas=self.header_schema,
+            i5_orientation=self.i5_orientation, index_kits=self.index_kits
+        )
+        self.checks.run(validate)
+        self.errors = validate.errors
+
+        return self.errors
+
+
+    def update(self):
+        """
+        Read and validate sheet again if it has changed
+
+        Returns:
+            - errors (error_store): errors found, or None if the sheet has
+                not changed since last validated
+        """
+        if not self.read() and self.errors is not None:
+            return None
+
+        return self.validate()
+
+
+def watch(path, interval=0.5, summary=False, **kwargs) -> None:
+    """
+    Validate sample sheet each time it is saved, printing the errors found
+    until interrupted
+
+    Args:
+        - path (str): sample sheet file to watch
+        - interval (float): seconds between checking if file has changed
+        - summary (bool): print the number of errors of each type instead
+            of every error
+        - kwargs: settings to validate with, as sheet_watcher
+    """
+    watcher = sheet_watcher(path, **kwargs)
+
+    print(f'\nWatching {path} for changes, press Ctrl+C to stop\n')
+
+    try:
+        while True:
+            if watcher.modified():
+                start = time.perf_counter()
+
+                try:
+                    errors = watcher.update()
+                except (OSError, ValueError) as error:
+                    # i.e. part way through being saved
+                    print(f'\nCould not read {path}: {error}\n')
+                    errors = None
+
+                if errors is not None:
+                    print(
+                        f'\n{time.strftime("%H:%M:%S")} checked {path} in '
+                        f'{time.perf_counter() - start:.2f}s'
+                    )
+                    print_errors(errors, summary)
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass